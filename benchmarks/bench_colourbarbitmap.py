@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#
+# bench_colourbarbitmap.py - Benchmarks for the colourbarbitmap module.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""Benchmarks for the :mod:`fsleyes_widgets.utils.colourbarbitmap` module.
+Run this script directly, i.e.::
+
+    python benchmarks/bench_colourbarbitmap.py
+"""
+
+
+from __future__ import print_function
+
+import timeit
+
+import numpy as np
+
+import fsleyes_widgets.utils.colourbarbitmap as cbarbmp
+import fsleyes_widgets.utils.figurepool      as figpool
+
+from benchutils import traceAllocations, peakAllocation
+
+
+def bench_backends(repeat=5, number=20):
+    """Compares the time taken by the ``'matplotlib'`` and ``'numpy'``
+    :func:`.colourBarBitmap` backends.
+    """
+
+    testcases = [
+        ('plain',  dict()),
+        ('ticks',  dict(ticks=[0, 0.5, 1],
+                        ticklabels=['0', '0.5', '1'])),
+        ('labels', dict(ticks=[0, 0.5, 1],
+                        ticklabels=['0', '0.5', '1'],
+                        label='Label'))]
+
+    print('colourBarBitmap backends ({} calls, best of {})'.format(
+        number, repeat))
+
+    for name, kwargs in testcases:
+        for orient, (width, height) in [('horizontal', (300, 100)),
+                                        ('vertical',   (100, 300))]:
+
+            times = {}
+
+            for backend in ['matplotlib', 'numpy']:
+
+                def render():
+                    cbarbmp.colourBarBitmap('Reds',
+                                            width,
+                                            height,
+                                            orientation=orient,
+                                            backend=backend,
+                                            **kwargs)
+
+                render()
+                times[backend] = min(timeit.repeat(
+                    render, repeat=repeat, number=number)) / number
+
+            print('  {:6s} {:10s} matplotlib: {:8.3f}ms  numpy: {:8.3f}ms  '
+                  'speedup: {:6.1f}x'.format(
+                      name,
+                      orient,
+                      times['matplotlib'] * 1000,
+                      times['numpy']      * 1000,
+                      times['matplotlib'] / times['numpy']))
+
+
+def bench_renderer(ncalls=100):
+    """Compares the time taken to update the tick labels of a colour bar with
+    a :class:`.ColourBarRenderer`, against re-rendering the colour bar from
+    scratch with :func:`.colourBarBitmap`.
+    """
+
+    print('ColourBarRenderer tick label updates ({} calls)'.format(ncalls))
+
+    for orient, (width, height) in [('horizontal', (600, 80)),
+                                    ('vertical',   (80, 600))]:
+
+        kwargs   = dict(orientation=orient,
+                        ticks=[0, 1],
+                        ticklabels=['0', '0'],
+                        tickalign=['left', 'right'],
+                        label='Label')
+        renderer = cbarbmp.ColourBarRenderer('hot', width, height, **kwargs)
+        labels   = [['{:0.2f}'.format(i), '{:0.2f}'.format(i * 10)]
+                    for i in range(ncalls)]
+        times    = {}
+
+        def update():
+            for ticklabels in labels:
+                renderer.update(ticklabels=ticklabels)
+
+        def rerender(backend):
+            def func():
+                for ticklabels in labels:
+                    kwargs['ticklabels'] = ticklabels
+                    cbarbmp.colourBarBitmap('hot', width, height,
+                                            backend=backend, **kwargs)
+            return func
+
+        times['renderer']   = timeit.timeit(update,                number=1)
+        times['numpy']      = timeit.timeit(rerender('numpy'),      number=1)
+        times['matplotlib'] = timeit.timeit(rerender('matplotlib'), number=1)
+
+        print('  {:10s} renderer: {:8.3f}ms  numpy: {:8.3f}ms  '
+              'matplotlib: {:8.3f}ms'.format(
+                  orient,
+                  times['renderer']   * 1000 / ncalls,
+                  times['numpy']      * 1000 / ncalls,
+                  times['matplotlib'] * 1000 / ncalls))
+
+
+def bench_frames(nframes=500, width=600, height=80):
+    """Times the rendering of a sequence of colour bar frames with
+    :func:`.colourBarFrames`, and compares it against calling
+    :func:`.colourBarBitmap` for each frame.
+    """
+
+    print('colourBarFrames ({} frames)'.format(nframes))
+
+    seq    = [([0, 1], ['{:0.2f}'.format(i), '{:0.2f}'.format(i * 10)])
+              for i in range(nframes)]
+    kwargs = dict(orientation='horizontal', label='Label')
+
+    def frames():
+        for frame in cbarbmp.colourBarFrames('hot', width, height, seq,
+                                             **kwargs):
+            pass
+
+    def bitmaps():
+        for ticks, ticklabels in seq:
+            cbarbmp.colourBarBitmap('hot', width, height,
+                                    ticks=ticks,
+                                    ticklabels=ticklabels,
+                                    backend='numpy',
+                                    **kwargs)
+
+    for name, func in [('colourBarFrames', frames),
+                       ('colourBarBitmap', bitmaps)]:
+
+        cbarbmp.colourBarBitmap('hot', width, height, backend='numpy',
+                                **kwargs)
+
+        # tracemalloc slows down allocations,
+        # so timing is measured separately
+        elapsed = timeit.timeit(func, number=1)
+        peak    = peakAllocation(func)
+
+        print('  {}: {:8.3f}ms/frame ({:10d} bytes peak)'.format(
+            name, elapsed * 1000 / nframes, peak))
+
+
+def _legacyExtract(canvas, vertical):
+    """The pixel extraction method that was previously used by
+    :func:`.colourBarBitmap`, for comparison.
+    """
+
+    buf = canvas.tostring_argb()
+    ncols, nrows = canvas.get_width_height()
+
+    bitmap = np.frombuffer(buf, dtype=np.uint8).copy()
+    bitmap = bitmap.reshape(nrows, ncols, 4).transpose([1, 0, 2])
+
+    rgb    = bitmap[:, :, 1:]
+    a      = bitmap[:, :, 0]
+    bitmap = np.dstack((rgb, a))
+
+    if vertical:
+        bitmap = np.flipud(bitmap.transpose([1, 0, 2]))
+        bitmap = np.rot90(bitmap, 2)
+
+    return bitmap
+
+
+def _currentExtract(canvas, vertical):
+    """The pixel extraction method that is currently used by
+    :func:`.colourBarBitmap`.
+    """
+    ncols, nrows = canvas.get_width_height()
+    bitmap, view = cbarbmp._allocateBitmap(
+        ncols, nrows, ('horizontal', 'vertical')[vertical])
+    view[:]      = figpool.canvasToArray(canvas)
+    return bitmap
+
+
+def bench_allocations(width=1000, height=200):
+    """Compares the memory allocated by the previous and current pixel
+    extraction methods, and by a complete :func:`.colourBarBitmap` call.
+    """
+
+    print('Pixel extraction allocations ({}x{} canvas)'.format(
+        width, height))
+
+    with figpool.pooledFigure(width, height) as (fig, canvas):
+
+        fig.add_subplot(111)
+        canvas.draw()
+
+        for vertical in [False, True]:
+
+            legacy  = traceAllocations(lambda: _legacyExtract( canvas,
+                                                               vertical))
+            current = traceAllocations(lambda: _currentExtract(canvas,
+                                                               vertical))
+
+            legacyBmp  = _legacyExtract( canvas, vertical)
+            currentBmp = _currentExtract(canvas, vertical)
+
+            assert np.all(legacyBmp == currentBmp)
+
+            print('  {:10s} legacy:  {:10.0f} bytes/call ({:10d} peak)\n'
+                  '  {:10s} current: {:10.0f} bytes/call ({:10d} peak)'
+                  .format(('horizontal', 'vertical')[vertical],
+                          legacy[0], legacy[1], '',
+                          current[0], current[1]))
+
+    for orient, (w, h) in [('horizontal', (width, height)),
+                           ('vertical',   (height, width))]:
+        for backend in ['matplotlib', 'numpy']:
+            nbytes, peak = traceAllocations(
+                lambda: cbarbmp.colourBarBitmap('Reds',
+                                                w,
+                                                h,
+                                                orientation=orient,
+                                                backend=backend))
+            print('  colourBarBitmap {:10s} {:10s}: {:10.0f} bytes/call '
+                  '({:10d} peak, output is {} bytes)'.format(
+                      orient, backend, nbytes, peak, w * h * 4))
+
+
+if __name__ == '__main__':
+    bench_backends()
+    bench_renderer()
+    bench_frames()
+    bench_allocations()
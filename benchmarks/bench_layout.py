@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+#
+# bench_layout.py - Benchmarks for the layout module.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""Benchmarks for the :mod:`fsleyes_widgets.utils.layout` module.
+Run this script directly, i.e.::
+
+    python benchmarks/bench_layout.py
+"""
+
+
+from __future__ import print_function
+
+import os.path as op
+import shutil
+import timeit
+import tempfile
+
+import numpy as np
+
+import fsleyes_widgets.utils.layout as fsllayout
+
+from benchutils import peakAllocation
+
+
+def _legacyLayoutToBitmap(layout, bgColour):
+    """The recursive pad-and-stack implementation that was previously used
+    by :func:`.layoutToBitmap`, for comparison.
+    """
+
+    if isinstance(layout, fsllayout.Space):
+        space    = np.zeros((layout.height, layout.width, 4), dtype=np.uint8)
+        space[:] = bgColour
+        return space
+
+    elif isinstance(layout, fsllayout.Bitmap):
+        return np.array(layout.bitmap, dtype=np.uint8)
+
+    vert     = isinstance(layout, fsllayout.VBox)
+    itemBmps = [_legacyLayoutToBitmap(i, bgColour) for i in layout.items]
+    itemBmps = [fsllayout.padBitmap(i, layout.width, layout.height, vert,
+                                    bgColour)
+                for i in itemBmps]
+
+    if vert: return np.vstack(itemBmps)
+    else:    return np.hstack(itemBmps)
+
+
+def orthoLayout(canvasSize=1000, labelSize=40, layout='horizontal'):
+    """Creates a three-canvas ortho layout, with orientation labels.
+    Returns the layout, the canvas bitmaps, and the label bitmaps.
+    """
+
+    canvases = [np.random.randint(0, 256, (canvasSize, canvasSize, 4))
+                .astype(np.uint8) for i in range(3)]
+    labels   = []
+
+    for i in range(3):
+        hlabel = np.full((labelSize,  canvasSize, 4), 100, dtype=np.uint8)
+        vlabel = np.full((canvasSize, labelSize,  4), 100, dtype=np.uint8)
+        labels.append({'top'    : hlabel,
+                       'bottom' : hlabel,
+                       'left'   : vlabel,
+                       'right'  : vlabel})
+
+    layout = fsllayout.buildOrthoLayout(canvases, labels, layout, True,
+                                        labelSize)
+
+    return layout, canvases, labels
+
+
+def bench_layoutToBitmap(ncalls=10):
+    """Compares the time taken, and peak memory used, by the current and
+    legacy :func:`.layoutToBitmap` implementations.
+    """
+
+    bgColour = np.array([0, 0, 0, 255], dtype=np.uint8)
+
+    print('layoutToBitmap ({} calls)'.format(ncalls))
+
+    for orient in ['horizontal', 'vertical', 'grid']:
+
+        layout = orthoLayout(layout=orient)[0]
+        nbytes = layout.width * layout.height * 4
+        legacy = _legacyLayoutToBitmap(layout, bgColour)
+
+        assert np.all(fsllayout.layoutToBitmap(layout, bgColour) == legacy)
+
+        for name, func in [
+                ('legacy',  lambda: _legacyLayoutToBitmap(layout, bgColour)),
+                ('current', lambda: fsllayout.layoutToBitmap(layout,
+                                                             bgColour))]:
+
+            elapsed = timeit.timeit(func, number=ncalls) / ncalls
+            peak    = peakAllocation(func)
+
+            print('  {:10s} {:7s}: {:8.3f}ms  {:10d} bytes peak '
+                  '({:4.2f}x output size)'.format(
+                      orient, name, elapsed * 1000, peak,
+                      peak / float(nbytes)))
+
+
+def bench_compositor(nframes=50, canvasSize=1000, labelSize=40):
+    """Compares the time taken, and peak memory allocated, to generate a
+    sequence of movie frames by re-building the layout and calling
+    :func:`.layoutToBitmap` on every frame, against using a
+    :class:`.LayoutCompositor`.
+    """
+
+    print('LayoutCompositor ({} frames)'.format(nframes))
+
+    bgColour                 = (0, 0, 0, 255)
+    layout, canvases, labels = orthoLayout(canvasSize, labelSize)
+    frames                   = [[np.roll(c, i, axis=0) for c in canvases]
+                                for i in range(4)]
+
+    def rebuild():
+        for i in range(nframes):
+            frame = frames[i % len(frames)]
+            fsllayout.layoutToBitmap(fsllayout.buildOrthoLayout(
+                frame, labels, 'horizontal', True, labelSize), bgColour)
+
+    # The compositor output buffer is allocated
+    # on the first call (during warm-up below)
+    comp = fsllayout.LayoutCompositor(layout, canvases, bgColour)
+
+    def compositor():
+        for i in range(nframes):
+            comp.composite(frames[i % len(frames)])
+
+    for name, func in [('layoutToBitmap',   rebuild),
+                       ('LayoutCompositor', compositor)]:
+
+        func()
+
+        # tracemalloc slows down allocations,
+        # so timing is measured separately
+        elapsed = timeit.timeit(func, number=1)
+        peak    = peakAllocation(func)
+
+        print('  {:16s}: {:8.3f}ms/frame  {:10d} bytes peak'.format(
+            name, elapsed * 1000 / nframes, peak))
+
+
+def bench_update(nframes=50, canvasSize=1000, labelSize=40):
+    """Compares the time taken to generate a sequence of frames in which only
+    one canvas changes, with :func:`.layoutToBitmap`,
+    :meth:`.LayoutCompositor.composite`, and
+    :meth:`.LayoutCompositor.update`.
+    """
+
+    print('LayoutCompositor.update ({} frames, one canvas changes per '
+          'frame)'.format(nframes))
+
+    bgColour                 = (0, 0, 0, 255)
+    layout, canvases, labels = orthoLayout(canvasSize, labelSize)
+    frames                   = [np.roll(canvases[1], i, axis=0)
+                                for i in range(4)]
+    leaves                   = fsllayout.computeGeometry(layout)[0]
+    bitmaps                  = [b for b in leaves
+                                if isinstance(b, fsllayout.Bitmap)]
+    leaf                     = [b for b in bitmaps
+                                if b.bitmap is canvases[1]][0]
+    comp                     = fsllayout.LayoutCompositor(
+        layout, canvases, bgColour)
+
+    def rebuild():
+        for i in range(nframes):
+            leaf.bitmap = frames[i % len(frames)]
+            fsllayout.layoutToBitmap(layout, bgColour)
+
+    def composite():
+        for i in range(nframes):
+            comp.composite([canvases[0], frames[i % len(frames)],
+                            canvases[2]])
+
+    def update():
+        for i in range(nframes):
+            leaf.bitmap = frames[i % len(frames)]
+            comp.update()
+
+    for name, func in [('layoutToBitmap', rebuild),
+                       ('composite',      composite),
+                       ('update',         update)]:
+        func()
+        elapsed = timeit.timeit(func, number=1)
+        print('  {:14s}: {:8.3f}ms/frame'.format(
+            name, elapsed * 1000 / nframes))
+
+    leaf.bitmap = canvases[1]
+
+
+def bench_png(canvasSize=2000, labelSize=40):
+    """Compares the time taken, and peak memory used, to save a layout to a
+    PNG file with :func:`.layoutToPNG`, against generating the full bitmap
+    with :func:`.layoutToBitmap`, and saving it with ``PIL``.
+    """
+
+    import PIL.Image as Image
+
+    layout, canvases = orthoLayout(canvasSize, labelSize, 'grid')[:2]
+    bgColour         = (0, 0, 0, 255)
+    tmpdir           = tempfile.mkdtemp()
+    fname            = op.join(tmpdir, 'layout.png')
+
+    # Random data is not compressible,
+    # so use something more realistic
+    xs, ys = np.meshgrid(np.arange(canvasSize), np.arange(canvasSize))
+    for i, c in enumerate(canvases):
+        c[..., 0] = (xs * (i + 1)) // 16
+        c[..., 1] = (ys * (i + 1)) // 16
+        c[..., 2] = ((xs - ys) // 64) * 8
+        c[..., 3] = 255
+
+    print('layoutToPNG ({}x{} bitmap)'.format(layout.width, layout.height))
+
+    def pil():
+        bitmap = fsllayout.layoutToBitmap(layout, bgColour)
+        Image.fromarray(bitmap).save(fname)
+
+    def png():
+        fsllayout.layoutToPNG(layout, fname, bgColour)
+
+    try:
+        for name, func in [('layoutToBitmap + PIL', pil),
+                           ('layoutToPNG',          png)]:
+
+            elapsed = timeit.timeit(func, number=1)
+            peak    = peakAllocation(func)
+
+            print('  {:20s}: {:10.3f}ms  {:10d} bytes peak  {:10d} '
+                  'bytes on disk'.format(name, elapsed * 1000, peak,
+                                         op.getsize(fname)))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def bench_workers(canvasSize=2000, ncanvases=9, repeat=5):
+    """Compares the time taken by :func:`.layoutToBitmap` with different
+    numbers of worker threads, on a grid of large canvases.
+    """
+
+    import multiprocessing as mp
+
+    canvases = [np.random.randint(0, 256, (canvasSize, canvasSize, 4))
+                .astype(np.uint8) for i in range(ncanvases)]
+    ncols    = int(np.ceil(np.sqrt(ncanvases)))
+    layout   = fsllayout.VBox([
+        fsllayout.HBox([fsllayout.Bitmap(c)
+                        for c in canvases[i:i + ncols]])
+        for i in range(0, ncanvases, ncols)])
+    bgColour = (0, 0, 0, 255)
+    expected = fsllayout.layoutToBitmap(layout, bgColour)
+
+    print('layoutToBitmap workers ({} {}x{} canvases, {} CPUs, best of '
+          '{})'.format(ncanvases, canvasSize, canvasSize, mp.cpu_count(),
+                       repeat))
+
+    serial = None
+
+    for workers in [1, 2, 4, 8]:
+
+        def func():
+            return fsllayout.layoutToBitmap(layout, bgColour,
+                                            workers=workers)
+
+        assert np.all(func() == expected)
+
+        elapsed = min(timeit.repeat(func, repeat=repeat, number=1))
+
+        if serial is None:
+            serial = elapsed
+
+        print('  {} workers: {:8.3f}ms  speedup: {:5.2f}x'.format(
+            workers, elapsed * 1000, serial / elapsed))
+
+
+def _floatAlphaOver(src, dest):
+    """Straightforward floating point implementation of a Porter-Duff over
+    blend, for comparison with :func:`.alphaOver`.
+    """
+    src       = src  / 255.0
+    dst       = dest / 255.0
+    srca      = src[..., 3:]
+    dsta      = dst[..., 3:]
+    outa      = srca + dsta * (1 - srca)
+    outc      = src[..., :3] * srca + dst[..., :3] * dsta * (1 - srca)
+    outc      = outc / np.maximum(outa, 1e-10)
+    dest[:]   = np.round(255 * np.concatenate((outc, outa), axis=-1))
+    return dest
+
+
+def bench_alphaOver(size=1000, repeat=5, number=10):
+    """Compares the time taken, and peak memory used, by :func:`.alphaOver`
+    against a floating point implementation.
+    """
+
+    src  = np.random.randint(0, 256, (size, size, 4)).astype(np.uint8)
+    dest = np.random.randint(0, 256, (size, size, 4)).astype(np.uint8)
+
+    opaque         = np.array(dest)
+    opaque[..., 3] = 255
+
+    print('alphaOver ({}x{} bitmap, best of {})'.format(size, size, repeat))
+
+    for name, func in [
+            ('float',         lambda: _floatAlphaOver(src, np.array(dest))),
+            ('straight',      lambda: fsllayout.alphaOver(
+                src, np.array(dest))),
+            ('opaque dest',   lambda: fsllayout.alphaOver(
+                src, np.array(opaque))),
+            ('premultiplied', lambda: fsllayout.alphaOver(
+                src, np.array(dest), True))]:
+
+        elapsed = min(timeit.repeat(func, repeat=repeat, number=number))
+        peak    = peakAllocation(func)
+
+        print('  {:13s}: {:8.3f}ms  {:10d} bytes peak'.format(
+            name, elapsed * 1000 / number, peak))
+
+
+def bench_montage(tileSize=64, repeat=3):
+    """Times the planning (:func:`.calcMontageSizes`), building
+    (:func:`.buildMontageLayout`) and compositing (:func:`.layoutToBitmap`)
+    of montages with increasing numbers of tiles, to show that they scale
+    linearly.
+    """
+
+    print('Montage ({}x{} tiles, best of {})'.format(
+        tileSize, tileSize, repeat))
+
+    for ntiles in [100, 1000, 4000]:
+
+        ncols  = int(np.ceil(np.sqrt(ntiles)))
+        tiles  = [np.full((tileSize, tileSize, 4), i % 256, dtype=np.uint8)
+                  for i in range(ntiles)]
+        bounds = np.random.random((ntiles, 2)) + 0.5
+        width  = ncols * tileSize
+        times  = {}
+
+        def sizes():
+            fsllayout.calcMontageSizes(ntiles, ncols, bounds, width, width)
+
+        def loop():
+            [fsllayout._adjustPixelSize(bw, bh, tileSize, tileSize)
+             for bw, bh in bounds]
+
+        def build():
+            return fsllayout.buildMontageLayout(tiles, ncols, 2)
+
+        layout = build()
+
+        def composite():
+            fsllayout.layoutToBitmap(layout)
+
+        for name, func in [('calcMontageSizes', sizes),
+                           ('python loop',      loop),
+                           ('build',            build),
+                           ('composite',        composite)]:
+            times[name] = min(timeit.repeat(func, repeat=repeat, number=1))
+
+        print('  {:5d} tiles: calcMontageSizes {:7.3f}ms (python loop '
+              '{:7.3f}ms)  buildMontageLayout {:7.3f}ms  layoutToBitmap '
+              '{:8.3f}ms  ({:6.2f}us/tile)'.format(
+                  ntiles,
+                  times['calcMontageSizes'] * 1000,
+                  times['python loop']      * 1000,
+                  times['build']            * 1000,
+                  times['composite']        * 1000,
+                  (times['build'] + times['composite']) * 1e6 / ntiles))
+
+
+def bench_calcSizes(nevents=1000, repeat=5):
+    """Simulates the :func:`.calcSizes` calls made during a window resize
+    drag, with and without the cache, and compares them against a single
+    call to :func:`.calcSizesBatch`.
+    """
+
+    print('calcSizes resize storm ({} events, best of {})'.format(
+        nevents, repeat))
+
+    bounds  = [100.0, 120.0, 90.0]
+    widths  = 400 + np.arange(nevents) // 4
+    heights = 300 + np.arange(nevents) // 8
+
+    for layout, axes in [('horizontal', [(0, 1), (0, 2), (1, 2)]),
+                         ('grid',       [(0, 2), (1, 2), (0, 1)])]:
+
+        times = {}
+
+        def uncached():
+            for w, h in zip(widths, heights):
+                fsllayout._sizeCache.clear()
+                fsllayout.calcSizes(layout, axes, bounds, w, h)
+
+        def cached():
+            for w, h in zip(widths, heights):
+                fsllayout.calcSizes(layout, axes, bounds, w, h)
+
+        def batch():
+            fsllayout.calcSizesBatch(layout, axes, bounds, widths, heights)
+
+        for name, func in [('uncached', uncached),
+                           ('cached',   cached),
+                           ('batch',    batch)]:
+            times[name] = min(timeit.repeat(func, repeat=repeat, number=1))
+
+        print('  {:10s} uncached: {:7.3f}ms  cached: {:7.3f}ms  '
+              'calcSizesBatch: {:7.3f}ms'.format(
+                  layout,
+                  times['uncached'] * 1000,
+                  times['cached']   * 1000,
+                  times['batch']    * 1000))
+
+
+if __name__ == '__main__':
+    bench_layoutToBitmap()
+    bench_compositor()
+    bench_update()
+    bench_png()
+    bench_workers()
+    bench_alphaOver()
+    bench_montage()
+    bench_calcSizes()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#
+# bench_textbitmap.py - Benchmarks for the textbitmap module.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""Benchmarks for the :mod:`fsleyes_widgets.utils.textbitmap` module.
+Run this script directly, i.e.::
+
+    python benchmarks/bench_textbitmap.py
+"""
+
+
+from __future__ import print_function
+
+import timeit
+
+import fsleyes_widgets.utils.textbitmap as textbmp
+
+
+def bench_backends(repeat=5, number=50):
+    """Compares the time taken by the ``'matplotlib'`` and ``'numpy'``
+    :func:`.textBitmap` backends.
+    """
+
+    print('textBitmap backends ({} calls, best of {})'.format(
+        number, repeat))
+
+    for text in ['L', 'R', 'A', 'S', 'Label']:
+
+        times = {}
+
+        for backend in ['matplotlib', 'numpy']:
+
+            def render():
+                textbmp.textBitmap(text, 50, 50, 12, '#ffffff', None,
+                                   backend=backend)
+
+            render()
+            times[backend] = min(timeit.repeat(
+                render, repeat=repeat, number=number)) / number
+
+        print('  {:6s} matplotlib: {:10.1f}us  numpy: {:10.1f}us  '
+              'speedup: {:8.1f}x'.format(
+                  text,
+                  times['matplotlib'] * 1000000,
+                  times['numpy']      * 1000000,
+                  times['matplotlib'] / times['numpy']))
+
+
+def bench_batch(number=10):
+    """Compares the time taken to render the orientation labels for three
+    canvases with :func:`.textBitmaps`, against calling :func:`.textBitmap`
+    for each label.
+    """
+
+    labels = ['L', 'R', 'A', 'S', 'P', 'I', 'L', 'R', 'P', 'A', 'S', 'I']
+
+    def batch():
+        textbmp.textBitmaps(labels, (40, 40), 12, '#ffffff', None)
+
+    def single():
+        for label in labels:
+            textbmp.textBitmap(label, 40, 40, 12, '#ffffff', None)
+
+    batch()
+    single()
+
+    tbatch  = timeit.timeit(batch,  number=number) / number
+    tsingle = timeit.timeit(single, number=number) / number
+
+    print('textBitmaps ({} labels)'.format(len(labels)))
+    print('  textBitmap: {:8.3f}ms  textBitmaps: {:8.3f}ms  '
+          'speedup: {:6.1f}x'.format(tsingle * 1000,
+                                     tbatch  * 1000,
+                                     tsingle / tbatch))
+
+
+if __name__ == '__main__':
+    bench_backends()
+    bench_batch()
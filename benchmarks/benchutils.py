@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+#
+# benchutils.py - Utilities shared by the benchmark scripts.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""Utilities which are shared by the benchmark scripts in this directory.
+"""
+
+
+import tracemalloc
+
+
+def traceAllocations(func, ncalls=10):
+    """Calls ``func`` ``ncalls`` times, and returns the mean number of
+    bytes allocated per call, and the peak traced memory of a single call,
+    as measured by ``tracemalloc``. ``func`` is called once beforehand, so
+    that one-off allocations (e.g. caches) are not counted.
+    """
+
+    func()
+
+    total = 0
+    peak  = 0
+
+    for i in range(ncalls):
+
+        # Tracing is restarted for each call
+        # to reset the peak, as
+        # tracemalloc.reset_peak is only
+        # available in python >= 3.9
+        tracemalloc.start()
+
+        try:
+            before  = tracemalloc.get_traced_memory()[0]
+            snap1   = tracemalloc.take_snapshot()
+            func()
+            peak    = max(peak, tracemalloc.get_traced_memory()[1] - before)
+            snap2   = tracemalloc.take_snapshot()
+            stats   = snap2.compare_to(snap1, 'filename')
+            total  += sum([s.size_diff for s in stats if s.size_diff > 0])
+        finally:
+            tracemalloc.stop()
+
+    return total / float(ncalls), peak
+
+
+def peakAllocation(func):
+    """Calls ``func``, and returns the peak memory, in bytes, that was
+    allocated during the call, as measured by :func:`traceAllocations`.
+    """
+    return traceAllocations(func, ncalls=1)[1]
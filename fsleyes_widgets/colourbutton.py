@@ -12,7 +12,8 @@ allows the user to select a RGBA colour.
 import wx
 import wx.lib.newevent as wxevent
 
-import fsleyes_widgets as fw
+import fsleyes_widgets                as fw
+import fsleyes_widgets.utils.wxbitmap as wxbmp
 
 
 class ColourButton(wx.Button):
@@ -53,6 +54,10 @@ class ColourButton(wx.Button):
         self.__size = size
         self.__bmp  = None
 
+        # The bitmap data is re-used
+        # whenever the colour changes
+        self.__data = wxbmp.empty(*size)
+
         self.Bind(wx.EVT_BUTTON, self.__onClick)
 
         self.SetValue(colour)
@@ -86,18 +91,8 @@ class ColourButton(wx.Button):
         on the button.
         """
 
-        import numpy as np
-
-        w, h = self.__size
-        data = np.zeros((w, h, 4), dtype=np.uint8)
-
-        data[:, :] = colour
-
-        if fw.wxversion() == fw.WX_PHOENIX:
-            self.__bmp = wx.Bitmap.FromBufferRGBA(w, h, data)
-        else:
-            self.__bmp = wx.BitmapFromBufferRGBA( w, h, data)
-
+        self.__data[:] = colour
+        self.__bmp     = wxbmp.toBitmap(self.__data)
 
         self.SetBitmapLabel(self.__bmp)
 
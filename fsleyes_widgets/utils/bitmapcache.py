@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+#
+# bitmapcache.py - A memory-bounded LRU cache for bitmaps.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`BitmapCache` class, a least-recently-used
+cache for ``numpy`` bitmaps, which is bounded by the total size (in bytes)
+of the cached bitmaps. The :func:`cacheKey` function can be used to
+generate cache keys from function arguments.
+"""
+
+
+import threading
+import collections
+
+
+def cacheKey(*args):
+    """Normalises the given arguments into a hashable tuple which can be used
+    as a :class:`BitmapCache` key - lists and arrays are converted into
+    tuples.
+    """
+
+    def normalise(value):
+        if hasattr(value, 'tolist'):
+            value = value.tolist()
+        if isinstance(value, (list, tuple)):
+            return tuple(normalise(v) for v in value)
+        return value
+
+    return normalise(args)
+
+
+class BitmapCache(object):
+    """A least-recently-used cache for ``numpy`` arrays, bounded by the total
+    number of bytes occupied by the cached arrays.
+
+
+    Arrays which are added to a ``BitmapCache`` are made read-only, so that
+    callers cannot corrupt cached entries. If a caller needs to modify a
+    bitmap which has been retrieved from the cache, it must make a copy.
+
+
+    When the total size of all cached arrays exceeds the byte budget, the
+    least recently used entries are evicted until the cache fits into the
+    budget again. Arrays which are larger than the budget are not cached.
+
+
+    The number of cache hits and misses are recorded - these, along with
+    other information, are available via the :meth:`stats` method.
+
+
+    A ``BitmapCache`` is thread-safe.
+    """
+
+
+    def __init__(self, maxBytes=33554432):
+        """Create a ``BitmapCache``.
+
+        :arg maxBytes: Byte budget - the maximum total size of all arrays in
+                       the cache. Defaults to 32 megabytes.
+        """
+
+        self.__lock     = threading.Lock()
+        self.__entries  = collections.OrderedDict()
+        self.__maxBytes = maxBytes
+        self.__nbytes   = 0
+        self.__hits     = 0
+        self.__misses   = 0
+
+
+    def __len__(self):
+        """Returns the number of entries in the cache. """
+        return len(self.__entries)
+
+
+    def __contains__(self, key):
+        """Returns ``True`` if the given key is in the cache, without
+        affecting the cache statistics or the LRU order.
+        """
+        return key in self.__entries
+
+
+    @property
+    def maxBytes(self):
+        """Returns the current byte budget. """
+        return self.__maxBytes
+
+
+    @maxBytes.setter
+    def maxBytes(self, maxBytes):
+        """Set the byte budget. If the cache currently exceeds the new budget,
+        the least recently used entries are evicted.
+        """
+        with self.__lock:
+            self.__maxBytes = maxBytes
+            self.__evict()
+
+
+    @property
+    def nbytes(self):
+        """Returns the total number of bytes occupied by all cached arrays.
+        """
+        return self.__nbytes
+
+
+    @property
+    def hits(self):
+        """Returns the number of cache hits. """
+        return self.__hits
+
+
+    @property
+    def misses(self):
+        """Returns the number of cache misses. """
+        return self.__misses
+
+
+    def stats(self):
+        """Returns a dictionary containing the following cache statistics:
+
+          - ``hits``:     Number of cache hits
+          - ``misses``:   Number of cache misses
+          - ``entries``:  Number of cached arrays
+          - ``nbytes``:   Total size of all cached arrays
+          - ``maxBytes``: The byte budget
+        """
+        with self.__lock:
+            return {'hits'     : self.__hits,
+                    'misses'   : self.__misses,
+                    'entries'  : len(self.__entries),
+                    'nbytes'   : self.__nbytes,
+                    'maxBytes' : self.__maxBytes}
+
+
+    def get(self, key, default=None):
+        """Returns the array associated with ``key``, or ``default`` if there
+        is no such array. A successful lookup marks the entry as the most
+        recently used.
+        """
+
+        with self.__lock:
+
+            bitmap = self.__entries.pop(key, None)
+
+            if bitmap is None:
+                self.__misses += 1
+                return default
+
+            self.__hits        += 1
+            self.__entries[key] = bitmap
+
+            return bitmap
+
+
+    def put(self, key, bitmap):
+        """Adds the given array to the cache. The array is made read-only.
+        If the array is larger than the byte budget, it is not cached.
+
+        :returns: The array.
+        """
+
+        bitmap.setflags(write=False)
+
+        with self.__lock:
+
+            old = self.__entries.pop(key, None)
+
+            if old is not None:
+                self.__nbytes -= old.nbytes
+
+            if bitmap.nbytes <= self.__maxBytes:
+                self.__entries[key]  = bitmap
+                self.__nbytes       += bitmap.nbytes
+                self.__evict()
+
+        return bitmap
+
+
+    def clear(self):
+        """Removes all entries from the cache, and resets the hit/miss
+        counters.
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__nbytes = 0
+            self.__hits   = 0
+            self.__misses = 0
+
+
+    def __evict(self):
+        """Evicts the least recently used entries until the cache fits
+        within the byte budget. Must be called with the lock held.
+        """
+        while self.__nbytes > self.__maxBytes and len(self.__entries) > 0:
+            _, bitmap      = self.__entries.popitem(last=False)
+            self.__nbytes -= bitmap.nbytes
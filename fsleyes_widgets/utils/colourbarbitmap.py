@@ -1,16 +1,165 @@
 #!/usr/bin/env python
 #
-# colourbarbitmap.py - A function which renders a colour bar using
-# matplotlib as an RGBA bitmap.
+# colourbarbitmap.py - Functions which render colour bars using matplotlib
+# as RGBA bitmaps.
 #
 # Author: Paul McCarthy <pauldmccarthy@gmail.com>
 #
-"""This module provides a single function, :func:`colourBarBitmap`, which uses
-:mod:`matplotlib` to plot a colour bar. The colour bar is rendered off-screen
-and returned as an RGBA bitmap.
+"""This module provides functions for rendering colour bars off-screen, as
+RGBA bitmaps. The main entry point is :func:`colourBarBitmap`, which uses
+:mod:`matplotlib` to plot a colour bar. The following functions and classes
+are available:
+
+ .. autosummary::
+    :nosignatures:
+
+    colourBarBitmap
+    colourBarBitmaps
+    colourBarFrames
+    ColourBarRenderer
+    colourBarCache
+    genColours
+    getColourLUT
+    enableDiskCache
+    disableDiskCache
+    diskCache
+
+
+Two rendering backends are available:
+
+ - ``'matplotlib'``: The colour bar is drawn as a :mod:`matplotlib` figure,
+   and rendered with the Agg backend. This is the default.
+
+ - ``'numpy'``: The colour bar gradient is written directly into a
+   ``numpy`` array from the :func:`genColours` lookup table, and the tick
+   and axis labels are rasterised with :func:`.textbitmap.rasteriseText`,
+   and blitted into place. This is much faster than the ``'matplotlib'``
+   backend, as no figure needs to be created.
+
+
+The ``'numpy'`` backend reproduces the layout of the ``'matplotlib'``
+backend, but it only approximates the anti-aliasing of the colour bar
+edges, and it positions text to the nearest pixel. The output of the two
+backends is therefore not identical - the difference between them is
+bounded by :data:`NUMPY_BACKEND_TOLERANCE`.
+
+
+Colour map lookup tables are generated by the :func:`getColourLUT` function,
+which caches them, so that they can be shared with other code.
+
+
+Rendered colour bars can be cached by passing ``cache=True`` to
+:func:`colourBarBitmap` - subsequent calls with identical arguments will
+return the cached bitmap. The cache is a :class:`.BitmapCache`, which can be
+accessed via the :func:`colourBarCache` function.
+
+
+Many colour bars can be rendered in parallel, in a pool of worker processes,
+with the :func:`colourBarBitmaps` function.
+
+
+Colour bars and colour map lookup tables can also be cached on disk, so
+that they can be shared between processes - see :func:`enableDiskCache`.
+When the disk cache is enabled, cached colour bars are loaded without
+importing :mod:`matplotlib`.
+
+
+The :class:`ColourBarRenderer` class can be used to efficiently re-render a
+colour bar when only its tick labels or axis label change. The
+:func:`colourBarFrames` function uses a ``ColourBarRenderer`` to efficiently
+render a sequence of colour bars, e.g. for a movie.
+"""
+
+
+import six
+
+import fsleyes_widgets.utils.bitmapcache as bmpcache
+import fsleyes_widgets.utils.diskcache   as dskcache
+import fsleyes_widgets.utils.figurepool  as figpool
+import fsleyes_widgets.utils.rgba        as rgba
+import fsleyes_widgets.utils.textbitmap  as textbmp
+
+
+NUMPY_BACKEND_TOLERANCE = 0.02
+"""Maximum fraction of pixels in a colour bar generated by the ``'numpy'``
+backend which may differ from the equivalent colour bar generated by the
+``'matplotlib'`` backend. Two pixels are considered to differ if any of
+their RGBA channels, after the RGB channels have been pre-multiplied by
+alpha, differ by more than ``16`` (out of ``255``). Differing pixels are
+located on the edges of the colour bar, and on the edges of text glyphs.
 """
 
 
+_cache = bmpcache.BitmapCache()
+"""The :class:`.BitmapCache` used by :func:`colourBarBitmap` to cache
+colour bars when it is called with ``cache=True``.
+"""
+
+
+_lutCache = bmpcache.BitmapCache(maxBytes=4194304)
+"""The :class:`.BitmapCache` used by :func:`getColourLUT` to cache colour
+map lookup tables.
+"""
+
+
+_diskCache = None
+"""A :class:`.DiskCache` used by :func:`colourBarBitmap` and
+:func:`getColourLUT`, if enabled via :func:`enableDiskCache`.
+"""
+
+
+def colourBarCache():
+    """Returns the :class:`.BitmapCache` which is used by
+    :func:`colourBarBitmap` to cache colour bars. The cache can be used to
+    adjust the byte budget, to query hit/miss statistics, or to clear the
+    cache.
+    """
+    return _cache
+
+
+def enableDiskCache(directory, maxBytes=268435456):
+    """Enables a persistent cache of colour bars and colour map lookup
+    tables, stored as ``.npy`` files in the given directory.
+
+    When the disk cache is enabled, all colour bars generated by
+    :func:`colourBarBitmap` and all lookup tables generated by
+    :func:`getColourLUT` are saved to the cache, and subsequent calls with
+    the same arguments, from any process, will load them from the cache.
+    Cached arrays are memory-mapped, and are read-only.
+
+    Entries are keyed by a hash of the function arguments, and of the
+    :mod:`matplotlib` version. Colour bars and lookup tables are only
+    cached when ``cmap`` and ``negCmap`` are the names of built-in
+    :mod:`matplotlib` colour maps - colour maps which are registered at
+    run time may change between processes, so are never cached on disk.
+
+    :arg directory: Cache directory. Created if it does not exist. Multiple
+                    processes may use the same directory concurrently.
+
+    :arg maxBytes:  Byte budget for the cache directory. Defaults to 256
+                    megabytes.
+    """
+    global _diskCache
+    _diskCache = dskcache.DiskCache(directory,
+                                    maxBytes=maxBytes,
+                                    version=_matplotlibVersion())
+
+
+def disableDiskCache():
+    """Disables the disk cache, if it has been enabled via
+    :func:`enableDiskCache`. Files in the cache directory are not deleted.
+    """
+    global _diskCache
+    _diskCache = None
+
+
+def diskCache():
+    """Returns the :class:`.DiskCache` which has been enabled via
+    :func:`enableDiskCache`, or ``None`` if the disk cache is not enabled.
+    """
+    return _diskCache
+
+
 def colourBarBitmap(cmap,
                     width,
                     height,
@@ -26,7 +175,9 @@ def colourBarBitmap(cmap,
                     alpha=1.0,
                     fontsize=10,
                     bgColour=None,
-                    textColour='#ffffff'):
+                    textColour='#ffffff',
+                    backend='matplotlib',
+                    cache=False):
     """Plots a colour bar using :mod:`matplotlib`.
 
 
@@ -42,7 +193,8 @@ def colourBarBitmap(cmap,
        :align: center
 
 
-    :arg cmap:         Name of a registered :mod:`matplotlib` colour map.
+    :arg cmap:         Name of a registered :mod:`matplotlib` colour map,
+                       or a ``matplotlib.colors.Colormap`` instance.
 
     :arg width:        Colour bar width in pixels.
 
@@ -79,13 +231,532 @@ def colourBarBitmap(cmap,
 
     :arg textColour:   Label colour - can be any colour specification that
                        is accepted by :mod:`matplotlib`.
+
+    :arg backend:      Rendering backend - either ``'matplotlib'`` (the
+                       default) or ``'numpy'``.
+
+    :arg cache:        If ``True``, the colour bar is cached (see
+                       :func:`colourBarCache`), or a previously cached colour
+                       bar is returned. Cached colour bars are read-only.
+                       Defaults to ``False``.
+
+    If the disk cache has been enabled (see :func:`enableDiskCache`), the
+    colour bar is saved to, or loaded from, the disk cache, and is
+    read-only.
+    """
+
+    if cache:
+
+        if negCmap is None: negKey = None
+        else:               negKey = _cmapKey(negCmap)
+
+        key = bmpcache.cacheKey(_cmapKey(cmap),
+                                width,
+                                height,
+                                cmapResolution,
+                                negKey,
+                                invert,
+                                ticks,
+                                ticklabels,
+                                tickalign,
+                                label,
+                                orientation,
+                                labelside,
+                                alpha,
+                                fontsize,
+                                bgColour,
+                                textColour,
+                                backend)
+
+        bitmap = _cache.get(key)
+
+        if bitmap is None:
+            bitmap = colourBarBitmap(cmap,
+                                     width,
+                                     height,
+                                     cmapResolution=cmapResolution,
+                                     negCmap=negCmap,
+                                     invert=invert,
+                                     ticks=ticks,
+                                     ticklabels=ticklabels,
+                                     tickalign=tickalign,
+                                     label=label,
+                                     orientation=orientation,
+                                     labelside=labelside,
+                                     alpha=alpha,
+                                     fontsize=fontsize,
+                                     bgColour=bgColour,
+                                     textColour=textColour,
+                                     backend=backend)
+            bitmap = _cache.put(key, bitmap)
+
+        return bitmap
+
+    diskKey = None
+
+    if _diskCache is not None and _isBuiltinCmap(cmap, negCmap):
+        diskKey = _diskCacheKey('colourBarBitmap',
+                                cmap,
+                                width,
+                                height,
+                                cmapResolution,
+                                negCmap,
+                                invert,
+                                ticks,
+                                ticklabels,
+                                tickalign,
+                                label,
+                                orientation,
+                                labelside,
+                                alpha,
+                                fontsize,
+                                bgColour,
+                                textColour,
+                                backend)
+
+    if diskKey is not None:
+        bitmap = _diskCache.get(diskKey)
+        if bitmap is not None:
+            return bitmap
+
+    if backend not in ['matplotlib', 'numpy']:
+        raise ValueError('backend must be matplotlib or '
+                         'numpy ({})'.format(backend))
+
+    width, height, labelside = _orient(width, height, orientation, labelside)
+    data = _colourData(cmap, cmapResolution, negCmap, invert, alpha)
+
+    if backend == 'matplotlib': render = _renderMatplotlib
+    else:                       render = _renderNumpy
+
+    # The renderers draw into a (row, column)
+    # view of the output array, which is in
+    # (column, row) order, and rotated for
+    # vertical colour bars.
+    bitmap, view = _allocateBitmap(width, height, orientation)
+
+    render(view,
+           data,
+           ticks,
+           ticklabels,
+           tickalign,
+           label,
+           labelside,
+           fontsize,
+           bgColour,
+           textColour)
+
+    if diskKey is not None:
+        bitmap = _diskCache.put(diskKey, bitmap)
+
+    return bitmap
+
+
+def colourBarBitmaps(specs, workers=None):
+    """Renders a batch of colour bars with :func:`colourBarBitmap`.
+
+    If ``workers > 1``, the colour bars are rendered in parallel in a
+    ``concurrent.futures.ProcessPoolExecutor``. Where possible (Python 3.8
+    and newer), the worker processes write their results into a block of
+    shared memory, rather than pickling them and sending them back to the
+    calling process.
+
+    If ``workers == 1``, or if ``concurrent.futures`` is not available (it
+    is not part of the Python 2 standard library), the colour bars are
+    rendered serially in the calling process. The result is identical to
+    that of parallel rendering.
+
+    :arg specs:   Sequence of dictionaries, each containing arguments to be
+                  passed to :func:`colourBarBitmap`. Each dictionary must
+                  contain ``cmap``, ``width`` and ``height`` entries.
+
+    :arg workers: Number of worker processes. Defaults to the number of
+                  CPUs.
+
+    :returns:     A list containing the rendered colour bars, in the same
+                  order as ``specs``.
+    """
+
+    import multiprocessing as mp
+
+    specs = list(specs)
+
+    if workers is None:
+        workers = mp.cpu_count()
+
+    workers = min(workers, len(specs))
+
+    try:
+        import concurrent.futures as futures
+    except ImportError:
+        futures = None
+
+    if workers <= 1 or futures is None:
+        return [colourBarBitmap(**spec) for spec in specs]
+
+    import numpy as np
+
+    try:
+        import multiprocessing.shared_memory as shm
+    except ImportError:
+        shm = None
+
+    # Shared memory not available - the
+    # results are pickled and returned
+    if shm is None:
+        with futures.ProcessPoolExecutor(workers) as pool:
+            return list(pool.map(_renderBitmap, specs))
+
+    # Otherwise we allocate a block of shared
+    # memory which is large enough to store
+    # all of the colour bars, and the workers
+    # copy their results straight into it.
+    shapes  = [(spec['width'], spec['height'], 4) for spec in specs]
+    sizes   = [int(np.prod(shape)) for shape in shapes]
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(int)
+    block   = shm.SharedMemory(create=True, size=max(1, sum(sizes)))
+
+    try:
+        with futures.ProcessPoolExecutor(workers) as pool:
+            jobs = [pool.submit(_renderShared, block.name, off, shape, spec)
+                    for off, shape, spec in zip(offsets, shapes, specs)]
+
+            # re-raise any errors
+            for job in jobs:
+                job.result()
+
+        buf     = np.ndarray((sum(sizes),), dtype=np.uint8, buffer=block.buf)
+        bitmaps = [np.array(buf[off:off + size].reshape(shape))
+                   for off, size, shape in zip(offsets, sizes, shapes)]
+
+        # The buffer view must be
+        # released before the block
+        # of memory can be closed.
+        del buf
+
+    finally:
+        block.close()
+        block.unlink()
+
+    return bitmaps
+
+
+def _renderBitmap(spec):
+    """Used by :func:`colourBarBitmaps`. Calls :func:`colourBarBitmap` with
+    the arguments in the given ``spec`` dictionary, and returns the result.
     """
+    return colourBarBitmap(**spec)
 
-    # These imports are expensive, so we're
-    # importing at the function level.
-    import numpy                           as np
-    import matplotlib.backends.backend_agg as mplagg
-    import matplotlib.figure               as mplfig
+
+def _renderShared(name, offset, shape, spec):
+    """Used by :func:`colourBarBitmaps`. Calls :func:`colourBarBitmap` with
+    the arguments in the given ``spec`` dictionary, and copies the result
+    into a block of shared memory.
+
+    :arg name:   Name of the ``multiprocessing.shared_memory.SharedMemory``
+                 block.
+
+    :arg offset: Offset, in bytes, into the shared memory block at which
+                 the result is to be stored.
+
+    :arg shape:  Expected shape of the result.
+
+    :arg spec:   Arguments to pass to :func:`colourBarBitmap`.
+    """
+
+    import numpy                         as np
+    import multiprocessing.shared_memory as shm
+
+    bitmap = colourBarBitmap(**spec)
+
+    if bitmap.shape != tuple(shape):
+        raise ValueError('Unexpected colour bar shape: {} != {}'.format(
+            bitmap.shape, shape))
+
+    block = shm.SharedMemory(name=name)
+
+    try:
+        out    = np.ndarray(shape,
+                            dtype=np.uint8,
+                            buffer=block.buf,
+                            offset=offset)
+        out[:] = bitmap
+        del out
+
+    finally:
+        block.close()
+
+
+class ColourBarRenderer(object):
+    """The ``ColourBarRenderer`` renders a colour bar, and re-renders it
+    incrementally when its properties change. It produces the same output
+    as the :func:`colourBarBitmap` function with ``backend='numpy'``.
+
+
+    A ``ColourBarRenderer`` retains the rendered colour bar gradient, and
+    its layout. When only the text properties (``ticks``, ``ticklabels``,
+    ``tickalign``, ``label``, ``fontsize`` or ``textColour``) are changed,
+    and the layout is unaffected, only the text is re-drawn. This makes it
+    suitable for situations where the colour bar labels need to be updated
+    interactively, e.g. while the user is dragging a display range slider::
+
+        renderer = ColourBarRenderer('hot', 300, 50,
+                                     orientation='horizontal',
+                                     ticks=[0, 1],
+                                     ticklabels=['0', '100'])
+        bitmap   = renderer.render()
+
+        # Only the tick labels are re-drawn
+        bitmap   = renderer.update(ticklabels=['0', '150'])
+
+
+    The gradient is re-generated if any other property is changed, or if
+    the layout changes - this will happen if tick labels, or the axis label,
+    are added or removed, or if the ticks are moved outside of the range
+    ``[0, 1]``.
+    """
+
+
+    def __init__(self, cmap, width, height, **kwargs):
+        """Create a ``ColourBarRenderer``. All arguments are passed to
+        :meth:`set` - see :func:`colourBarBitmap` for details on the
+        accepted arguments. The ``backend`` and ``cache`` arguments are not
+        accepted.
+        """
+
+        self.__props = {'cmap'           : cmap,
+                        'width'          : width,
+                        'height'         : height,
+                        'cmapResolution' : 256,
+                        'negCmap'        : None,
+                        'invert'         : False,
+                        'ticks'          : None,
+                        'ticklabels'     : None,
+                        'tickalign'      : None,
+                        'label'          : None,
+                        'orientation'    : 'vertical',
+                        'labelside'      : 'top',
+                        'alpha'          : 1.0,
+                        'fontsize'       : 10,
+                        'bgColour'       : None,
+                        'textColour'     : '#ffffff'}
+
+        # The colour bar background and
+        # gradient, the layout of the colour
+        # bar, and the same with text drawn
+        # on top.
+        self.__data   = None
+        self.__base   = None
+        self.__layout = None
+        self.__canvas = None
+
+        # The rows of the canvas which currently
+        # contain text, and whether the text
+        # needs to be re-drawn.
+        self.__textRows  = None
+        self.__textDirty = True
+
+        self.set(**kwargs)
+
+
+    def update(self, **kwargs):
+        """Update the colour bar properties, and return the re-rendered
+        colour bar. Equivalent to calling :meth:`set` followed by
+        :meth:`render`.
+        """
+        self.set(**kwargs)
+        return self.render()
+
+
+    def set(self, **kwargs):
+        """Update the colour bar properties, without re-rendering the colour
+        bar. Any argument that is accepted by :func:`colourBarBitmap`
+        (except for ``backend`` and ``cache``) may be passed in.
+        """
+
+        textProps = ['ticks',
+                     'ticklabels',
+                     'tickalign',
+                     'label',
+                     'fontsize',
+                     'textColour']
+
+        for name, value in kwargs.items():
+
+            if name not in self.__props:
+                raise ValueError('Unknown colour bar '
+                                 'property: {}'.format(name))
+
+            if name in textProps:
+                self.__textDirty = True
+            else:
+                self.__base = None
+
+            self.__props[name] = value
+
+
+    def render(self, out=None):
+        """Renders the colour bar, if necessary, and returns it.
+
+        :arg out: Optional ``numpy.uint8`` array to store the colour bar in.
+                  Must have the shape of the array that would otherwise be
+                  returned. If not provided, a new array is allocated.
+
+        :returns: A ``numpy.uint8`` array containing the colour bar, in the
+                  same format as is returned by :func:`colourBarBitmap`.
+        """
+
+        p = self.__props
+
+        width, height, labelside = _orient(p['width'],
+                                           p['height'],
+                                           p['orientation'],
+                                           p['labelside'])
+
+        if self.__base is not None:
+            data   = self.__data
+            layout = _numpyLayout((height, width),
+                                  data.shape[1],
+                                  p['ticks'],
+                                  p['ticklabels'],
+                                  p['label'],
+                                  labelside,
+                                  p['fontsize'])
+
+            # The layout has changed, so the
+            # gradient needs to be re-drawn
+            if layout != self.__layout:
+                self.__base = None
+
+        # Draw the background and colour bar
+        # gradient. Text will be drawn below.
+        if self.__base is None:
+
+            import numpy as np
+
+            data   = _colourData(p['cmap'],
+                                 p['cmapResolution'],
+                                 p['negCmap'],
+                                 p['invert'],
+                                 p['alpha'])
+            layout = _numpyLayout((height, width),
+                                  data.shape[1],
+                                  p['ticks'],
+                                  p['ticklabels'],
+                                  p['label'],
+                                  labelside,
+                                  p['fontsize'])
+            base   = np.empty((height, width, 4), dtype=np.uint8)
+
+            _numpyColourBar(base, data, layout, p['bgColour'])
+
+            self.__data      = data
+            self.__layout    = layout
+            self.__base      = base
+            self.__canvas    = base.copy()
+            self.__textRows  = None
+            self.__textDirty = True
+
+        # Erase the old text by restoring the
+        # rows that it covered from the base
+        # image, then draw the new text.
+        if self.__textDirty:
+
+            if self.__textRows is not None:
+                r0, r1 = self.__textRows
+                self.__canvas[r0:r1] = self.__base[r0:r1]
+
+            self.__textRows  = _numpyText(self.__canvas,
+                                          self.__layout,
+                                          self.__data.shape[1],
+                                          p['ticks'],
+                                          p['ticklabels'],
+                                          p['tickalign'],
+                                          p['label'],
+                                          labelside,
+                                          p['fontsize'],
+                                          p['textColour'])
+            self.__textDirty = False
+
+        if out is None:
+            out, view = _allocateBitmap(width, height, p['orientation'])
+        else:
+            view = _renderView(out, p['orientation'])
+
+        if view.shape != self.__canvas.shape:
+            raise ValueError('Output array has wrong shape: {}'.format(
+                out.shape))
+
+        view[:] = self.__canvas
+
+        return out
+
+
+def colourBarFrames(cmap, width, height, tickSequence, copy=False, **kwargs):
+    """Generator which renders a sequence of colour bars, e.g. for a movie,
+    in which only the ticks and labels change from frame to frame.
+
+    The colour bars are rendered with a :class:`ColourBarRenderer`, so the
+    colour bar gradient is only generated once, and each frame only
+    requires the text to be re-drawn. Frames are identical to those
+    generated by :func:`colourBarBitmap` with ``backend='numpy'``.
+
+    By default, every frame is rendered into the same output array, so a
+    frame is only valid until the next frame is generated. Pass
+    ``copy=True`` to receive a new array for each frame.
+
+    :arg cmap:         Name of a registered :mod:`matplotlib` colour map.
+
+    :arg width:        Colour bar width in pixels.
+
+    :arg height:       Colour bar height in pixels.
+
+    :arg tickSequence: Sequence of frames. Each frame is either a tuple
+                       containing the ``(ticks, ticklabels)`` for the frame,
+                       or a dictionary containing any properties accepted by
+                       :meth:`ColourBarRenderer.set`.
+
+    :arg copy:         If ``True``, a new array is yielded for each frame.
+                       Otherwise (the default), the same array is re-used
+                       for every frame.
+
+    All other arguments are passed through to the
+    :class:`ColourBarRenderer`.
+
+    :returns:          A generator which yields one ``numpy.uint8`` RGBA
+                       array for each frame, in the same format as is
+                       returned by :func:`colourBarBitmap`.
+    """
+
+    renderer = ColourBarRenderer(cmap, width, height, **kwargs)
+    out      = None
+
+    for frame in tickSequence:
+
+        if isinstance(frame, dict):
+            renderer.set(**frame)
+        else:
+            ticks, ticklabels = frame
+            renderer.set(ticks=ticks, ticklabels=ticklabels)
+
+        if copy:
+            yield renderer.render()
+        else:
+            out = renderer.render(out)
+            yield out
+
+
+def _orient(width, height, orientation, labelside):
+    """Used by :func:`colourBarBitmap` and :class:`ColourBarRenderer`.
+    Validates the ``orientation`` and ``labelside`` arguments. Vertical
+    colour bars are rendered horizontally, and then rotated, so the width
+    and height of vertical colour bars are swapped.
+
+    :returns: A tuple containing the width and height of the horizontal
+              colour bar to be rendered, and the side (``'top'`` or
+              ``'bottom'``) of the horizontal colour bar on which to draw
+              its labels.
+    """
 
     if orientation not in ['vertical', 'horizontal']:
         raise ValueError('orientation must be vertical or '
@@ -109,61 +780,331 @@ def colourBarBitmap(cmap,
         if labelside == 'left': labelside = 'top'
         else:                   labelside = 'bottom'
 
-    dpi   = 96.0
-    ncols = cmapResolution
-    data  = genColours(cmap, ncols, invert, alpha)
+    return width, height, labelside
+
+
+def _colourData(cmap, cmapResolution, negCmap, invert, alpha):
+    """Used by :func:`colourBarBitmap` and :class:`ColourBarRenderer`.
+    Generates the RGBA data for a colour bar with :func:`genColours`,
+    optionally with a negative colour map.
+    """
+
+    import numpy as np
+
+    data = genColours(cmap, cmapResolution, invert, alpha)
 
     if negCmap is not None:
-        ndata  = genColours(negCmap, ncols, not invert, alpha)
-        data   = np.concatenate((ndata, data), axis=1)
-        ncols *= 2
+        ndata = genColours(negCmap, cmapResolution, not invert, alpha)
+        data  = np.concatenate((ndata, data), axis=1)
 
-    fig    = mplfig.Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
-    canvas = mplagg.FigureCanvasAgg(fig)
-    ax     = fig.add_subplot(111)
+    return data
 
-    if bgColour is not None:
-        fig.patch.set_facecolor(bgColour)
-    else:
-        fig.patch.set_alpha(0)
 
-    # draw the colour bar
-    ax.imshow(data,
-              aspect='auto',
-              origin='lower',
-              interpolation='nearest')
+def _diskCacheKey(*args):
+    """Used by :func:`colourBarBitmap` and :func:`getColourLUT`. Normalises
+    the given arguments with :func:`.bitmapcache.cacheKey`. Returns the
+    normalised arguments if they are suitable for use as a
+    :class:`.DiskCache` key (i.e. they only contain strings, numbers, and
+    ``None``), or ``None`` otherwise.
+    """
 
-    ax.set_xlim((0, ncols - 1))
+    import numbers
 
-    ax.set_yticks([])
-    ax.tick_params(colors=textColour, labelsize=fontsize, length=0)
+    def valid(value):
+        if isinstance(value, tuple):
+            return all([valid(v) for v in value])
+        return value is None or \
+            isinstance(value, six.string_types + (numbers.Number, ))
 
-    if labelside == 'top':
-        ax.xaxis.tick_top()
-        ax.xaxis.set_label_position('top')
-        va = 'top'
-    else:
-        ax.xaxis.tick_bottom()
-        ax.xaxis.set_label_position('bottom')
-        va = 'bottom'
+    args = bmpcache.cacheKey(*args)
 
-    if label is not None:
-        ax.set_xlabel(label,
-                      fontsize=fontsize,
-                      color=textColour,
-                      va=va)
-        label = ax.xaxis.get_label()
+    if valid(args): return args
+    else:           return None
 
-    if ticks is None or ticklabels is None:
-        ax.set_xticks([])
-    else:
 
-        ax.set_xticks(np.array(ticks) * ncols)
-        ax.set_xticklabels(ticklabels)
-        ticklabels = ax.xaxis.get_ticklabels()
+def _isBuiltinCmap(*cmaps):
+    """Used by :func:`colourBarBitmap` and :func:`getColourLUT`. Returns
+    ``True`` if all of the given colour maps (ignoring ``None``) are the
+    names of built-in :mod:`matplotlib` colour maps, ``False`` otherwise.
+
+    If :mod:`matplotlib.cm` has not been imported, no colour maps can have
+    been registered, so all names are assumed to refer to built-in colour
+    maps. This allows colour bars to be loaded from the disk cache without
+    importing :mod:`matplotlib`.
+    """
+
+    import sys
+
+    cmaps = [c for c in cmaps if c is not None]
+
+    if not all([isinstance(c, six.string_types) for c in cmaps]):
+        return False
+
+    if 'matplotlib.cm' not in sys.modules:
+        return True
+
+    import matplotlib.cm as cm
+
+    # matplotlib >= 3.6 keeps track of its
+    # built-in colour maps, but for older
+    # versions we have to generate the list
+    builtins = getattr(getattr(cm, '_colormaps', None),
+                       '_builtin_cmaps',
+                       None)
+
+    if builtins is None:
+        import matplotlib._cm        as mplcm
+        import matplotlib._cm_listed as mplcmlisted
+        builtins  = set(mplcm.datad) | set(mplcmlisted.cmaps)
+        builtins |= set([b + '_r' for b in builtins])
+
+    return all([c in builtins for c in cmaps])
+
+
+def _cmapKey(cmap):
+    """Used by :func:`colourBarBitmap` and :func:`getColourLUT`. Returns a
+    hashable key which identifies the given colour map.
+
+    ``Colormap`` objects cannot be hashed, and a colour map name may be
+    re-registered with a different colour map, so neither can be used as a
+    cache key. Instead, colour maps are identified by the ``Colormap``
+    object that is registered under their name (see :func:`_lookupCmap`).
+    """
+    return _CmapKey(_lookupCmap(cmap))
+
+
+def _lookupCmap(cmap):
+    """Used by :func:`_cmapKey`. Returns the ``matplotlib.colors.Colormap``
+    which is registered under the given name. If ``cmap`` is already a
+    ``Colormap``, it is returned.
+    """
+
+    import matplotlib.cm as cm
+
+    if not isinstance(cmap, six.string_types):
+        return cmap
+
+    # matplotlib >= 3.6 returns a copy of
+    # registered colour maps, so we look
+    # them up in the registry directly.
+    registry = getattr(getattr(cm, '_colormaps', None), '_cmaps', {})
+
+    if cmap in registry: return registry[cmap]
+    else:                return cm.get_cmap(cmap)
+
+
+class _CmapKey(object):
+    """Used by :func:`_cmapKey`. A hashable wrapper around a
+    ``matplotlib.colors.Colormap``, which is compared by identity. A
+    reference to the colour map is retained, so that its ``id`` cannot be
+    re-used by another colour map while the key is in use.
+    """
+
+    def __init__(self, cmap):
+        """Create a ``_CmapKey``.
+
+        :arg cmap: A ``matplotlib.colors.Colormap``.
+        """
+        self.cmap = cmap
+
+    def __hash__(self):
+        return id(self.cmap)
+
+    def __eq__(self, other):
+        return isinstance(other, _CmapKey) and self.cmap is other.cmap
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def _matplotlibVersion():
+    """Used by :func:`enableDiskCache`. Returns the installed
+    :mod:`matplotlib` version, avoiding importing :mod:`matplotlib` where
+    possible.
+    """
+
+    try:
+        import importlib.metadata as metadata
+        return metadata.version('matplotlib')
+
+    except Exception:
+        import matplotlib as mpl
+        return mpl.__version__
+
+
+def _renderMatplotlib(out,
+                      data,
+                      ticks,
+                      ticklabels,
+                      tickalign,
+                      label,
+                      labelside,
+                      fontsize,
+                      bgColour,
+                      textColour):
+    """Used by :func:`colourBarBitmap`. Renders a horizontal colour bar with
+    :mod:`matplotlib`.
+
+    :arg out:  ``numpy.uint8`` array of shape
+               :math:`height \\times width \\times 4`, into which the
+               colour bar is rendered.
+
+    :arg data: RGBA colour bar data, as generated by :func:`genColours`.
+
+    See :func:`colourBarBitmap` for details on the other arguments.
+    """
+
+    import numpy as np
+
+    height, width = out.shape[:2]
+
+    with figpool.pooledFigure(width, height) as (fig, canvas):
+
+        ncols = data.shape[1]
+        ax    = fig.add_subplot(111)
+
+        if bgColour is not None:
+            fig.patch.set_facecolor(bgColour)
+        else:
+            fig.patch.set_alpha(0)
+
+        # draw the colour bar
+        ax.imshow(data,
+                  aspect='auto',
+                  origin='lower',
+                  interpolation='nearest')
+
+        ax.set_xlim((0, ncols - 1))
+
+        ax.set_yticks([])
+        ax.tick_params(colors=textColour, labelsize=fontsize, length=0)
+
+        if labelside == 'top':
+            ax.xaxis.tick_top()
+            ax.xaxis.set_label_position('top')
+            va = 'top'
+        else:
+            ax.xaxis.tick_bottom()
+            ax.xaxis.set_label_position('bottom')
+            va = 'bottom'
+
+        if label is not None:
+            ax.set_xlabel(label,
+                          fontsize=fontsize,
+                          color=textColour,
+                          va=va)
+            label = ax.xaxis.get_label()
+
+        if ticks is None or ticklabels is None:
+            ax.set_xticks([])
+        else:
+
+            ax.set_xticks(np.array(ticks) * ncols)
+            ax.set_xticklabels(ticklabels)
+            ticklabels = ax.xaxis.get_ticklabels()
+
+        # Resize the colour bar to make
+        # space for the ticks and labels
+        left, right, bottom, top = _axesBounds((height, width),
+                                               ticklabels,
+                                               label,
+                                               labelside,
+                                               fontsize)
+
+        fig.subplots_adjust(left=left, right=right, bottom=bottom, top=top)
+
+        # Divide the vertical height between the
+        # colour bar, the label, and the tick labels.
+        if label is not None:
+
+            # I don't understand why, but I have
+            # to set va to the opposite of what
+            # I would have thought.
+            if labelside == 'top':
+                label.set_va('bottom')
+                label.set_position((0.5, 1.0))
+            else:
+                label.set_va('top')
+                label.set_position((0.5, 0))
+
+        # Adjust tick label horizontal alignment. This
+        # must be done *after* calling tick_top/tick_bottom,
+        # as I think the label objects get recreated.
+        if ticklabels is not None and tickalign is not None:
+            for label, align in zip(ticklabels, tickalign):
+                label.set_horizontalalignment(align)
+
+        canvas.draw()
+
+        # Copy the RGBA canvas buffer
+        # straight into the output array
+        out[:] = figpool.canvasToArray(canvas)
+
+
+def _renderNumpy(bitmap,
+                 data,
+                 ticks,
+                 ticklabels,
+                 tickalign,
+                 label,
+                 labelside,
+                 fontsize,
+                 bgColour,
+                 textColour):
+    """Used by :func:`colourBarBitmap`. Renders a horizontal colour bar
+    directly into a ``numpy`` array, using the same layout as
+    :func:`_renderMatplotlib`.
+
+    :arg bitmap: ``numpy.uint8`` array of shape
+                 :math:`height \\times width \\times 4`, into which the
+                 colour bar is rendered.
+
+    :arg data:   RGBA colour bar data, as generated by :func:`genColours`.
+
+    See :func:`colourBarBitmap` for details on the other arguments.
+    """
+
+    layout = _numpyLayout(bitmap.shape[:2],
+                          data.shape[1],
+                          ticks,
+                          ticklabels,
+                          label,
+                          labelside,
+                          fontsize)
+
+    _numpyColourBar(bitmap, data, layout, bgColour)
+    _numpyText(bitmap,
+               layout,
+               data.shape[1],
+               ticks,
+               ticklabels,
+               tickalign,
+               label,
+               labelside,
+               fontsize,
+               textColour)
+
+
+def _axesBounds(shape, ticklabels, label, labelside, fontsize):
+    """Used by :func:`_renderMatplotlib` and :func:`_numpyLayout`.
+    Calculates the bounds of the colour bar axes, as figure fractions, and
+    makes sure that the colour bar is large enough to contain them.
+
+    :arg shape: ``(height, width)`` of the bitmap.
+
+    See :func:`colourBarBitmap` for details on the other arguments.
+
+    :returns:   A tuple containing the ``(left, right, bottom, top)``
+                axes bounds, suitable for passing to
+                ``matplotlib.figure.Figure.subplots_adjust``.
+
+    :raises:    A ``ValueError`` if the colour bar is too small to fit
+                the axes and labels - this is the same error that
+                ``subplots_adjust`` would raise.
+    """
+
+    height, width = shape
 
-    # Resize the colour bar to make
-    # space for the ticks and labels
     wpad        = 5 / float(width)
     hpad        = 5 / float(height)
     totalHeight = 1.0
@@ -175,72 +1116,378 @@ def colourBarBitmap(cmap,
     if labelside == 'top': bottom, top = 0, totalHeight
     else:                  bottom, top = 1 - totalHeight, 1
 
-    fig.subplots_adjust(
-        left=wpad,
-        right=1.0 - wpad,
-        bottom=bottom + hpad,
-        top=top - hpad)
+    left, right, bottom, top = wpad, 1.0 - wpad, bottom + hpad, top - hpad
+
+    if left   >= right: raise ValueError('left cannot be >= right')
+    if bottom >= top:   raise ValueError('bottom cannot be >= top')
+
+    return left, right, bottom, top
+
+
+def _numpyLayout(shape, ncols, ticks, ticklabels, label, labelside, fontsize):
+    """Used by :func:`_renderNumpy` and :class:`ColourBarRenderer`.
+    Calculates the bounds of a horizontal colour bar, replicating the
+    ``fig.subplots_adjust`` call in :func:`_renderMatplotlib`.
+
+    :arg shape: ``(height, width)`` of the bitmap.
+
+    :arg ncols: Number of colours in the colour bar data.
+
+    See :func:`colourBarBitmap` for details on the other arguments.
+
+    :returns:   A tuple containing the ``(top, bottom, left, right)``
+                colour bar bounds, in pixels from the top-left corner,
+                and the ``(xmin, xmax)`` horizontal axis limits.
+
+    :raises:    A ``ValueError`` if the colour bar is too small (see
+                :func:`_axesBounds`).
+    """
+
+    height, width = shape
+
+    if ticks is None or ticklabels is None:
+        ticklabels = None
+
+    _axesBounds(shape, ticklabels, label, labelside, fontsize)
+
+    textHeight  = fontsize + 6
+    totalHeight = height
+    left        = 5
+    right       = width - 5
+
+    if label      is not None: totalHeight -= textHeight
+    if ticklabels is not None: totalHeight -= textHeight
+
+    if labelside == 'top':
+        top    = height - totalHeight + 5
+        bottom = height - 5
+    else:
+        top    = 5
+        bottom = totalHeight - 5
+
+    # The horizontal axis limits - matplotlib
+    # expands the limits to include all ticks.
+    xmin = 0
+    xmax = ncols - 1
+
+    if ticklabels is not None and len(ticks) > 0:
+        xmin = min(xmin, min(ticks) * ncols)
+        xmax = max(xmax, max(ticks) * ncols)
+
+    return (top, bottom, left, right, xmin, xmax)
+
+
+def _numpyColourBar(bitmap, data, layout, bgColour):
+    """Used by :func:`_renderNumpy` and :class:`ColourBarRenderer`. Fills
+    the ``bitmap`` with the background colour, and draws the colour bar
+    gradient and border into it.
+
+    :arg bitmap: ``numpy.uint8`` array of shape
+                 :math:`height \\times width \\times 4`.
+
+    :arg data:   RGBA colour bar data, as generated by :func:`genColours`.
+
+    :arg layout: Colour bar layout, as returned by :func:`_numpyLayout`.
+
+    :arg bgColour: Background colour.
+    """
+
+    import numpy             as np
+    import matplotlib        as mpl
+    import matplotlib.colors as mplcolors
+
+    dpi        = 96.0
+    ncols      = data.shape[1]
+    rcParams   = mpl.rcParams
+    toRGBA     = mplcolors.colorConverter.to_rgba
+    faceColour = toRGBA(rcParams['axes.facecolor'])
+    edgeColour = toRGBA(rcParams['axes.edgecolor'])
+    lineWidth  = rcParams['axes.linewidth'] * dpi / 72.0
+
+    top, bottom, left, right, xmin, xmax = layout
+
+    # matplotlib leaves the figure colour
+    # as white when it is made transparent
+    if bgColour is not None: bgColour = toRGBA(bgColour)
+    else:                    bgColour = (1, 1, 1, 0)
+
+    bitmap[:] = rgba.toUint8(bgColour)
+
+    # Fill the colour bar interior - each column
+    # of pixels is given the colour map entry
+    # which is nearest to the column centre.
+    # The colour bar is drawn on top of the
+    # axis background, as matplotlib does.
+    if right - left > 1 and bottom - top > 1:
+        cols  = np.arange(left + 1, right) + 0.5
+        cols  = xmin + (cols - left) / float(right - left) * (xmax - xmin)
+        idxs  = np.floor(cols + 0.5).astype(np.intp)
+        valid = (idxs >= 0) & (idxs < ncols)
+        cbar  = np.zeros((len(idxs), 4))
+
+        cbar[valid]  = data[0, idxs[valid], :]
+        cbar         = rgba.over(cbar, np.asarray(faceColour))
+
+        bitmap[top + 1:bottom, left + 1:right] = rgba.toUint8(cbar)
+
+    # Draw the colour bar border. The border lines
+    # are centred on pixels, so lines which are
+    # wider than one pixel partially cover the
+    # pixels on either side of them. This is
+    # most noticeable on thin colour bars.
+    if lineWidth > 0:
+
+        overflow = min(max((lineWidth - 1) / 2.0, 0), 1)
+        spill    = np.uint8(round(overflow * 255))
+
+        bitmap[top:bottom + 1, [left, right]] = rgba.toUint8(edgeColour)
+        bitmap[[top, bottom], left:right + 1] = rgba.toUint8(edgeColour)
+
+        if spill > 0:
+            rows = np.full((1, right - left + 1), spill, dtype=np.uint8)
+            cols = np.full((bottom - top + 1, 1), spill, dtype=np.uint8)
+
+            for y in (top - 1, top + 1, bottom - 1, bottom + 1):
+                rgba.blendMask(bitmap, rows, left, y, edgeColour)
+            for x in (left - 1, left + 1, right - 1, right + 1):
+                rgba.blendMask(bitmap, cols, x, top, edgeColour)
+
+
+def _numpyText(bitmap,
+               layout,
+               ncols,
+               ticks,
+               ticklabels,
+               tickalign,
+               label,
+               labelside,
+               fontsize,
+               textColour):
+    """Used by :func:`_renderNumpy` and :class:`ColourBarRenderer`. Draws
+    the tick labels and the axis label into the ``bitmap``.
+
+    :arg bitmap: ``numpy.uint8`` array of shape
+                 :math:`height \\times width \\times 4`.
+
+    :arg layout: Colour bar layout, as returned by :func:`_numpyLayout`.
+
+    :arg ncols:  Number of colours in the colour bar data.
+
+    See :func:`colourBarBitmap` for details on the other arguments.
+
+    :returns:    A tuple containing the first and last (exclusive) rows of
+                 the ``bitmap`` which were drawn into, or ``None`` if
+                 nothing was drawn.
+    """
+
+    import matplotlib        as mpl
+    import matplotlib.colors as mplcolors
+
+    dpi        = 96.0
+    rcParams   = mpl.rcParams
+    textColour = mplcolors.colorConverter.to_rgba(textColour)
+    tickPad    = rcParams['xtick.major.pad'] * dpi / 72.0
+    labelPad   = rcParams['axes.labelpad']   * dpi / 72.0
+    rows       = [bitmap.shape[0], 0]
+
+    top, bottom, left, right, xmin, xmax = layout
+
+    if ticks is None or ticklabels is None:
+        ticklabels = None
+
+    if ticklabels is not None and tickalign is None:
+        tickalign = ['center'] * len(ticklabels)
+
+    if ticklabels is not None:
+        for ta in tickalign:
+            if ta not in ('left', 'right', 'center'):
+                raise ValueError('tickalign must be left, right or '
+                                 'center ({})'.format(ta))
+
+    def toPixel(x):
+        return left + (right - left) * (x - xmin) / float(xmax - xmin)
+
+    # Text is positioned in the same way that
+    # matplotlib positions it - the height of
+    # each text bounding box is at least the
+    # height of the string "lp".
+    lph, lpd = textbmp.rasteriseText('lp', fontsize, dpi=dpi)[3:]
+
+    def drawText(text, x, y, ha, va):
+
+        mask, xoff, w, h, d = textbmp.rasteriseText(text, fontsize, dpi=dpi)
+        boxh = max(h, lph)
+        boxd = max(d, lpd)
+
+        if   ha == 'center': x = x - w / 2.0
+        elif ha == 'right':  x = x - w
+
+        # Find the baseline - y is either
+        # the top or bottom of the box
+        if va == 'top': y = y + boxh - boxd
+        else:           y = y - boxd
+
+        x = int(round(x + xoff))
+        y = int(round(y + d)) + 1
+
+        rgba.blendMask(bitmap, mask, x, y - mask.shape[0], textColour)
+
+        rows[0] = min(rows[0], y - mask.shape[0])
+        rows[1] = max(rows[1], y)
+
+        return boxh
+
+    if labelside == 'top': textEdge = top
+    else:                  textEdge = bottom
+
+    if ticklabels is not None:
+
+        tickHeight = 0
+
+        for tick, tlabel, ta in zip(ticks, ticklabels, tickalign):
+
+            x = toPixel(tick * ncols)
+
+            if labelside == 'top': h = drawText(tlabel, x, top    - tickPad,
+                                                ta, 'bottom')
+            else:                  h = drawText(tlabel, x, bottom + tickPad,
+                                                ta, 'top')
+
+            tickHeight = max(tickHeight, h)
+
+        if labelside == 'top': textEdge -= tickPad + tickHeight
+        else:                  textEdge += tickPad + tickHeight
 
-    # Divide the vertical height between the
-    # colour bar, the label, and the tick labels.
     if label is not None:
 
-        # I don't understand why, but I have
-        # to set va to the opposite of what
-        # I would have thought.
-        if labelside == 'top':
-            label.set_va('bottom')
-            label.set_position((0.5, 1.0))
-        else:
-            label.set_va('top')
-            label.set_position((0.5, 0))
+        x = left + (right - left) / 2.0
 
-    # Adjust tick label horizontal alignment. This
-    # must be done *after* calling tick_top/tick_bottom,
-    # as I think the label objects get recreated.
-    if ticklabels is not None and tickalign is not None:
-        for l, a in zip(ticklabels, tickalign):
-            l.set_horizontalalignment(a)
+        if labelside == 'top': drawText(label, x, textEdge - labelPad,
+                                        'center', 'bottom')
+        else:                  drawText(label, x, textEdge + labelPad,
+                                        'center', 'top')
 
-    canvas.draw()
+    rows = (max(rows[0], 0), min(rows[1], bitmap.shape[0]))
 
-    buf = canvas.tostring_argb()
-    ncols, nrows = canvas.get_width_height()
+    if rows[0] >= rows[1]: return None
+    else:                  return rows
 
-    bitmap = np.fromstring(buf, dtype=np.uint8)
-    bitmap = bitmap.reshape(nrows, ncols, 4).transpose([1, 0, 2])
 
-    # the bitmap is in argb order,
-    # but we want it in rgba
-    rgb = bitmap[:, :, 1:]
-    a   = bitmap[:, :, 0]
-    bitmap = np.dstack((rgb, a))
+def _allocateBitmap(width, height, orientation):
+    """Used by :func:`colourBarBitmap`. Allocates an array to store a colour
+    bar.
 
-    if orientation == 'vertical':
-        bitmap = np.flipud(bitmap.transpose([1, 0, 2]))
-        bitmap = np.rot90(bitmap, 2)
+    :arg width:       Width of the horizontal colour bar, in pixels.
 
-    return bitmap
+    :arg height:      Height of the horizontal colour bar, in pixels.
+
+    :arg orientation: ``'horizontal'`` or ``'vertical'``.
+
+    :returns:         A tuple containing:
+
+                       - A ``numpy.uint8`` array, in the layout that is
+                         returned by :func:`colourBarBitmap`.
+
+                       - A view into the array, of shape
+                         :math:`height \\times width \\times 4`, into which
+                         a horizontal colour bar can be rendered (see
+                         :func:`_renderView`).
+    """
+
+    import numpy as np
+
+    # Horizontal colour bars are stored in
+    # (column, row) order. Vertical colour
+    # bars are rendered horizontally, and
+    # then flipped left-right.
+    if orientation == 'horizontal':
+        bitmap = np.empty((width, height, 4), dtype=np.uint8)
+    else:
+        bitmap = np.empty((height, width, 4), dtype=np.uint8)
+
+    return bitmap, _renderView(bitmap, orientation)
+
+
+def _renderView(bitmap, orientation):
+    """Used by :func:`_allocateBitmap` and :class:`ColourBarRenderer`.
+    Returns a view into the given colour bar ``bitmap``, in the layout
+    that is returned by :func:`colourBarBitmap`, of shape :math:`height
+    \\times width \\times 4`, into which a horizontal colour bar can be
+    rendered.
+    """
+    if orientation == 'horizontal': return bitmap.transpose((1, 0, 2))
+    else:                           return bitmap[:, ::-1]
 
 
 def genColours(cmap, cmapResolution, invert, alpha):
     """Generate an array containing ``cmapResolution`` colours from the given
     colour map object/function.
+
+    The colours are retrieved via :func:`getColourLUT`, and are returned
+    as a read-only array of shape :math:`2 \\times cmapResolution \\times
+    4`, suitable for passing to ``matplotlib.axes.Axes.imshow``.
     """
 
-    import numpy         as np
-    import matplotlib.cm as cm
+    import numpy as np
+
+    lut = getColourLUT(cmap, cmapResolution, invert, alpha)
+
+    return np.broadcast_to(lut, (2,) + lut.shape)
+
+
+def getColourLUT(cmap, cmapResolution=256, invert=False, alpha=1.0):
+    """Returns a lookup table containing ``cmapResolution`` colours from the
+    given colour map.
+
+    Lookup tables are cached, so repeated calls with the same arguments
+    will return the same array. The returned array is therefore read-only.
+    Colour map names are resolved to the colour map which is currently
+    registered under that name, so the cache is not affected by a colour map
+    being re-registered.
+
+    :arg cmap:           Name of a registered :mod:`matplotlib` colour map,
+                         or a ``matplotlib.colors.Colormap`` instance.
+
+    :arg cmapResolution: Number of colours to generate.
 
-    ncols         = cmapResolution
-    cmap          = cm.get_cmap(cmap)
-    data          = np.linspace(0.0, 1.0, ncols)
+    :arg invert:         If ``True``, the colour map is inverted.
+
+    :arg alpha:          Transparency, applied to all colours, in the range
+                         ``[0.0 - 1.0]``.
+
+    :returns:            A read-only ``numpy`` array of shape
+                         :math:`cmapResolution \\times 4`, containing RGBA
+                         colours in the range ``[0.0 - 1.0]``.
+    """
+
+    cmapKey = _cmapKey(cmap)
+    key     = (cmapKey, cmapResolution, bool(invert), float(alpha))
+    lut     = _lutCache.get(key)
+
+    if lut is not None:
+        return lut
+
+    diskKey = None
+
+    if _diskCache is not None and _isBuiltinCmap(cmap):
+        diskKey = _diskCacheKey('getColourLUT', cmap, *key[1:])
+
+    if diskKey is not None:
+        lut = _diskCache.get(diskKey)
+        if lut is not None:
+            return _lutCache.put(key, lut)
+
+    import numpy as np
+
+    lut = np.linspace(0.0, 1.0, cmapResolution)
 
     if invert:
-        data = data[::-1]
+        lut = lut[::-1]
 
-    data          = np.repeat(data.reshape(ncols, 1), 2, axis=1)
-    data          = data.transpose()
-    data          = cmap(data)
-    data[:, :, 3] = alpha
+    lut       = cmapKey.cmap(lut)
+    lut[:, 3] = alpha
 
-    return data
+    if diskKey is not None:
+        lut = _diskCache.put(diskKey, lut)
+
+    return _lutCache.put(key, lut)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+#
+# diskcache.py - A persistent, size-bounded cache for numpy arrays.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides the :class:`DiskCache` class, a cache which stores
+``numpy`` arrays as ``.npy`` files in a directory, so that they can be shared
+between processes, and re-used across process invocations.
+"""
+
+
+import os
+import os.path as op
+import time
+import hashlib
+import tempfile
+
+
+TMP_GRACE_PERIOD = 300
+"""Age, in seconds, after which a temporary file in a :class:`DiskCache`
+directory is assumed to have been abandoned by a writer which died before
+renaming it into place, and is deleted by :meth:`DiskCache.trim`.
+"""
+
+
+class DiskCache(object):
+    """A cache which stores ``numpy`` arrays as ``.npy`` files within a
+    directory.
+
+
+    Each array is stored in a file whose name is a hash of its key, and of a
+    ``version`` string which is passed to :meth:`__init__`. The version should
+    identify anything, other than the key, which affects the cached arrays
+    (e.g. the version of the library used to generate them). Keys may be any
+    object which has a deterministic ``repr``, e.g. tuples of strings and
+    numbers.
+
+
+    Cached arrays are loaded with ``numpy.load(mmap_mode='r')``, so they are
+    read-only, and are paged in from disk on demand.
+
+
+    Multiple processes may safely read from and write to the same cache
+    directory - new entries are written to a temporary file, and then
+    atomically renamed into place, so a reader will never see a partially
+    written file.
+
+
+    When the total size of all cached files exceeds the byte budget, the
+    least recently used files are deleted. Use of an entry is recorded via
+    its file modification time, which is updated whenever the entry is
+    retrieved. Temporary files which are older than
+    :data:`TMP_GRACE_PERIOD` are also deleted.
+    """
+
+
+    def __init__(self, directory, maxBytes=268435456, version=''):
+        """Create a ``DiskCache``. The cache directory is created if it does
+        not exist.
+
+        :arg directory: Directory to store cached arrays in.
+
+        :arg maxBytes:  Byte budget - the maximum total size of all files in
+                        the cache. Defaults to 256 megabytes.
+
+        :arg version:   String which is included in the hash of every key.
+        """
+
+        if not op.isdir(directory):
+            try:
+                os.makedirs(directory)
+
+            # Another process may
+            # have just created it
+            except OSError:
+                if not op.isdir(directory):
+                    raise
+
+        self.__directory = directory
+        self.__maxBytes  = maxBytes
+        self.__version   = version
+
+
+    @property
+    def directory(self):
+        """Returns the cache directory. """
+        return self.__directory
+
+
+    @property
+    def maxBytes(self):
+        """Returns the byte budget. """
+        return self.__maxBytes
+
+
+    @property
+    def version(self):
+        """Returns the version string. """
+        return self.__version
+
+
+    def path(self, key):
+        """Returns the path to the file which is used to store the array for
+        the given key. The file may not exist.
+        """
+        key = repr((self.__version, key)).encode('utf-8')
+        key = hashlib.sha1(key).hexdigest()
+        return op.join(self.__directory, '{}.npy'.format(key))
+
+
+    def get(self, key, default=None):
+        """Returns a read-only, memory-mapped array for the given key, or
+        ``default`` if the key is not in the cache.
+        """
+
+        import numpy as np
+
+        path = self.path(key)
+
+        if not op.exists(path):
+            return default
+
+        try:
+            array = np.load(path, mmap_mode='r')
+
+        # The file may have been removed by
+        # another process, or may be corrupt
+        except (IOError, OSError, ValueError):
+            _remove(path)
+            return default
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return array
+
+
+    def put(self, key, array):
+        """Saves the given array to the cache. The cache is then trimmed,
+        if necessary, to fit within the byte budget.
+
+        :returns: The array, which is made read-only.
+        """
+
+        import numpy as np
+
+        array.setflags(write=False)
+
+        path        = self.path(key)
+        fd, tmppath = tempfile.mkstemp(suffix='.tmp', dir=self.__directory)
+
+        # Write to a temporary file,
+        # and then rename it into place
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+            _rename(tmppath, path)
+
+        except Exception:
+            _remove(tmppath)
+            raise
+
+        self.trim()
+
+        return array
+
+
+    def trim(self):
+        """Deletes the least recently used files in the cache, until the
+        cache fits within the byte budget. Temporary files which are older
+        than :data:`TMP_GRACE_PERIOD` are also deleted.
+        """
+
+        entries = []
+        nbytes  = 0
+        now     = time.time()
+
+        for name in os.listdir(self.__directory):
+
+            if not name.endswith(('.npy', '.tmp')):
+                continue
+
+            path = op.join(self.__directory, name)
+
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+
+            # A writer which died between creating
+            # a temporary file and renaming it into
+            # place will have left the file behind
+            if name.endswith('.tmp'):
+                if now - st.st_mtime > TMP_GRACE_PERIOD:
+                    _remove(path)
+                continue
+
+            entries.append((st.st_mtime, st.st_size, path))
+            nbytes += st.st_size
+
+        for mtime, size, path in sorted(entries):
+
+            if nbytes <= self.__maxBytes:
+                break
+
+            _remove(path)
+            nbytes -= size
+
+
+    def nbytes(self):
+        """Returns the total size of all files in the cache. """
+
+        nbytes = 0
+
+        for name in os.listdir(self.__directory):
+            if name.endswith('.npy'):
+                try:
+                    nbytes += op.getsize(op.join(self.__directory, name))
+                except OSError:
+                    pass
+
+        return nbytes
+
+
+    def clear(self):
+        """Deletes all files in the cache. """
+        for name in os.listdir(self.__directory):
+            if name.endswith('.npy'):
+                _remove(op.join(self.__directory, name))
+
+
+def _rename(src, dest):
+    """Atomically renames ``src`` to ``dest``, replacing ``dest`` if it
+    exists.
+    """
+
+    # os.replace is not available
+    # in python 2, but os.rename
+    # replaces the destination
+    # on POSIX platforms.
+    replace = getattr(os, 'replace', os.rename)
+    replace(src, dest)
+
+
+def _remove(path):
+    """Removes the given file, ignoring errors - the file may have already
+    been removed by another process, or (on Windows) may be in use.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
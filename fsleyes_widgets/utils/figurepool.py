@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#
+# figurepool.py - A pool of re-usable off-screen matplotlib figures.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides a pool of off-screen :mod:`matplotlib` figures, which
+are used by the :func:`.colourBarBitmap` and :func:`.textBitmap` functions.
+Creating and destroying a ``matplotlib.figure.Figure`` is expensive, so
+figures are cleared and re-used, rather than being re-created for every
+bitmap that is rendered.
+
+
+The following functions are available:
+
+ .. autosummary::
+    :nosignatures:
+
+    pooledFigure
+    setMaxPoolSize
+    poolSize
+    clearPool
+    canvasToArray
+
+
+Each thread has its own pool, so figures are never shared between threads -
+two threads can therefore render bitmaps concurrently without sharing any
+:mod:`matplotlib` state. Figures are pooled by their size in pixels, and
+their resolution.
+"""
+
+
+import weakref
+import threading
+import contextlib
+import collections
+
+
+_maxPoolSize = 8
+"""Maximum number of idle figures that are kept in the pool of each thread.
+Can be changed via :func:`setMaxPoolSize`.
+"""
+
+
+class _Pool(collections.OrderedDict):
+    """A pool of figures belonging to one thread. Contains ``{(width,
+    height, dpi) : [(figure, canvas)]}`` mappings, in least- to
+    most-recently used order. Pools are hashed by identity, so that they
+    can be stored in the :data:`_pools` set.
+    """
+    __hash__ = object.__hash__
+
+
+_local = threading.local()
+"""Thread-local storage which contains the :class:`_Pool` of each thread,
+as a ``pool`` attribute. The pool of a thread is released when the thread
+exits.
+"""
+
+
+_pools = weakref.WeakSet()
+"""Contains the pools of all live threads, so that they can be accessed by
+:func:`setMaxPoolSize` and :func:`clearPool`.
+"""
+
+
+_lock = threading.Lock()
+"""Lock used to protect access to the pools. """
+
+
+def setMaxPoolSize(size):
+    """Set the maximum number of idle figures that are kept in the pool of
+    each thread. If a pool contains more figures than this, the least
+    recently used figures are discarded.
+    """
+    global _maxPoolSize
+
+    with _lock:
+        _maxPoolSize = size
+        for pool in _pools:
+            _trim(pool)
+
+
+def clearPool():
+    """Discards all idle figures, from the pools of all threads. """
+    with _lock:
+        for pool in _pools:
+            pool.clear()
+
+
+def poolSize():
+    """Returns the number of idle figures in the pool of the calling thread.
+    """
+    pool = _threadPool()
+    with _lock:
+        return sum([len(figs) for figs in pool.values()])
+
+
+@contextlib.contextmanager
+def pooledFigure(width, height, dpi=96.0):
+    """Context manager which provides a ``matplotlib.figure.Figure`` and
+    an associated ``FigureCanvasAgg``. A figure is taken from the calling
+    thread's pool, or created if the pool does not contain a figure of the
+    requested size. When the context exits, the figure is cleared, and
+    returned to the pool.
+
+    The figure must not be used outside of the context. If an error occurs
+    within the context, the figure is discarded.
+
+    :arg width:  Figure width in pixels.
+
+    :arg height: Figure height in pixels.
+
+    :arg dpi:    Figure resolution, in dots per inch.
+
+    :returns:    A tuple containing the ``Figure`` and ``FigureCanvasAgg``.
+    """
+
+    key  = (width, height, dpi)
+    pool = _threadPool()
+
+    with _lock:
+        figs      = pool.get(key, [])
+        figcanvas = None
+
+        if len(figs) > 0:
+            figcanvas = figs.pop()
+            if len(figs) == 0:
+                pool.pop(key)
+
+    if figcanvas is None:
+        figcanvas = _createFigure(width, height, dpi)
+
+    yield figcanvas
+
+    _resetFigure(figcanvas[0])
+
+    with _lock:
+        figs = pool.pop(key, [])
+        figs.append(figcanvas)
+        pool[key] = figs
+        _trim(pool)
+
+
+def canvasToArray(canvas):
+    """Returns a ``numpy.uint8`` view of shape
+    :math:`height \\times width \\times 4` onto the RGBA pixel buffer of
+    the given ``matplotlib`` Agg canvas. The canvas must have been drawn.
+
+    The view refers to the canvas memory, so it must be copied if it is
+    to be used after the canvas is re-drawn, resized, or destroyed.
+    """
+
+    import numpy as np
+
+    ncols, nrows = canvas.get_width_height()
+    buf          = np.frombuffer(canvas.buffer_rgba(), dtype=np.uint8)
+
+    return buf.reshape(nrows, ncols, 4)
+
+
+def _threadPool():
+    """Used by :func:`pooledFigure` and :func:`poolSize`. Returns the pool of
+    the calling thread, creating it if necessary.
+    """
+
+    pool = getattr(_local, 'pool', None)
+
+    if pool is None:
+        pool        = _Pool()
+        _local.pool = pool
+        with _lock:
+            _pools.add(pool)
+
+    return pool
+
+
+def _createFigure(width, height, dpi):
+    """Used by :func:`pooledFigure`. Creates a new ``Figure`` and
+    ``FigureCanvasAgg``.
+    """
+
+    # These imports are expensive, so we're
+    # importing at the function level.
+    import matplotlib.backends.backend_agg as mplagg
+    import matplotlib.figure               as mplfig
+
+    fig    = mplfig.Figure(figsize=(width / float(dpi), height / float(dpi)),
+                           dpi=dpi)
+    canvas = mplagg.FigureCanvasAgg(fig)
+
+    return fig, canvas
+
+
+def _resetFigure(fig):
+    """Used by :func:`pooledFigure`. Clears the given figure, and restores
+    its default properties.
+    """
+
+    import matplotlib        as mpl
+    import matplotlib.figure as mplfig
+
+    fig.clf()
+    fig.patch.set_facecolor(mpl.rcParams['figure.facecolor'])
+    fig.patch.set_alpha(None)
+    fig.subplotpars = mplfig.SubplotParams()
+
+
+def _trim(pool):
+    """Used by :func:`setMaxPoolSize` and :func:`pooledFigure`. Discards the
+    least recently used figures from the given pool, so that it contains no
+    more than :data:`_maxPoolSize` figures. Must be called with the
+    :data:`_lock` held.
+    """
+
+    size = sum([len(figs) for figs in pool.values()])
+
+    while size > _maxPoolSize:
+
+        key, figs = next(iter(pool.items()))
+
+        figs.pop(0)
+        size -= 1
+
+        if len(figs) == 0:
+            pool.pop(key)
@@ -21,6 +21,14 @@ You can use the following classes to define a layout:
    Space
    HBox
    VBox
+   Overlay
+
+
+The :class:`LayoutCompositor` class can be used to efficiently generate
+bitmaps from a layout which is re-used many times, e.g. for movie frames.
+Every item in a layout has a ``dirty`` flag, and a ``markDirty`` method,
+which the ``LayoutCompositor`` uses to re-draw only those items which have
+changed.
 
 
 And the following functions to generate layouts and bitmaps:
@@ -29,9 +37,16 @@ And the following functions to generate layouts and bitmaps:
    :nosignatures:
 
    buildOrthoLayout
+   buildMontageLayout
    buildCanvasBox
    padBitmap
    layoutToBitmap
+   layoutToPNG
+   alphaOver
+
+
+The position and size of every item within a layout can be calculated,
+without generating a bitmap, with the :func:`computeGeometry` function.
 
 
 A few functions are also provided for calculating the display size, in pixels,
@@ -45,7 +60,9 @@ size calculation functions are available:
    :nosignatures:
 
    calcSizes
+   calcSizesBatch
    calcGridSizes
+   calcMontageSizes
    calcHorizontalSizes
    calcVerticalSizes
    calcPixWidth
@@ -53,14 +70,33 @@ size calculation functions are available:
 """
 
 
+import struct
 import logging
+import threading
+import collections
+import zlib
 
+import six
 import numpy as np
 
 
 log = logging.getLogger(__name__)
 
 
+_sizeCache = collections.OrderedDict()
+"""Cache used by :func:`calcSizes`, containing ``{args : sizes}`` mappings,
+in least- to most-recently used order.
+"""
+
+
+_sizeCacheSize = 256
+"""Maximum number of entries in the :data:`_sizeCache`. """
+
+
+_sizeCacheLock = threading.Lock()
+"""Lock used to protect access to the :data:`_sizeCache`. """
+
+
 class Bitmap(object):
     """A class which encapsulates a RGBA bitmap, assumed to be a
     ``numpy.uint8`` array of shape :math:`height \\times width \\times 4`).
@@ -74,6 +110,8 @@ class Bitmap(object):
       - ``bitmap``: The bitmap data
       - ``width``:  Bitmap width in pixels
       - ``height``: Bitmap height in pixels
+      - ``dirty``:  ``True`` if the bitmap needs to be re-drawn by a
+                    :class:`LayoutCompositor` - see :meth:`markDirty`.
     """
 
     def __init__(self, bitmap):
@@ -84,6 +122,16 @@ class Bitmap(object):
         self.bitmap = bitmap
         self.width  = bitmap.shape[1]
         self.height = bitmap.shape[0]
+        self.dirty  = True
+
+
+    def markDirty(self):
+        """Flags this ``Bitmap`` as needing to be re-drawn. This must be
+        called if the contents of the ``bitmap`` array are modified in
+        place. It does not need to be called if the ``bitmap`` attribute is
+        replaced with a different array.
+        """
+        self.dirty = True
 
 
 class Space(object):
@@ -94,6 +142,8 @@ class Space(object):
 
       - ``width``:  Width in pixels.
       - ``height``: Height in pixels.
+      - ``dirty``:  ``True`` if the space needs to be re-drawn by a
+                    :class:`LayoutCompositor`.
     """
 
     def __init__(self, width, height):
@@ -105,6 +155,12 @@ class Space(object):
         """
         self.width  = width
         self.height = height
+        self.dirty  = True
+
+
+    def markDirty(self):
+        """Flags this ``Space`` as needing to be re-drawn. """
+        self.dirty = True
 
 
 class HBox(object):
@@ -117,6 +173,7 @@ class HBox(object):
       - ``width``:  Total width in pixels.
       - ``height``: Total height in pixels.
       - ``items``:  List of items in this ``HBox``.
+      - ``dirty``:  ``True`` if any item in this ``HBox`` is dirty.
     """
 
 
@@ -140,6 +197,18 @@ class HBox(object):
             self.height = item.height
 
 
+    @property
+    def dirty(self):
+        """Returns ``True`` if any item in this ``HBox`` is dirty. """
+        return any([i.dirty for i in self.items])
+
+
+    def markDirty(self):
+        """Flags every item in this ``HBox`` as needing to be re-drawn. """
+        for i in self.items:
+            i.markDirty()
+
+
 class VBox(object):
     """A class which contains items to be laid out vertically.
 
@@ -150,6 +219,7 @@ class VBox(object):
       - ``width``:  Total width in pixels.
       - ``height``: Total height in pixels.
       - ``items``:  List of items in this ``VBox``.
+      - ``dirty``:  ``True`` if any item in this ``VBox`` is dirty.
     """
 
     def __init__(self, items=None):
@@ -173,6 +243,373 @@ class VBox(object):
             self.width = item.width
 
 
+    @property
+    def dirty(self):
+        """Returns ``True`` if any item in this ``VBox`` is dirty. """
+        return any([i.dirty for i in self.items])
+
+
+    def markDirty(self):
+        """Flags every item in this ``VBox`` as needing to be re-drawn. """
+        for i in self.items:
+            i.markDirty()
+
+
+class Overlay(object):
+    """A class which contains items to be drawn on top of each other.
+
+    Each item is centered within the ``Overlay``. The first item is drawn in
+    the same way as an item within a :class:`HBox` or :class:`VBox`. Each
+    subsequent item is then alpha-blended over the items beneath it, with a
+    Porter-Duff *over* operation (see :func:`alphaOver`). This can be used
+    to draw labels or annotations on top of a canvas.
+
+    After creation, new items can be added via the :meth:`append` method.
+
+    An ``Overlay`` instance has the following attributes:
+
+      - ``width``:         Total width in pixels.
+      - ``height``:        Total height in pixels.
+      - ``items``:         List of items in this ``Overlay``, from bottom to
+                           top.
+      - ``premultiplied``: Whether the bitmaps which are drawn on top of the
+                           first item have pre-multiplied alpha.
+      - ``dirty``:         ``True`` if any item in this ``Overlay`` is
+                           dirty.
+    """
+
+    def __init__(self, items=None, premultiplied=False):
+        """Create an ``Overlay``.
+
+        :arg items:         List of items contained in this ``Overlay``.
+
+        :arg premultiplied: If ``True``, the colour channels of all bitmaps
+                            which are blended are assumed to have been
+                            pre-multiplied by their alpha channel. Defaults
+                            to ``False``.
+        """
+        self.width         = 0
+        self.height        = 0
+        self.items         = []
+        self.premultiplied = premultiplied
+        if items is not None:
+            for i in items:
+                self.append(i)
+
+
+    def append(self, item):
+        """Append a new item to the top of this ``Overlay``. """
+        self.items.append(item)
+        if item.width > self.width:
+            self.width = item.width
+        if item.height > self.height:
+            self.height = item.height
+
+
+    @property
+    def dirty(self):
+        """Returns ``True`` if any item in this ``Overlay`` is dirty. """
+        return any([i.dirty for i in self.items])
+
+
+    def markDirty(self):
+        """Flags every item in this ``Overlay`` as needing to be re-drawn. """
+        for i in self.items:
+            i.markDirty()
+
+
+class LayoutCompositor(object):
+    """The ``LayoutCompositor`` can be used to repeatedly generate bitmaps
+    from a layout in which only the contents of some :class:`Bitmap` items
+    change, e.g. when exporting the frames of a movie, where the canvas
+    bitmaps change on every frame, but the labels do not.
+
+
+    The geometry of the layout is calculated once (see
+    :func:`computeGeometry`), when the ``LayoutCompositor`` is created. The
+    ``Bitmap`` items which will change are referred to as *slots*. On each
+    call to :meth:`composite`, the new slot bitmaps are copied into the
+    output bitmap, and any items which are drawn on top of a slot (e.g.
+    labels in an :class:`Overlay`) are re-drawn. Everything else (the
+    background, and all other ``Bitmap`` items) is only drawn the first
+    time that an output bitmap is used, so compositing a frame costs little
+    more than copying the new slot bitmaps::
+
+        compositor = LayoutCompositor(layout, slots=canvasBmps)
+
+        for frame in frames:
+            bitmap = compositor.composite(renderCanvases(frame))
+
+
+    Alternately, the :meth:`update` method can be used to re-draw only those
+    leaves of the layout which have changed since they were last drawn - a
+    :class:`Bitmap` has changed if it has been flagged as dirty via
+    :meth:`Bitmap.markDirty`, or if its ``bitmap`` attribute has been
+    replaced with a different array. The ``update`` method returns the
+    rectangles of the output bitmap which were re-drawn, so that they can be
+    used to update e.g. a screen or a video encoder::
+
+        compositor = LayoutCompositor(layout)
+
+        while True:
+            canvasBmps[0].bitmap = renderCanvas(0)
+            bitmap, rects        = compositor.update()
+            for x, y, w, h in rects:
+                blit(bitmap[y:y + h, x:x + w], x, y)
+
+
+    The layout must not be modified after the ``LayoutCompositor`` has been
+    created, and the slot bitmaps passed to :meth:`composite` must have the
+    same sizes as the slot bitmaps in the layout.
+    """
+
+
+    def __init__(self, layout, slots=None, bgColour=None):
+        """Create a ``LayoutCompositor``.
+
+        :arg layout:   A :class:`Bitmap`, :class:`Space`, :class:`HBox`,
+                       :class:`VBox` or :class:`Overlay` instance.
+
+        :arg slots:    Sequence of :class:`Bitmap` items within the
+                       ``layout`` which will be updated on every call to
+                       :meth:`composite`. Each slot may be specified either
+                       as a ``Bitmap``, or as the ``numpy`` array that is
+                       contained in a ``Bitmap``. Defaults to all ``Bitmap``
+                       items in the layout.
+
+        :arg bgColour: Background colour - see :func:`layoutToBitmap`.
+        """
+
+        leaves, geometry, blend = _layoutGeometry(layout)
+
+        if slots is None:
+            slots = [leaf for leaf in leaves if isinstance(leaf, Bitmap)]
+
+        slots = [self.__findSlot(leaves, s) for s in slots]
+
+        self.__width    = layout.width
+        self.__height   = layout.height
+        self.__bgColour = bgColour
+        self.__leaves   = leaves
+        self.__geometry = geometry
+        self.__blend    = blend
+        self.__slots    = slots
+        self.__buffer   = None
+        self.__prepared = None
+        self.__drawn    = [None] * len(leaves)
+
+
+    @property
+    def width(self):
+        """Returns the width of the layout in pixels. """
+        return self.__width
+
+
+    @property
+    def height(self):
+        """Returns the height of the layout in pixels. """
+        return self.__height
+
+
+    @property
+    def slots(self):
+        """Returns a list containing the slot :class:`Bitmap` items, in the
+        order that their bitmaps must be passed to :meth:`composite`.
+        """
+        return [self.__leaves[i] for i in self.__slots]
+
+
+    def composite(self, bitmaps, out=None):
+        """Generates a bitmap from the layout, using the given slot bitmaps.
+
+        :arg bitmaps: Sequence of ``numpy.uint8`` arrays, one for each slot
+                      (see :attr:`slots`), each of shape
+                      :math:`height \\times width \\times 4`.
+
+        :arg out:     ``numpy.uint8`` array of shape :math:`height \\times
+                      width \\times 4` to store the result in. If not
+                      provided, a buffer which is owned by this
+                      ``LayoutCompositor`` is used - it is re-used, and
+                      over-written, on every call to ``composite``. If
+                      ``out`` was also passed to the previous call, its
+                      contents outside of the slots are assumed to be
+                      unchanged, and are not re-drawn.
+
+        :returns:     The output bitmap.
+        """
+
+        bitmaps = list(bitmaps)
+        shape   = (self.__height, self.__width, 4)
+
+        if len(bitmaps) != len(self.__slots):
+            raise ValueError('A bitmap must be given for each slot '
+                             '({} != {})'.format(len(bitmaps),
+                                                 len(self.__slots)))
+
+        if out is None:
+            if self.__buffer is None:
+                self.__buffer = np.empty(shape, dtype=np.uint8)
+            out = self.__buffer
+
+        elif out.shape != shape or out.dtype != np.uint8:
+            raise ValueError('out must be a uint8 array of shape {} '
+                             '({}, {})'.format(shape, out.dtype, out.shape))
+
+        rects = self.__geometry[self.__slots].tolist()
+
+        for bitmap, (x, y, w, h) in zip(bitmaps, rects):
+            if bitmap.shape[:2] != (h, w):
+                raise ValueError('Slot bitmap has wrong size ({} != '
+                                 '{})'.format(bitmap.shape[:2], (h, w)))
+
+        bitmaps = dict(zip(self.__slots, bitmaps))
+
+        # The background and static items
+        # only need to be drawn into a
+        # buffer the first time it is used.
+        if out is not self.__prepared:
+            self.__redraw(out, None, bitmaps)
+
+        # Otherwise we only re-draw the slots
+        else:
+            self.__redraw(out, rects, bitmaps)
+
+        return out
+
+
+    def update(self, out=None):
+        """Re-draws the leaves of the layout which have changed since they
+        were last drawn.
+
+        A :class:`Bitmap` has changed if its ``dirty`` flag is set (see
+        :meth:`Bitmap.markDirty`), or if its ``bitmap`` attribute is not
+        the array that was last drawn. Any items which overlap a changed
+        leaf are also re-drawn. The ``dirty`` flags of all re-drawn leaves
+        are cleared.
+
+        :arg out: ``numpy.uint8`` array to store the result in - see
+                  :meth:`composite`. If ``out`` was not passed to the
+                  previous call to ``update`` or ``composite``, the entire
+                  layout is drawn into it.
+
+        :returns: A tuple containing:
+
+                   - The output bitmap.
+
+                   - A list of ``(x, y, width, height)`` tuples, containing
+                     the rectangles of the output bitmap that were
+                     re-drawn. Rectangles which lie entirely within another
+                     rectangle are omitted, but rectangles may otherwise
+                     overlap. The list is empty if nothing has changed.
+        """
+
+        shape = (self.__height, self.__width, 4)
+
+        if out is None:
+            if self.__buffer is None:
+                self.__buffer = np.empty(shape, dtype=np.uint8)
+            out = self.__buffer
+
+        elif out.shape != shape or out.dtype != np.uint8:
+            raise ValueError('out must be a uint8 array of shape {} '
+                             '({}, {})'.format(shape, out.dtype, out.shape))
+
+        if out is not self.__prepared:
+            self.__redraw(out, None)
+            return out, [(0, 0, self.__width, self.__height)]
+
+        leaves = self.__leaves
+        drawn  = self.__drawn
+        dirty  = []
+
+        for i, leaf in enumerate(leaves):
+
+            # Bitmap leaves are also dirty if
+            # their bitmap has been replaced
+            replaced = isinstance(leaf, Bitmap) and leaf.bitmap is not drawn[i]
+
+            if leaf.dirty or replaced:
+                dirty.append(i)
+
+        if len(dirty) == 0:
+            return out, []
+
+        geometry = self.__geometry
+        rects    = _outerRects(geometry[dirty])
+
+        for i in dirty:
+            x, y, w, h = geometry[i].tolist()
+            leaf       = leaves[i]
+            if isinstance(leaf, Bitmap) and leaf.bitmap.shape[:2] != (h, w):
+                raise ValueError('Bitmap has changed size ({} != '
+                                 '{})'.format(leaf.bitmap.shape[:2], (h, w)))
+
+        self.__redraw(out, rects)
+
+        for i in dirty:
+            leaf       = leaves[i]
+            leaf.dirty = False
+            if isinstance(leaf, Bitmap):
+                drawn[i] = leaf.bitmap
+
+        return out, rects
+
+
+    def __redraw(self, out, rects, bitmaps=None):
+        """Used by :meth:`composite` and :meth:`update`. Re-draws the given
+        rectangles of the output bitmap, and records the array that is
+        drawn for each leaf. If ``rects is None``, the entire output bitmap
+        is drawn, and the ``dirty`` flags of all leaves are cleared.
+        Otherwise only the arrays of the leaves in ``bitmaps`` are recorded.
+
+        :arg out:     Output bitmap.
+
+        :arg rects:   Sequence of ``(x, y, width, height)`` rectangles, or
+                      ``None``.
+
+        :arg bitmaps: Dictionary of ``{index : bitmap}`` mappings, to be
+                      drawn in place of the bitmaps of some leaves.
+        """
+
+        if bitmaps is None:
+            bitmaps = {}
+
+        leaves = self.__leaves
+        drawn  = self.__drawn
+        args   = (leaves, self.__geometry, self.__blend)
+
+        if rects is None:
+            _compositeRect(*args, tile=out, x=0, y=0,
+                           bgColour=self.__bgColour, bitmaps=bitmaps)
+            self.__prepared = out
+
+            for i, leaf in enumerate(leaves):
+                leaf.dirty = False
+                if isinstance(leaf, Bitmap):
+                    drawn[i] = bitmaps.get(i, leaf.bitmap)
+
+        else:
+            for x, y, w, h in rects:
+                _compositeRect(*args, tile=out[y:y + h, x:x + w], x=x, y=y,
+                               bgColour=self.__bgColour, bitmaps=bitmaps)
+
+            for i, bitmap in bitmaps.items():
+                drawn[i] = bitmap
+
+
+    @staticmethod
+    def __findSlot(leaves, slot):
+        """Used by :meth:`__init__`. Returns the index of the :class:`Bitmap`
+        in ``leaves`` which is, or which contains, ``slot``.
+        """
+        for i, leaf in enumerate(leaves):
+            if not isinstance(leaf, Bitmap):
+                continue
+            if leaf is slot or leaf.bitmap is slot:
+                return i
+        raise ValueError('Slot is not a Bitmap in the layout')
+
+
 def padBitmap(bitmap, width, height, vert, bgColour):
     """Pads the given bitmap with zeros along the secondary axis (specified
     with the ``vert`` parameter), so that it fits in the given
@@ -220,55 +657,527 @@ def padBitmap(bitmap, width, height, vert, bgColour):
     return bitmap
 
 
-def layoutToBitmap(layout, bgColour=None):
-    """Recursively turns the given ``layout`` object into a bitmap.
+def layoutToBitmap(layout,
+                   bgColour=None,
+                   filename=None,
+                   tileBytes=67108864,
+                   workers=1):
+    """Turns the given ``layout`` object into a bitmap.
+
+    The output bitmap is allocated once, and filled with the background
+    colour. The position of every :class:`Bitmap` within the layout is then
+    calculated (see :func:`computeGeometry`), and each ``Bitmap`` is copied
+    directly into its position within the output bitmap, or blended into it
+    if it is within an :class:`Overlay`.
+
+    If a ``filename`` is provided, the bitmap is stored in a memory-mapped
+    ``.npy`` file, and is generated one tile (a band of rows) at a time,
+    so that only one tile of the bitmap, and of each ``Bitmap`` in the
+    layout, needs to be resident in memory at any one time. This allows
+    bitmaps which are larger than the available RAM to be generated
+    (``Bitmap`` arrays in the layout may themselves be memory-mapped).
+
+    :arg layout:    A :class:`Bitmap`, :class:`Space`, :class:`HBox`,
+                    :class:`VBox` or :class:`Overlay` instance.
+
+    :arg bgColour:  Background colour used to fill in empty space. Must be
+                    a ``(r, g, b, a)`` tuple with channel values in the
+                    range ``[0, 255]``. Defaults to transparent.
+
+    :arg filename:  Name of a file to store the bitmap in. The file is
+                    created (or overwritten) in ``.npy`` format, so it
+                    can be loaded with ``numpy.load``.
+
+    :arg tileBytes: Only used if ``filename`` is provided. Maximum size, in
+                    bytes, of each tile. Defaults to 64 megabytes.
+
+    :arg workers:   Number of threads to use. If ``workers > 1``, the bitmap
+                    is divided into bands of rows, which are generated in
+                    parallel in a ``concurrent.futures.ThreadPoolExecutor``
+                    - ``numpy`` releases the GIL while copying, so this
+                    can be much faster for large layouts. Large bitmaps in
+                    the layout are split across several bands. The result
+                    is identical to that of serial compositing. If
+                    ``None``, the number of CPUs is used. Defaults to
+                    ``1``. The bitmap is composited serially if
+                    ``concurrent.futures`` is not available (it is not
+                    part of the Python 2 standard library).
+
+    :returns:       a ``numpy.uint8`` array of size
+                    :math:`height \\times width \\times 4`. If a
+                    ``filename`` is provided, this is a ``numpy.memmap``.
+    """
+
+    if workers is None:
+        import multiprocessing as mp
+        workers = mp.cpu_count()
+
+    width                   = layout.width
+    height                  = layout.height
+    shape                   = (height, width, 4)
+    leaves, geometry, blend = _layoutGeometry(layout)
+
+    if filename is None:
+        bitmap = np.empty(shape, dtype=np.uint8)
+        nrows  = max(1, height)
+    else:
+        bitmap = np.lib.format.open_memmap(filename,
+                                           mode='w+',
+                                           dtype=np.uint8,
+                                           shape=shape)
+        nrows  = max(1, tileBytes // max(1, width * 4))
+
+    def compositeBand(top):
+        bottom = min(top + nrows, height)
+        _compositeRect(leaves, geometry, blend, bitmap[top:bottom], 0, top,
+                       bgColour)
+
+    try:
+        import concurrent.futures as futures
+    except ImportError:
+        futures = None
+
+    if workers <= 1 or futures is None:
+        for top in range(0, height, nrows):
+            compositeBand(top)
+
+            # Write each tile back to disk
+            # before moving on to the next one
+            if filename is not None:
+                bitmap.flush()
+
+        return bitmap
+
+    # Give each thread several bands,
+    # so the work is evenly balanced
+    # when bitmaps differ in size.
+    nbands = workers * 4
+    nrows  = max(1, min(nrows, int(np.ceil(height / float(nbands)))))
+
+    with futures.ThreadPoolExecutor(workers) as pool:
+
+        # list() re-raises any errors
+        list(pool.map(compositeBand, range(0, height, nrows)))
+
+    if filename is not None:
+        bitmap.flush()
+
+    return bitmap
+
+
+def layoutToPNG(layout,
+                fileobj,
+                bgColour=None,
+                compressLevel=6,
+                tileBytes=1048576):
+    """Turns the given ``layout`` object into a bitmap, and saves it to a
+    PNG file.
+
+    The full bitmap is never created - it is generated one band of rows at
+    a time (see :func:`layoutToBitmap`), and each band is compressed and
+    written to the file before the next band is generated. The PNG file is
+    written with the Python standard library ``zlib`` module.
+
+    :arg layout:        A :class:`Bitmap`, :class:`Space`, :class:`HBox`,
+                        :class:`VBox` or :class:`Overlay` instance.
+
+    :arg fileobj:       File name, or file-like object opened in binary
+                        mode, to write the PNG data to.
+
+    :arg bgColour:      Background colour - see :func:`layoutToBitmap`.
+
+    :arg compressLevel: ``zlib`` compression level, between ``0`` (no
+                        compression) and ``9`` (slowest, and smallest
+                        file). Defaults to ``6``.
 
-    :arg layout:   A :class:`Bitmap`, :class:`Space`, :class:`HBox` or
-                   :class:`VBox` instance.
+    :arg tileBytes:     Maximum size, in bytes, of each band of rows.
+                        Defaults to 1 megabyte.
+    """
+
+    if isinstance(fileobj, six.string_types):
+        with open(fileobj, 'wb') as f:
+            layoutToPNG(layout, f, bgColour, compressLevel, tileBytes)
+        return
+
+    width, height           = layout.width, layout.height
+    leaves, geometry, blend = _layoutGeometry(layout)
+    nrows                   = max(1, tileBytes // max(1, width * 4))
+    compressor              = zlib.compressobj(compressLevel)
+
+    def chunk(ctype, data):
+        crc = zlib.crc32(data, zlib.crc32(ctype)) & 0xffffffff
+        fileobj.write(struct.pack('>I', len(data)))
+        fileobj.write(ctype)
+        fileobj.write(data)
+        fileobj.write(struct.pack('>I', crc))
+
+    # 8 bits per channel, RGBA, no interlacing
+    fileobj.write(b'\x89PNG\r\n\x1a\n')
+    chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+
+    # Each row in a PNG image is preceded by
+    # a filter type byte. We use the "up"
+    # filter (type 2), where each row is
+    # stored as its difference from the
+    # previous row - this is cheap to
+    # calculate, and greatly improves
+    # compression of typical screenshots.
+    # The tile has an extra row at the
+    # top, for the last row of the
+    # previous band.
+    tile           = np.zeros((nrows + 1, width, 4),     dtype=np.uint8)
+    scanline       = np.empty((nrows,     width * 4 + 1), dtype=np.uint8)
+    scanline[:, 0] = 2
+
+    for top in range(0, height, nrows):
+
+        bottom = min(top + nrows, height)
+        rows   = bottom - top
+        band   = tile[:rows + 1].reshape(rows + 1, -1)
+
+        _compositeRect(leaves, geometry, blend, tile[1:rows + 1], 0, top,
+                       bgColour)
+
+        np.subtract(band[1:], band[:-1], out=scanline[:rows, 1:])
+
+        tile[0] = tile[rows]
+        data    = compressor.compress(scanline[:rows].tobytes())
+
+        if len(data) > 0:
+            chunk(b'IDAT', data)
+
+    chunk(b'IDAT', compressor.flush())
+    chunk(b'IEND', b'')
+
+
+def alphaOver(src, dest, premultiplied=False):
+    """Blends ``src`` over ``dest``, in place, with a Porter-Duff *over*
+    operation.
+
+    The blend is performed entirely with integer arithmetic, so no floating
+    point temporary arrays are created. If the bitmaps have
+    pre-multiplied alpha, the blend is a single multiply-add per channel.
+    Otherwise, a faster path is used when ``dest`` is fully opaque (e.g.
+    when blending a label over a canvas).
+
+    :arg src:           ``numpy.uint8`` array of shape :math:`\\ldots \\times
+                        4` containing RGBA values.
+
+    :arg dest:          ``numpy.uint8`` array with the same shape as
+                        ``src``, which is overwritten with the result.
+
+    :arg premultiplied: If ``True``, the colour channels of ``src`` and
+                        ``dest`` are assumed to have been pre-multiplied by
+                        their alpha channel, and the result will also be
+                        pre-multiplied. Defaults to ``False``.
+
+    :returns:           ``dest``
+    """
+
+    srca = src[..., 3].astype(np.uint16)
+    inva = 255 - srca
+
+    # out = src + dest * (1 - srca)
+    if premultiplied:
+        result  = dest.astype(np.uint16)
+        result *= inva[..., None]
+        result  = _div255(result)
+        result += src
+        np.minimum(result, 255, out=result)
+        dest[:] = result
+        return dest
+
+    desta = dest[..., 3].astype(np.uint16)
+
+    # out = src * srca + dest * (1 - srca)
+    if np.all(desta == 255):
+        result  = src[..., :3].astype(np.uint16)
+        result *= srca[..., None]
+        tmp     = dest[..., :3].astype(np.uint16)
+        tmp    *= inva[..., None]
+        result += tmp
+        dest[..., :3] = _div255(result)
+        return dest
+
+    # General case - the output alpha is
+    #   outa = srca + desta * (1 - srca),
+    # and the output colour is
+    #   (src * srca + dest * desta * (1 - srca)) / outa
+    # Everything is scaled by 255 so that
+    # precision is not lost by rounding
+    # before the division, so we need 32
+    # bits for the colour calculation.
+    desta *= inva
+    outa   = srca * 255 + desta
+    result = src[..., :3].astype(np.uint32)
+    tmp    = dest[..., :3].astype(np.uint32)
+
+    result *= (srca * 255)[..., None]
+    tmp    *= desta[       ..., None]
+    result += tmp
+
+    # Fully transparent pixels (outa == 0)
+    # have result == 0, so will stay 0.
+    dest[..., 3]   = _div255(outa.copy())
+    outa           = np.maximum(outa, 1)[..., None]
+    result        += outa // 2
+    result        //= outa
+    dest[..., :3]  = result
+
+    return dest
+
+
+def _div255(x):
+    """Used by :func:`alphaOver`. Divides the given ``numpy.uint16`` array,
+    which must contain values in the range ``[0, 65025]``, by ``255``, and
+    rounds to the nearest integer, without any integer division. The array
+    is modified in place.
+    """
+    x += 128
+    x += x >> 8
+    x >>= 8
+    return x
+
+
+def _compositeRect(leaves, geometry, blend, tile, x, y, bgColour,
+                   bitmaps=None):
+    """Used by :func:`layoutToBitmap`, :func:`layoutToPNG`, and the
+    :class:`LayoutCompositor`. Generates a rectangular region of a layout
+    bitmap. The region is filled with the background colour, and the parts
+    of every :class:`Bitmap` which lie within the region are copied or
+    blended into it.
+
+    If the region is entirely covered by a ``Bitmap`` which is not blended,
+    everything beneath that ``Bitmap`` is skipped.
+
+    :arg leaves:   List of leaves, as returned by :func:`computeGeometry`.
+
+    :arg geometry: Leaf geometry, as returned by :func:`computeGeometry`.
+
+    :arg blend:    Leaf blending modes, as returned by
+                   :func:`_layoutGeometry`.
+
+    :arg tile:     ``numpy.uint8`` array of shape :math:`rows \\times
+                   columns \\times 4` to store the region in.
 
-    :arg bgColour: Background colour used to fill in empty space. Must be
-                   a ``(r, g, b, a)`` tuple with channel values in the range
-                   ``[0, 255]``. Defaults to transparent.
+    :arg x:        Horizontal position of the region within the layout.
 
-    :returns:      a ``numpy.uint8`` array of size
-                   :math:`height \\times width \\times 4`.
+    :arg y:        Vertical position of the region within the layout.
+
+    :arg bgColour: Background colour.
+
+    :arg bitmaps:  Dictionary of ``{index : bitmap}`` mappings, containing
+                   bitmaps to use in place of the bitmaps of some leaves.
+    """
+
+    if bitmaps is None:
+        bitmaps = {}
+
+    h, w           = tile.shape[:2]
+    lx, ly, lw, lh = geometry.T
+    overlapx       = (lx < x + w) & (lx + lw > x)
+    overlapy       = (ly < y + h) & (ly + lh > y)
+    hits           = np.nonzero(overlapx & overlapy)[0]
+    hits           = [i for i in hits.tolist()
+                      if isinstance(leaves[i], Bitmap)]
+    rects          = geometry[hits].tolist()
+    start          = 0
+
+    # Find the top-most bitmap which covers
+    # the entire region, and which is not
+    # blended - we only need to start from
+    # there.
+    for i in reversed(range(len(hits))):
+        lx, ly, lw, lh = rects[i]
+        if blend[hits[i]] is None and \
+           lx <= x and lx + lw >= x + w and \
+           ly <= y and ly + lh >= y + h:
+            start = i
+            break
+    else:
+        _fillBackground(tile, bgColour)
+
+    for i, (lx, ly, lw, lh) in zip(hits[start:], rects[start:]):
+
+        bitmap = bitmaps.get(i, leaves[i].bitmap)
+        x0     = max(lx, x)
+        y0     = max(ly, y)
+        x1     = min(lx + lw, x + w)
+        y1     = min(ly + lh, y + h)
+        src    = bitmap[y0 - ly:y1 - ly, x0 - lx:x1 - lx]
+        dest   = tile[  y0 - y: y1 - y,  x0 - x: x1 - x]
+
+        if blend[i] is None: dest[:] = src
+        else:                alphaOver(src, dest, blend[i])
+
+
+def computeGeometry(layout):
+    """Calculates the position and size of every :class:`Bitmap` and
+    :class:`Space` (the *leaves*) within the given ``layout``.
+
+    The geometry can be used to find where an item is located in the bitmap
+    generated by :func:`layoutToBitmap`, without generating the bitmap. For
+    example, the leaf at pixel ``(px, py)`` can be found like so::
+
+        leaves, geom = computeGeometry(layout)
+        x, y, w, h   = geom.T
+        hits         = np.where((px >= x) & (px < x + w) &
+                                (py >= y) & (py < y + h))[0]
+
+    The geometry will remain valid as long as the layout is not modified,
+    and the size of every ``Bitmap`` remains the same. Leaves within an
+    :class:`Overlay` may overlap - later leaves are drawn on top of earlier
+    leaves.
+
+    :arg layout: A :class:`Bitmap`, :class:`Space`, :class:`HBox`,
+                 :class:`VBox` or :class:`Overlay` instance.
+
+    :returns:    A tuple containing:
+
+                  - A list of all leaves in the ``layout``, in the order
+                    that they are encountered in a depth-first traversal.
+
+                  - A ``numpy`` integer array of shape :math:`N \\times 4`,
+                    where :math:`N` is the number of leaves, with each row
+                    containing the ``(x, y, width, height)`` of the
+                    corresponding leaf, in pixels. ``(x, y)`` is the
+                    position of the top-left corner of the leaf, relative
+                    to the top-left corner of the ``layout``.
+    """
+
+    return _layoutGeometry(layout)[:2]
+
+
+def _layoutGeometry(layout):
+    """Used by :func:`computeGeometry`, and by all of the compositing
+    functions. Calculates the geometry of the given ``layout``.
+
+    :returns: A tuple containing:
+
+               - The leaves and geometry, as returned by
+                 :func:`computeGeometry`.
+
+               - A list containing the blending mode for each leaf - either
+                 ``None``, if the leaf is copied into the output, or a
+                 boolean, if the leaf is blended with :func:`alphaOver`, in
+                 which case the value is passed as the ``premultiplied``
+                 argument.
+    """
+
+    offsets  = _layoutOffsets(layout)
+    leaves   = [o[0] for o in offsets]
+    blend    = [o[3] for o in offsets]
+    geometry = np.array([(x, y, leaf.width, leaf.height)
+                         for leaf, x, y, _ in offsets],
+                        dtype=np.intp).reshape(-1, 4)
+
+    return leaves, geometry, blend
+
+
+def _fillBackground(bitmap, bgColour):
+    """Used by :func:`_compositeRect`. Fills the given ``numpy.uint8``
+    bitmap with the given background colour (or with transparent, if
+    ``bgColour is None``).
     """
 
     if bgColour is None: bgColour = [0, 0, 0, 0]
     bgColour = np.array(bgColour, dtype=np.uint8)
 
-    # Space is easy
-    if isinstance(layout, Space):
-        space = np.zeros((layout.height, layout.width, 4), dtype=np.uint8)
-        space[:] = bgColour
-        return space
+    # Filling via a 32 bit view is much
+    # faster than broadcasting the colour
+    # across the last axis, but is only
+    # possible for contiguous arrays.
+    if bitmap.flags['C_CONTIGUOUS']:
+        bitmap.view(np.uint32).fill(bgColour.view(np.uint32)[0])
+    else:
+        bitmap[:] = bgColour
+
+
+def _outerRects(rects):
+    """Used by :meth:`LayoutCompositor.update`. Removes rectangles which
+    lie entirely within another rectangle, and rectangles with no area,
+    from the given ``rects``.
+
+    :arg rects: ``numpy`` integer array of shape :math:`N \\times 4`,
+                containing ``(x, y, width, height)`` rectangles.
+
+    :returns:   A list of ``(x, y, width, height)`` tuples.
+    """
+
+    rects  = rects[(rects[:, 2] > 0) & (rects[:, 3] > 0)]
+    x0, y0 = rects[:, 0], rects[:, 1]
+    x1, y1 = x0 + rects[:, 2], y0 + rects[:, 3]
+
+    # inside[i, j] is True if
+    # rect i lies within rect j
+    insidex = (x0[:, None] >= x0) & (x1[:, None] <= x1)
+    insidey = (y0[:, None] >= y0) & (y1[:, None] <= y1)
+    inside  = insidex & insidey
+
+    # Of a group of identical
+    # rects, keep the first
+    idxs    = np.arange(len(rects))
+    inside &= ~(inside.T & (idxs[:, None] <= idxs))
+
+    return [tuple(r) for r in rects[~inside.any(axis=1)].tolist()]
+
+
+def _layoutOffsets(layout, x=0, y=0, blend=None, offsets=None):
+    """Used by :func:`_layoutGeometry`. Calculates the position of every
+    :class:`Bitmap` and :class:`Space` within the given ``layout``.
+
+    Items within a :class:`HBox` are centered vertically within the box,
+    and items within a :class:`VBox` are centered horizontally (rounding
+    towards the top/left) - this is equivalent to padding each item with
+    :func:`padBitmap`. Items within an :class:`Overlay` are centered both
+    horizontally and vertically.
+
+    :arg layout:  A :class:`Bitmap`, :class:`Space`, :class:`HBox`,
+                  :class:`VBox` or :class:`Overlay` instance.
+
+    :arg x:       Horizontal offset of the layout.
+
+    :arg y:       Vertical offset of the layout.
+
+    :arg blend:   Blending mode of the layout (see :func:`_layoutGeometry`).
+
+    :arg offsets: List to append to - used for recursive calls.
+
+    :returns:     A list of ``(item, x, y, blend)`` tuples, where ``item``
+                  is a ``Bitmap`` or ``Space``, ``(x, y)`` is the position
+                  of its top-left corner, relative to the top-left corner of
+                  the ``layout``, and ``blend`` is its blending mode.
+    """
 
-    # Bitmap is easy
-    elif isinstance(layout, Bitmap):
-        return np.array(layout.bitmap, dtype=np.uint8)
+    if offsets is None:
+        offsets = []
 
-    # Boxes require a bit of work
-    if   isinstance(layout, HBox): vert = False
-    elif isinstance(layout, VBox): vert = True
+    if isinstance(layout, (Bitmap, Space)):
+        offsets.append((layout, x, y, blend))
+        return offsets
 
-    # Recursively bitmapify the children of the box
-    itemBmps = [layoutToBitmap(i, bgColour) for i in layout.items]
+    for i, item in enumerate(layout.items):
+        if isinstance(layout, Overlay):
+            ix = x + (layout.width  - item.width)  // 2
+            iy = y + (layout.height - item.height) // 2
 
-    # Pad each of the bitmaps so they are all the same
-    # size along the secondary axis (which is width
-    # if the layout is a VBox, and height if the layout
-    # is a HBox).
-    width    = layout.width
-    height   = layout.height
-    itemBmps = [padBitmap(i, width, height, vert, bgColour) for i in itemBmps]
+            # All but the first item are
+            # blended over the items below
+            if i == 0: iblend = blend
+            else:      iblend = layout.premultiplied
 
-    if len(itemBmps) == 0:
-        bmp         = np.zeros((height, width, 4))
-        bmp[..., :] = bgColour
-        return bmp
+            _layoutOffsets(item, ix, iy, iblend, offsets)
 
-    if vert: return np.vstack(itemBmps)
-    else:    return np.hstack(itemBmps)
+        elif isinstance(layout, VBox):
+            ix = x + (layout.width - item.width) // 2
+            _layoutOffsets(item, ix, y, blend, offsets)
+            y += item.height
+        else:
+            iy = y + (layout.height - item.height) // 2
+            _layoutOffsets(item, x, iy, blend, offsets)
+            x += item.width
+
+    return offsets
 
 
 def buildCanvasBox(canvasBmp, labelBmps, showLabels, labelSize):
@@ -349,6 +1258,82 @@ def buildOrthoLayout(canvasBmps,
     return canvasBox
 
 
+def buildMontageLayout(bitmaps, ncols, spacing=0, labels=None):
+    """Builds a layout which arranges the given bitmaps in a grid, e.g. the
+    slices of a lightbox view.
+
+    Each bitmap is placed in a cell - all cells have the same width (the
+    width of the widest bitmap), and each cell has the same height as the
+    tallest cell in its row. Bitmaps are centered within their cells, and
+    the cells are filled row by row, starting from the top-left.
+
+    :arg bitmaps: Sequence of ``numpy.uint8`` arrays containing the bitmaps
+                  to be laid out.
+
+    :arg ncols:   Number of columns.
+
+    :arg spacing: Space, in pixels, between adjacent cells. Defaults to
+                  ``0``.
+
+    :arg labels:  Sequence of ``numpy.uint8`` arrays, one for each bitmap,
+                  containing labels (e.g. slice numbers) to be placed
+                  beneath each bitmap. An entry may be ``None``, in which
+                  case the corresponding bitmap is not labelled.
+
+    :returns:     A :class:`VBox` describing the layout.
+    """
+
+    if ncols < 1:
+        raise ValueError('ncols must be at least 1 ({})'.format(ncols))
+
+    bitmaps = list(bitmaps)
+
+    if labels is None: labels = [None] * len(bitmaps)
+    else:              labels = list(labels)
+
+    if len(labels) != len(bitmaps):
+        raise ValueError('A label must be given for each bitmap '
+                         '({} != {})'.format(len(labels), len(bitmaps)))
+
+    cells = []
+
+    for bmp, label in zip(bitmaps, labels):
+        cell = VBox([Bitmap(bmp)])
+        if label is not None:
+            cell.append(Bitmap(label))
+        cells.append(cell)
+
+    # Pad every cell to the same width, so
+    # that the columns are aligned, and pad
+    # the last row, so it is left-aligned
+    cellw = max([c.width for c in cells] + [0])
+
+    for cell in cells:
+        if cell.width < cellw:
+            cell.append(Space(cellw, 0))
+
+    while len(cells) % ncols != 0:
+        cells.append(Space(cellw, 0))
+
+    montage = VBox()
+
+    for row in range(0, len(cells), ncols):
+
+        if row > 0 and spacing > 0:
+            montage.append(Space(0, spacing))
+
+        rowBox = HBox()
+
+        for col, cell in enumerate(cells[row:row + ncols]):
+            if col > 0 and spacing > 0:
+                rowBox.append(Space(spacing, 0))
+            rowBox.append(cell)
+
+        montage.append(rowBox)
+
+    return montage
+
+
 def calcSizes(layout, canvasaxes, bounds, width, height):
     """Convenience function which, based upon whether the `layout` argument
     is ``'horizontal'``, ``'vertical'``, or ``'grid'``,  respectively calls
@@ -375,11 +1360,32 @@ def calcSizes(layout, canvasaxes, bounds, width, height):
 
     :returns:       A list of ``(width, height)`` tuples, one for each canvas,
                     each specifying the canvas width and height in pixels.
+
+    .. note:: The most recent results are cached, so repeated calls with the
+              same arguments (e.g. while a window is being resized) are very
+              fast.
     """
 
     layout = layout.lower()
     func   = None
 
+    try:
+        key = (layout,
+               tuple([tuple(c) for c in canvasaxes]),
+               tuple([float(b) for b in bounds]),
+               width,
+               height)
+        hash(key)
+    except TypeError:
+        key = None
+
+    if key is not None:
+        with _sizeCacheLock:
+            sizes = _sizeCache.pop(key, None)
+            if sizes is not None:
+                _sizeCache[key] = sizes
+                return list(sizes)
+
     if   layout == 'horizontal': func = calcHorizontalSizes
     elif layout == 'vertical':   func = calcVerticalSizes
     elif layout == 'grid':       func = calcGridSizes
@@ -392,6 +1398,99 @@ def calcSizes(layout, canvasaxes, bounds, width, height):
               'sizes for canvases {} ({}) are: {}'.format(
                   width, height, layout, canvasaxes, bounds, sizes))
 
+    if key is not None:
+        with _sizeCacheLock:
+            _sizeCache[key] = list(sizes)
+            while len(_sizeCache) > _sizeCacheSize:
+                _sizeCache.popitem(last=False)
+
+    return sizes
+
+
+def calcSizesBatch(layout, canvasaxes, bounds, widths, heights):
+    """Vectorised version of :func:`calcSizes`, which calculates canvas
+    sizes for many candidate ``(width, height)`` pairs at once.
+
+    :arg layout:     String specifying the layout type - ``'horizontal'``,
+                     ``'vertical'``, or ``'grid'``.
+
+    :arg canvasaxes: See :func:`calcSizes`.
+
+    :arg bounds:     See :func:`calcSizes`.
+
+    :arg widths:     Sequence of :math:`N` maximum widths in pixels.
+
+    :arg heights:    Sequence of :math:`N` maximum heights in pixels.
+
+    :returns:        A ``numpy`` array of shape :math:`N \\times C \\times
+                     2`, where :math:`C` is the number of canvases,
+                     containing the width and height of each canvas, for
+                     each of the candidate sizes. Row ``i`` is equal, to
+                     within floating point precision, to the result of
+                     ``calcSizes(layout, canvasaxes, bounds, widths[i],
+                     heights[i])``. Where :func:`calcSizes` would raise a
+                     ``ZeroDivisionError`` because a display space
+                     dimension is zero, the affected canvas sizes are
+                     instead set to ``0``.
+    """
+
+    layout          = layout.lower()
+    widths, heights = np.broadcast_arrays(
+        np.asarray(widths,  dtype=np.float64).ravel(),
+        np.asarray(heights, dtype=np.float64).ravel())
+    ncanvases       = len(canvasaxes)
+    sizes           = np.zeros((len(widths), ncanvases, 2))
+
+    if layout not in ('horizontal', 'vertical', 'grid'):
+        raise ValueError('Unknown layout: {}'.format(layout))
+
+    if ncanvases == 0:
+        return sizes
+
+    bounds        = np.asarray(bounds, dtype=np.float64)
+    canvasaxes    = np.asarray(canvasaxes, dtype=np.intp)
+    canvasWidths  = bounds[canvasaxes[:, 0]]
+    canvasHeights = bounds[canvasaxes[:, 1]]
+    widths        = widths[ :, None]
+    heights       = heights[:, None]
+
+    if layout == 'grid' and ncanvases < 3:
+        layout = 'horizontal'
+
+    # See _calcFlatSizes
+    if layout != 'grid':
+
+        if layout == 'vertical':
+            ttlWidth  = canvasWidths.max()
+            ttlHeight = canvasHeights.sum()
+        else:
+            ttlWidth  = canvasWidths.sum()
+            ttlHeight = canvasHeights.max()
+
+        if ttlWidth  != 0: sizes[..., 0] = widths  * canvasWidths  / ttlWidth
+        if ttlHeight != 0: sizes[..., 1] = heights * canvasHeights / ttlHeight
+
+        return sizes
+
+    # See calcGridSizes
+    ttlWidth  = canvasWidths[ 0] + canvasWidths[ 1]
+    ttlHeight = canvasHeights[0] + canvasHeights[2]
+    cw        = np.zeros((len(widths),  ncanvases))
+    ch        = np.zeros((len(heights), ncanvases))
+
+    if ttlWidth  != 0: cw[:] = widths  * (canvasWidths  / ttlWidth)
+    if ttlHeight != 0: ch[:] = heights * (canvasHeights / ttlHeight)
+
+    adjusted  = _adjustPixelSizes(canvasWidths, canvasHeights, cw, ch)
+    acw       = adjusted[:, 0].reshape(cw.shape)
+    ach       = adjusted[:, 1].reshape(ch.shape)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wider = (cw / ch) > (acw / ach)
+
+    sizes[..., 0] = np.where(wider, cw,  acw)
+    sizes[..., 1] = np.where(wider, ach, ch)
+
     return sizes
 
 
@@ -452,6 +1551,48 @@ def calcGridSizes(canvasaxes, bounds, width, height):
     return sizes
 
 
+def calcMontageSizes(nslices, ncols, bounds, width, height, spacing=0):
+    """Calculates the size of a number of canvases (e.g. the slices of a
+    lightbox view), so that they are laid out in a grid with
+    :func:`buildMontageLayout`.
+
+    The available space is divided into equally sized cells, and each canvas
+    is sized to fit within a cell, while maintaining the aspect ratio of its
+    display space. All of the calculations are performed with ``numpy``, so
+    this function is fast for any number of canvases.
+
+    :arg nslices: Number of canvases.
+
+    :arg ncols:   Number of columns.
+
+    :arg bounds:  Display space width and height of each canvas - either a
+                  single ``(width, height)`` pair, which is used for every
+                  canvas, or a sequence of pairs, one for each canvas.
+
+    :arg width:   Maximum total width in pixels.
+
+    :arg height:  Maximum total height in pixels.
+
+    :arg spacing: Space, in pixels, between adjacent cells (see
+                  :func:`buildMontageLayout`). Defaults to ``0``.
+
+    :returns:     A ``numpy`` array of shape :math:`nslices \\times 2`,
+                  containing the width and height, in pixels, of each
+                  canvas.
+    """
+
+    if ncols < 1:
+        raise ValueError('ncols must be at least 1 ({})'.format(ncols))
+
+    nrows  = int(np.ceil(nslices / float(ncols)))
+    bounds = np.array(bounds, dtype=np.float64).reshape(-1, 2)
+    bounds = np.broadcast_to(bounds, (nslices, 2))
+    cellw  = max(0, width  - spacing * (ncols - 1)) / float(ncols)
+    cellh  = max(0, height - spacing * (nrows - 1)) / float(max(1, nrows))
+
+    return _adjustPixelSizes(bounds[:, 0], bounds[:, 1], cellw, cellh)
+
+
 def calcVerticalSizes(canvasaxes, bounds, width, height):
     """Calculates the size of up to three canvases so they are laid out
     vertically.
@@ -572,3 +1713,37 @@ def _adjustPixelSize(wldWidth, wldHeight, pixWidth, pixHeight):
         pixHeight = wldHeight * (pixWidth  / wldWidth)
 
     return pixWidth, pixHeight
+
+
+def _adjustPixelSizes(wldWidths, wldHeights, pixWidths, pixHeights):
+    """Vectorised version of :func:`_adjustPixelSize`, used by
+    :func:`calcMontageSizes`. All arguments may be ``numpy`` arrays or
+    scalars, which are broadcast against each other.
+
+    :returns: A ``numpy`` array of shape :math:`N \\times 2` containing
+              the adjusted pixel widths and heights.
+    """
+
+    wldWidths, wldHeights, pixWidths, pixHeights = np.broadcast_arrays(
+        *[np.asarray(a, dtype=np.float64)
+          for a in (wldWidths, wldHeights, pixWidths, pixHeights)])
+
+    valid = (wldWidths  != 0) & (wldHeights != 0) & \
+            (pixWidths  != 0) & (pixHeights != 0)
+
+    # Avoid division by zero - the
+    # invalid sizes are set to 0 below
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pixRatio = pixWidths / pixHeights
+        wldRatio = wldWidths / wldHeights
+        widths   = np.where(pixRatio > wldRatio,
+                            wldWidths  * (pixHeights / wldHeights),
+                            pixWidths)
+        heights  = np.where(pixRatio < wldRatio,
+                            wldHeights * (pixWidths  / wldWidths),
+                            pixHeights)
+
+    sizes                 = np.column_stack((widths.ravel(), heights.ravel()))
+    sizes[~valid.ravel()] = 0
+
+    return sizes
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+#
+# rgba.py - Functions for drawing into RGBA bitmaps.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides a few functions for drawing into RGBA ``numpy``
+bitmaps. They are used by the ``'numpy'`` rendering backends of the
+:mod:`.colourbarbitmap` and :mod:`.textbitmap` modules.
+
+ .. autosummary::
+    :nosignatures:
+
+    toUint8
+    over
+    blendMask
+"""
+
+
+def toUint8(colours):
+    """Converts the given RGBA colour(s), with values in the range
+    ``[0, 1]``, into ``numpy.uint8`` values in the range ``[0, 255]``.
+    """
+    import numpy as np
+    return np.round(np.asarray(colours) * 255).astype(np.uint8)
+
+
+def over(src, dest):
+    """Composites the RGBA colour(s) ``src`` over the RGBA colour(s)
+    ``dest``. Colours must not be pre-multiplied, and must have values in
+    the range ``[0, 1]``.
+    """
+
+    import numpy as np
+
+    srca  = src[ ..., 3:]
+    desta = dest[..., 3:] * (1 - srca)
+    outa  = srca + desta
+    rgb   = src[..., :3] * srca + dest[..., :3] * desta
+    rgb   = rgb / np.where(outa > 0, outa, 1)
+
+    return np.concatenate((rgb, outa), axis=-1)
+
+
+def blendMask(bitmap, mask, x, y, colour):
+    """Blends the given ``colour`` into the ``bitmap``, weighted by the given
+    coverage ``mask``.
+
+    :arg bitmap: ``numpy.uint8`` array of shape
+                 :math:`height \\times width \\times 4`, which is modified
+                 in place.
+
+    :arg mask:   ``numpy.uint8`` coverage array, e.g. as returned by
+                 :func:`.textbitmap.rasteriseText`.
+
+    :arg x:      Column at which the left edge of the ``mask`` is located.
+
+    :arg y:      Row at which the top edge of the ``mask`` is located.
+
+    :arg colour: RGBA colour tuple, with values in the range ``[0, 1]``.
+    """
+
+    import numpy as np
+
+    mh, mw = mask.shape
+    bh, bw = bitmap.shape[:2]
+
+    # Clip the mask to the bitmap bounds
+    x0, y0 = max(x, 0),       max(y, 0)
+    x1, y1 = min(x + mw, bw), min(y + mh, bh)
+
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    mask        = mask[y0 - y:y1 - y, x0 - x:x1 - x]
+    region      = bitmap[y0:y1, x0:x1]
+    src         = np.empty(mask.shape + (4,), dtype=np.float32)
+    src[:]      = colour
+    src[..., 3] = colour[3] * mask / 255.0
+    region[:]   = toUint8(over(src, region / 255.0))
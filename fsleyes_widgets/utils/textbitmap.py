@@ -5,23 +5,93 @@
 #
 # Author: Paul McCarthy <pauldmccarthy@gmail.com>
 #
-"""This module provides a single function, :func:`textBitmap`, which renders
-some text off-screen using :mod:`matplotlib`, and returns it as an RGBA bitmap.
+"""This module provides a function, :func:`textBitmap`, which renders some
+text off-screen using :mod:`matplotlib`, and returns it as an RGBA bitmap.
+The :func:`textBitmaps` function can be used to efficiently render many
+strings at once.
+
+The :func:`rasteriseText` function is also provided - it renders text
+directly with the FreeType library that is bundled with :mod:`matplotlib`,
+without creating a figure. The :func:`measureText` function can be used to
+calculate the size of some text without rendering it. Rasterised text is
+cached in a :class:`GlyphAtlas`, so rendering the same text repeatedly (e.g.
+the orientation labels on a canvas) is very fast. Passing ``backend='numpy'``
+to :func:`textBitmap` will cause it to use :func:`rasteriseText` instead of
+creating a figure.
+
+
+Rendered bitmaps can be cached by passing ``cache=True`` to
+:func:`textBitmap` - subsequent calls with identical arguments will return
+the cached bitmap. The cache is a :class:`.BitmapCache`, which can be
+accessed via the :func:`textBitmapCache` function.
+"""
+
+
+import threading
+import collections
+
+import fsleyes_widgets.utils.bitmapcache as bmpcache
+import fsleyes_widgets.utils.figurepool  as figpool
+import fsleyes_widgets.utils.rgba        as rgba
+
+
+NUMPY_BACKEND_TOLERANCE = 0.01
+"""Maximum fraction of pixels in a bitmap generated by the :func:`textBitmap`
+``'numpy'`` backend which may differ from the equivalent bitmap generated by
+the ``'matplotlib'`` backend. Two pixels are considered to differ if any of
+their RGBA channels, after the RGB channels have been pre-multiplied by
+alpha, differ by more than ``16`` (out of ``255``).
+"""
+
+
+_cache = bmpcache.BitmapCache(maxBytes=8388608)
+"""The :class:`.BitmapCache` used by :func:`textBitmap` to cache bitmaps
+when it is called with ``cache=True``.
+"""
+
+
+_atlases = {}
+"""Dictionary of ``{(family, fontSize, dpi) : GlyphAtlas}`` mappings,
+containing all of the atlases created by :func:`glyphAtlas`.
 """
 
 
+_atlasLock = threading.Lock()
+"""Lock used to protect access to the :data:`_atlases` dictionary. """
+
+
+_fontLock = threading.Lock()
+"""Lock used by :class:`GlyphAtlas` instances to serialise access to
+``FT2Font`` objects. :mod:`matplotlib` caches one ``FT2Font`` per font file,
+which (prior to :mod:`matplotlib` 3.0) is shared by all threads, and an
+``FT2Font`` object holds the state of the most recently rendered string.
+"""
+
+
+def textBitmapCache():
+    """Returns the :class:`.BitmapCache` which is used by :func:`textBitmap`
+    to cache bitmaps. The cache can be used to adjust the byte budget, to
+    query hit/miss statistics, or to clear the cache.
+    """
+    return _cache
+
+
 def textBitmap(text,
                width,
                height,
                fontSize,
                fgColour,
                bgColour,
-               alpha=1.0):
+               alpha=1.0,
+               backend='matplotlib',
+               cache=False,
+               rotation=0,
+               linespacing=1.2):
     """Draw some text using :mod:`matplotlib`.
 
 
     The rendered text is returned as a RGBA bitmap within a ``numpy.uint8``
-    array of size :math:`w \\times h \\times 4`, with the top-left pixel
+    array of size :math:`h \\times w \\times 4`, with the top-left pixel
     located at index ``[0, 0, :]``.
 
     :arg text:     Text to render.
@@ -39,51 +109,699 @@ def textBitmap(text,
                    is accepted by :mod:`matplotlib`..
 
     :arg alpha:    Text transparency, in the range ``[0.0 - 1.0]``.
+
+    :arg backend:  Rendering backend - either ``'matplotlib'`` (the default),
+                   which draws the text onto a :mod:`matplotlib` figure, or
+                   ``'numpy'``, which draws the text with
+                   :func:`rasteriseText`. The output of the two backends
+                   differs by no more than :data:`NUMPY_BACKEND_TOLERANCE`.
+
+    :arg cache:    If ``True``, the bitmap is cached (see
+                   :func:`textBitmapCache`), or a previously cached bitmap
+                   is returned. Cached bitmaps are read-only. Defaults to
+                   ``False``.
+
+    :arg rotation:    Text rotation in degrees, counter-clockwise. Must be a
+                      multiple of ``90``. The text is drawn directly in its
+                      rotated orientation - the bitmap does not need to be
+                      rotated afterwards.
+
+    :arg linespacing: Spacing between lines of multi-line text (text which
+                      contains newline characters), as a multiple of the
+                      font size. Defaults to ``1.2``, the :mod:`matplotlib`
+                      default.
     """
 
+    rotation = _checkRotation(rotation)
+
+    if cache:
+
+        key = bmpcache.cacheKey(text,
+                                width,
+                                height,
+                                fontSize,
+                                fgColour,
+                                bgColour,
+                                alpha,
+                                backend,
+                                rotation,
+                                linespacing)
+
+        bitmap = _cache.get(key)
+
+        if bitmap is None:
+            bitmap = textBitmap(text,
+                                width,
+                                height,
+                                fontSize,
+                                fgColour,
+                                bgColour,
+                                alpha=alpha,
+                                backend=backend,
+                                rotation=rotation,
+                                linespacing=linespacing)
+            bitmap = _cache.put(key, bitmap)
+
+        return bitmap
+
+    if backend not in ('matplotlib', 'numpy'):
+        raise ValueError('backend must be matplotlib or '
+                         'numpy ({})'.format(backend))
+
+    if backend == 'numpy':
+        return _textBitmapNumpy(text,
+                                width,
+                                height,
+                                fontSize,
+                                fgColour,
+                                bgColour,
+                                alpha,
+                                rotation,
+                                linespacing)
+
     # Imports are expensive
-    import numpy                           as np
-    import matplotlib.backends.backend_agg as mplagg
-    import matplotlib.figure               as mplfig
-
-    dpi    = 96.0
-    fig    = mplfig.Figure(figsize=(width / dpi, height / dpi),
-                           dpi=dpi)
-    canvas = mplagg.FigureCanvasAgg(fig)
-    ax     = fig.add_axes([0, 0, 1, 1])
-    ax.axis('off')
-
-    if bgColour is not None: fig.patch.set_facecolor(bgColour)
-    else:                    fig.patch.set_alpha(0)
-
-    ax.set_xticks([])
-    ax.set_yticks([])
-
-    ax.text(0.5,
-            0.5,
-            text,
-            fontsize=fontSize,
-            verticalalignment='center',
-            horizontalalignment='center',
-            transform=ax.transAxes,
-            color=fgColour,
-            alpha=alpha)
-
-    fig.subplots_adjust(
-        bottom=0,
-        top=1,
-        left=0,
-        right=1)
-
-    canvas.draw()
-    buf = canvas.tostring_argb()
-    ncols, nrows = canvas.get_width_height()
-
-    bitmap = np.fromstring(buf, dtype=np.uint8)
-    bitmap = bitmap.reshape(nrows, ncols, 4)
-
-    rgb = bitmap[:, :, 1:]
-    a   = bitmap[:, :, 0]
-    bitmap = np.dstack((rgb, a))
+    import numpy as np
+
+    with figpool.pooledFigure(width, height) as (fig, canvas):
+
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.axis('off')
+
+        if bgColour is not None: fig.patch.set_facecolor(bgColour)
+        else:                    fig.patch.set_alpha(0)
+
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+        nudge = _rotationNudge(rotation)
+
+        ax.text(0.5 + nudge / float(width),
+                0.5 + nudge / float(height),
+                text,
+                fontsize=fontSize,
+                verticalalignment='center',
+                horizontalalignment='center',
+                transform=ax.transAxes,
+                color=fgColour,
+                alpha=alpha,
+                rotation=rotation,
+                linespacing=linespacing)
+
+        fig.subplots_adjust(
+            bottom=0,
+            top=1,
+            left=0,
+            right=1)
+
+        canvas.draw()
+
+        # Copy the RGBA pixel buffer, as
+        # the figure will be re-used
+        bitmap = np.array(figpool.canvasToArray(canvas))
 
     return bitmap
+
+
+def textBitmaps(texts,
+                sizes,
+                fontSize,
+                fgColour,
+                bgColour,
+                alpha=1.0,
+                copy=False,
+                backend='matplotlib',
+                rotation=0,
+                linespacing=1.2):
+    """Draw a collection of text strings. This is equivalent to calling
+    :func:`textBitmap` for each string, but is much faster, as all of the
+    strings are drawn on a single :mod:`matplotlib` canvas.
+
+    :arg texts:    Sequence of strings to render.
+
+    :arg sizes:    Sequence of ``(width, height)`` tuples, one for each
+                   string, specifying the size of each bitmap in pixels.
+                   Alternatively, a single ``(width, height)`` tuple may
+                   be provided, which is used for all strings.
+
+    :arg copy:     If ``False`` (the default), the returned bitmaps are views
+                   into a single array. Otherwise, each bitmap is a separate
+                   array.
+
+    See :func:`textBitmap` for details on the other arguments.
+
+    :returns:      A list of ``numpy.uint8`` arrays of size :math:`h \\times
+                   w \\times 4`, one for each string, which are identical to
+                   the bitmaps that would be returned by :func:`textBitmap`
+                   (including for rotated text, and for text which does not
+                   fit within its bitmap).
+    """
+
+    import numpy as np
+
+    rotation = _checkRotation(rotation)
+    texts    = list(texts)
+    sizes    = list(sizes)
+
+    if len(sizes) == 2 and not hasattr(sizes[0], '__len__'):
+        sizes = [tuple(sizes)] * len(texts)
+
+    if len(sizes) != len(texts):
+        raise ValueError('A size must be given for each string '
+                         '({} != {})'.format(len(sizes), len(texts)))
+
+    if backend not in ('matplotlib', 'numpy'):
+        raise ValueError('backend must be matplotlib or '
+                         'numpy ({})'.format(backend))
+
+    if len(texts) == 0:
+        return []
+
+    if backend == 'numpy':
+        return [_textBitmapNumpy(text, w, h, fontSize, fgColour, bgColour,
+                                 alpha, rotation, linespacing)
+                for text, (w, h) in zip(texts, sizes)]
+
+    # These imports are expensive
+    import matplotlib.transforms as transforms
+
+    cells, width, height = _packCells(sizes)
+    identity             = transforms.IdentityTransform()
+    nudge                = _rotationNudge(rotation)
+
+    with figpool.pooledFigure(width, height) as (fig, canvas):
+
+        if bgColour is not None: fig.patch.set_facecolor(bgColour)
+        else:                    fig.patch.set_alpha(0)
+
+        # Each string is drawn in display
+        # coordinates, at the centre of its
+        # cell, and clipped to its cell.
+        # This is equivalent to drawing it
+        # at the centre of its own figure.
+        for text, (x, y, w, h) in zip(texts, cells):
+
+            artist = fig.text(x + w / 2.0 + nudge,
+                              height - y - h / 2.0 + nudge,
+                              text,
+                              fontsize=fontSize,
+                              verticalalignment='center',
+                              horizontalalignment='center',
+                              transform=identity,
+                              color=fgColour,
+                              alpha=alpha,
+                              rotation=rotation,
+                              linespacing=linespacing)
+
+            artist.set_clip_box(transforms.Bbox.from_bounds(
+                x, height - y - h, w, h))
+
+        canvas.draw()
+
+        # Copy the RGBA pixel buffer
+        # once, and then slice it up
+        bitmap = np.array(figpool.canvasToArray(canvas))
+
+    bitmaps = [bitmap[y:y + h, x:x + w] for (x, y, w, h) in cells]
+
+    if copy:
+        bitmaps = [np.array(b) for b in bitmaps]
+
+    return bitmaps
+
+
+def _checkRotation(rotation):
+    """Used by :func:`textBitmap` and :func:`textBitmaps`. Checks that the
+    given text rotation is a multiple of ``90`` degrees, and returns it in
+    the range ``[0, 360)``.
+    """
+
+    if rotation % 90 != 0:
+        raise ValueError('rotation must be a multiple '
+                         'of 90 ({})'.format(rotation))
+
+    return int(rotation) % 360
+
+
+def _rotationNudge(rotation):
+    """Used by :func:`textBitmap`, :func:`textBitmaps` and
+    :func:`_textBitmapNumpy`. Returns a small offset, in pixels, by which
+    the centre of rotated text is moved up and to the right.
+
+    The Agg renderer rounds text positions to the nearest pixel. For rotated
+    text, positions which lie exactly half way between two pixels are
+    perturbed by floating point error in the ``sin``/``cos`` of the rotation
+    angle, and whether they are rounded up or down depends on where the text
+    is on the canvas. Offsetting the text by a fraction of a pixel ensures
+    that it is rounded in the same way wherever it is drawn.
+    Unrotated text is positioned exactly, so is not offset.
+    """
+    if rotation == 0: return 0
+    else:             return 1 / 1024.0
+
+
+def _packCells(sizes, maxWidth=4096):
+    """Used by :func:`textBitmaps`. Arranges a collection of rectangles into
+    rows on a single canvas.
+
+    Rectangles are placed at even pixel offsets - the Agg renderer rounds
+    half-pixel text positions to the nearest even pixel, so this ensures
+    that text is positioned within each rectangle in the same way as it
+    would be positioned on its own canvas.
+
+    :arg sizes:    Sequence of ``(width, height)`` tuples.
+
+    :arg maxWidth: Maximum canvas width.
+
+    :returns:      A tuple containing:
+
+                    - A list of ``(x, y, width, height)`` tuples, one for
+                      each rectangle, with ``(x, y)`` specifying the
+                      top-left corner of the rectangle, relative to the
+                      top-left corner of the canvas.
+
+                    - The canvas width.
+
+                    - The canvas height.
+    """
+
+    def even(v):
+        return v + (v % 2)
+
+    cells  = []
+    x      = 0
+    y      = 0
+    rowh   = 0
+    width  = 0
+
+    for w, h in sizes:
+
+        if x > 0 and x + w > maxWidth:
+            x    = 0
+            y   += even(rowh)
+            rowh = 0
+
+        cells.append((x, y, w, h))
+
+        x     += even(w)
+        rowh   = max(rowh, h)
+        width  = max(width, x)
+
+    return cells, max(width, 1), max(y + rowh, 1)
+
+
+def _textBitmapNumpy(text,
+                     width,
+                     height,
+                     fontSize,
+                     fgColour,
+                     bgColour,
+                     alpha,
+                     rotation=0,
+                     linespacing=1.2):
+    """Used by :func:`textBitmap`. Draws the text with :func:`rasteriseText`,
+    positioning it in the same way that :mod:`matplotlib` would.
+    """
+
+    import math
+    import numpy             as np
+    import matplotlib.colors as mplcolors
+
+    toRGBA = mplcolors.colorConverter.to_rgba
+
+    # matplotlib leaves the figure colour
+    # as white when it is made transparent.
+    # The text alpha overrides the alpha
+    # of the text colour.
+    if bgColour is not None: bgColour = toRGBA(bgColour)
+    else:                    bgColour = (1, 1, 1, 0)
+
+    fgColour = toRGBA(fgColour)
+
+    if alpha is not None:
+        fgColour = fgColour[:3] + (alpha,)
+
+    atlas     = glyphAtlas(fontSize)
+    bitmap    = np.empty((height, width, 4), dtype=np.uint8)
+    bitmap[:] = rgba.toUint8(bgColour)
+    theta     = math.radians(rotation)
+    cos       = math.cos(theta)
+    sin       = math.sin(theta)
+    nudge     = _rotationNudge(rotation)
+
+    # The text is centered on the bitmap. Each
+    # line is positioned relative to its
+    # baseline, and its coverage mask is then
+    # rotated and positioned, in the same way
+    # that the Agg renderer does.
+    for line, x, y in _layoutText(atlas, text, rotation, linespacing):
+
+        if line == '':
+            continue
+
+        mask, xoff, _, _, d = atlas.get(line)
+        mh, mw              = mask.shape
+
+        x = x + width / 2.0 + nudge
+        y = height - (y + height / 2.0 + nudge)
+        x = int(round(x + xoff + d * sin))
+        y = int(round(y + d * cos)) + 1
+
+        # The Agg renderer places the bottom left
+        # corner of the mask at (x, y), and then
+        # rotates the mask about that corner.
+        # Here we figure out where the top left
+        # corner of the rotated mask ends up.
+        corners = [(0, -mh), (mw, -mh), (mw, 0), (0, 0)]
+        corners = [(x + cos * cx + sin * cy,
+                    y - sin * cx + cos * cy) for cx, cy in corners]
+        mx      = int(round(min([c[0] for c in corners])))
+        my      = int(round(min([c[1] for c in corners])))
+        mask    = np.rot90(mask, int(round(rotation / 90.0)) % 4)
+
+        rgba.blendMask(bitmap, mask, mx, my, fgColour)
+
+    return bitmap
+
+
+def _layoutText(atlas, text, rotation, linespacing):
+    """Used by :func:`_textBitmapNumpy`. Calculates the position of each
+    line of some centered text, replicating the calculations performed by
+    ``matplotlib.text.Text._get_layout``.
+
+    :arg atlas:       :class:`GlyphAtlas` used to measure the text.
+
+    :arg text:        The text - may contain multiple lines.
+
+    :arg rotation:    Text rotation in degrees.
+
+    :arg linespacing: Line spacing, as a multiple of the font size.
+
+    :returns:         A list of ``(line, x, y)`` tuples, containing the
+                      position of the start of the baseline of each line,
+                      relative to the text centre, in display coordinates
+                      (i.e. with the y axis pointing upwards).
+    """
+
+    import math
+
+    lines    = text.split('\n')
+    lph, lpd = atlas.measure('lp')[1:]
+    mindy    = (lph - lpd) * linespacing
+    thisy    = 0.0
+    ws       = []
+    ys       = []
+
+    for i, line in enumerate(lines):
+
+        if line == '': w, h, d = 0, 0, 0
+        else:          w, h, d = atlas.measure(line)
+
+        h = max(h, lph)
+        d = max(d, lpd)
+
+        if i == 0: thisy  = -(h - d)
+        else:      thisy -= max(mindy, (h - d) * linespacing)
+
+        ws.append(w)
+        ys.append(thisy)
+
+        thisy -= d
+
+    # Lines are centered within the text
+    # bounding box, which is then rotated
+    # and centered on the origin.
+    width   = max(ws)
+    ymin    = ys[-1] - d
+    theta   = math.radians(rotation)
+    cos     = math.cos(theta)
+    sin     = math.sin(theta)
+    corners = [(0, ymin), (0, 0), (width, 0), (width, ymin)]
+
+    def rotate(x, y):
+        return (cos * x + -sin * y + 0.0, sin * x + cos * y + 0.0)
+
+    corners = [rotate(x, y) for x, y in corners]
+    offsetx = (min([c[0] for c in corners]) + max([c[0] for c in corners])) / 2
+    offsety = (min([c[1] for c in corners]) + max([c[1] for c in corners])) / 2
+    layout  = []
+
+    for line, w, y in zip(lines, ws, ys):
+        x, y = rotate(width / 2 - w / 2, y)
+        layout.append((line, x - offsetx, y - offsety))
+
+    return layout
+
+
+def rasteriseText(text, fontSize, family=None, dpi=96.0):
+    """Rasterises some text using the FreeType library that is bundled with
+    :mod:`matplotlib`, without creating a figure or canvas.
+
+    The text is rendered in the same way that the :mod:`matplotlib` Agg
+    backend renders text, so the result can be blitted into a bitmap that
+    has been generated by other means.
+
+    Rasterised text is cached in a :class:`GlyphAtlas` (see
+    :func:`glyphAtlas`), so the returned coverage array is read-only.
+
+    :arg text:     Text to render.
+
+    :arg fontSize: Font size in points.
+
+    :arg family:   Font family - defaults to the :mod:`matplotlib` default
+                   font family.
+
+    :arg dpi:      Resolution, in dots per inch.
+
+    :returns:      A tuple containing:
+
+                    - A ``numpy.uint8`` array of shape :math:`h \\times w`
+                      containing the glyph coverage, in the range
+                      ``[0, 255]``.
+
+                    - The horizontal offset, in pixels, of the coverage
+                      array, relative to the left edge of the text.
+
+                    - The width of the text, in pixels.
+
+                    - The height of the text, in pixels.
+
+                    - The descent of the text (the distance from the
+                      baseline to the bottom of the text), in pixels.
+    """
+    return glyphAtlas(fontSize, family, dpi).get(text)
+
+
+def measureText(text, fontSize, family=None, dpi=96.0):
+    """Measures some text, without rasterising it. The text is measured in
+    the same way that the :mod:`matplotlib` Agg backend measures text, so
+    the result can be used to calculate bitmap sizes before any text is
+    rendered. Measurements are cached in a :class:`GlyphAtlas` (see
+    :func:`glyphAtlas`).
+
+    See :func:`rasteriseText` for details on the arguments.
+
+    :returns: A tuple containing the width, height, and descent (the
+              distance from the baseline to the bottom of the text) of the
+              text, in pixels. The baseline is located at ``height -
+              descent`` pixels below the top of the text.
+    """
+    return glyphAtlas(fontSize, family, dpi).measure(text)
+
+
+def glyphAtlas(fontSize, family=None, dpi=96.0):
+    """Returns a :class:`GlyphAtlas` for the given font size, family, and
+    resolution, creating one if necessary. See :func:`rasteriseText` for
+    details on the arguments.
+    """
+
+    key = (family, fontSize, dpi)
+
+    with _atlasLock:
+        atlas = _atlases.get(key)
+
+        if atlas is None:
+            atlas          = GlyphAtlas(fontSize, family, dpi)
+            _atlases[key]  = atlas
+
+    return atlas
+
+
+def _getFont(fontFile):
+    """Used by :class:`GlyphAtlas`. Returns a ``FT2Font`` object for the
+    given font file. ``matplotlib.font_manager.get_font`` was added in
+    :mod:`matplotlib` 2.0 - for older versions, a new ``FT2Font`` is created.
+    """
+
+    import matplotlib.font_manager as fm
+
+    if hasattr(fm, 'get_font'):
+        return fm.get_font(fontFile)
+
+    import matplotlib.ft2font as ft2font
+    return ft2font.FT2Font(fontFile)
+
+
+def clearGlyphAtlases():
+    """Discards all :class:`GlyphAtlas` instances created by
+    :func:`glyphAtlas`. This must be called if the :mod:`matplotlib` font or
+    text rendering settings are changed.
+    """
+    with _atlasLock:
+        _atlases.clear()
+
+
+class GlyphAtlas(object):
+    """A ``GlyphAtlas`` rasterises and caches text, for a single font, size,
+    and resolution. Text is rasterised with the ``FT2Font`` FreeType
+    binding which is used by the :mod:`matplotlib` Agg backend.
+
+
+    Entries in the atlas are whole strings, rather than individual glyphs -
+    the Agg backend applies kerning and sub-pixel hinting when it renders
+    a string, so the shape and position of each glyph depends on its
+    neighbours. Caching whole strings means that text retrieved from the
+    atlas is identical to text drawn by the Agg backend. Short labels
+    (e.g. ``'L'``, ``'R'``) are single glyphs anyway.
+
+
+    A ``GlyphAtlas`` can also be used to measure text without rasterising
+    it, via the :meth:`measure` method. Measurements are cached separately
+    from rasterised text.
+
+
+    The font file and :mod:`matplotlib` text rendering settings are looked up
+    when the ``GlyphAtlas`` is created. The atlas holds at most
+    ``maxEntries`` strings, and ``maxEntries`` measurements - when it is
+    full, the least recently used entries are discarded.
+
+
+    A ``GlyphAtlas`` is thread-safe.
+    """
+
+
+    def __init__(self, fontSize, family=None, dpi=96.0, maxEntries=1024):
+        """Create a ``GlyphAtlas``. See :func:`rasteriseText` for details on
+        the ``fontSize``, ``family`` and ``dpi`` arguments.
+
+        :arg maxEntries: Maximum number of strings, and of measurements, to
+                         cache.
+        """
+
+        import matplotlib                      as mpl
+        import matplotlib.font_manager         as fm
+        import matplotlib.backends.backend_agg as mplagg
+
+        props = fm.FontProperties(family=family, size=fontSize)
+
+        self.__fontFile    = fm.findfont(props)
+        self.__fontSize    = fontSize
+        self.__dpi         = dpi
+        self.__flags       = mplagg.get_hinting_flag()
+        self.__antialiased = mpl.rcParams['text.antialiased']
+        self.__maxEntries  = maxEntries
+        self.__entries     = collections.OrderedDict()
+        self.__metrics     = collections.OrderedDict()
+        self.__lock        = threading.Lock()
+
+
+    def __len__(self):
+        """Returns the number of strings in the atlas. """
+        return len(self.__entries)
+
+
+    def __contains__(self, text):
+        """Returns ``True`` if the given text is in the atlas. """
+        return text in self.__entries
+
+
+    @property
+    def fontFile(self):
+        """Returns the path to the font file used by this ``GlyphAtlas``. """
+        return self.__fontFile
+
+
+    def get(self, text):
+        """Returns the rasterised coverage array and metrics for the given
+        text, rasterising it if it is not in the atlas. See
+        :func:`rasteriseText` for details on the return value.
+        """
+
+        with self.__lock:
+            entry = self.__entries.pop(text, None)
+            if entry is not None:
+                self.__entries[text] = entry
+                return entry
+
+        entry = self.__rasterise(text)
+
+        with self.__lock:
+            self.__entries[text] = entry
+            while len(self.__entries) > self.__maxEntries:
+                self.__entries.popitem(last=False)
+
+        return entry
+
+
+    def measure(self, text):
+        """Returns the width, height and descent of the given text, in
+        pixels, without rasterising it. See :func:`measureText`.
+        """
+
+        with self.__lock:
+
+            # The text has already been rasterised
+            entry = self.__entries.get(text)
+            if entry is not None:
+                return entry[2:]
+
+            metrics = self.__metrics.pop(text, None)
+            if metrics is not None:
+                self.__metrics[text] = metrics
+                return metrics
+
+        with _fontLock:
+
+            font = _getFont(self.__fontFile)
+
+            font.set_size(self.__fontSize, self.__dpi)
+            font.set_text(text, 0.0, flags=self.__flags)
+
+            width, height = font.get_width_height()
+            descent       = font.get_descent()
+
+        metrics = (width / 64.0, height / 64.0, descent / 64.0)
+
+        with self.__lock:
+            self.__metrics[text] = metrics
+            while len(self.__metrics) > self.__maxEntries:
+                self.__metrics.popitem(last=False)
+
+        return metrics
+
+
+    def __rasterise(self, text):
+        """Rasterises the given text. See :func:`rasteriseText`. """
+
+        import numpy as np
+
+        with _fontLock:
+
+            font = _getFont(self.__fontFile)
+
+            font.clear()
+            font.set_size(self.__fontSize, self.__dpi)
+            font.set_text(text, 0.0, flags=self.__flags)
+            font.draw_glyphs_to_bitmap(antialiased=self.__antialiased)
+
+            width, height = font.get_width_height()
+            descent       = font.get_descent()
+            xoff          = font.get_bitmap_offset()[0]
+            mask          = np.array(font.get_image(), dtype=np.uint8)
+
+        mask.setflags(write=False)
+
+        return (mask,
+                xoff    / 64.0,
+                width   / 64.0,
+                height  / 64.0,
+                descent / 64.0)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+#
+# wxbitmap.py - Conversion between numpy arrays and wx bitmaps/images.
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+"""This module provides functions for converting RGBA bitmaps, stored in
+``numpy`` arrays, to and from ``wx.Bitmap`` and ``wx.Image`` objects:
+
+ .. autosummary::
+    :nosignatures:
+
+    empty
+    toBitmap
+    toImage
+    fromBitmap
+
+
+These functions work with both wxPython/Phoenix and older versions of
+wxPython.
+
+
+By default, arrays are assumed to have shape :math:`height \\times width
+\\times C`, where :math:`C` is ``4`` (RGBA) or ``3`` (RGB), as used by the
+:func:`.textBitmap` function and the :mod:`.layout` module. Arrays of shape
+:math:`width \\times height \\times C`, as returned by the
+:func:`.colourBarBitmap` function, can be converted by passing
+``transpose=True``.
+
+
+``wx`` needs bitmap data to be stored row by row, in a contiguous buffer.
+Arrays which are not laid out in this way are copied before being passed to
+``wx`` - the :func:`empty` function can be used to allocate an array which
+can be passed to ``wx`` without being copied.
+"""
+
+
+_phoenix = None
+"""Set to ``True`` or ``False`` the first time that :func:`_isPhoenix` is
+called.
+"""
+
+
+def empty(width, height, channels=4, transpose=False):
+    """Allocates an uninitialised ``numpy.uint8`` array which can be passed
+    to :func:`toBitmap` or :func:`toImage` without being copied.
+
+    :arg width:     Bitmap width in pixels.
+
+    :arg height:    Bitmap height in pixels.
+
+    :arg channels:  Number of channels - ``4`` (RGBA) or ``3`` (RGB).
+
+    :arg transpose: If ``True``, an array of shape :math:`width \\times
+                    height \\times channels` is returned. Otherwise (the
+                    default), an array of shape :math:`height \\times width
+                    \\times channels` is returned.
+    """
+
+    import numpy as np
+
+    array = np.empty((height, width, channels), dtype=np.uint8)
+
+    if transpose: return array.transpose((1, 0, 2))
+    else:         return array
+
+
+def toBitmap(array, transpose=False):
+    """Creates a ``wx.Bitmap`` from the given ``numpy`` array.
+
+    :arg array:     ``numpy.uint8`` array containing RGBA or RGB data.
+
+    :arg transpose: If ``True``, the array is assumed to have shape
+                    :math:`width \\times height \\times C`. Otherwise (the
+                    default), the array is assumed to have shape
+                    :math:`height \\times width \\times C`.
+
+    :returns:       A ``wx.Bitmap``.
+    """
+
+    import wx
+
+    array         = _rows(array, transpose)
+    height, width = array.shape[:2]
+
+    if _isPhoenix():
+        if array.shape[2] == 4: return wx.Bitmap.FromBufferRGBA(width,
+                                                                height,
+                                                                array)
+        else:                   return wx.Bitmap.FromBuffer(width,
+                                                            height,
+                                                            array)
+    else:
+        if array.shape[2] == 4: return wx.BitmapFromBufferRGBA(width,
+                                                               height,
+                                                               array)
+        else:                   return wx.BitmapFromBuffer(width,
+                                                           height,
+                                                           array)
+
+
+def toImage(array, transpose=False):
+    """Creates a ``wx.Image`` from the given ``numpy`` array.
+
+    ``wx.Image`` objects store the RGB and alpha channels separately, so
+    the channels of a RGBA array are copied into new arrays, which are used
+    by the image without being copied again. A RGB array which is stored
+    contiguously in row-major order is not copied at all - the image will
+    refer to the array memory, so changes to the array will affect the
+    image.
+
+    :arg array:     ``numpy.uint8`` array containing RGBA or RGB data.
+
+    :arg transpose: If ``True``, the array is assumed to have shape
+                    :math:`width \\times height \\times C`. Otherwise (the
+                    default), the array is assumed to have shape
+                    :math:`height \\times width \\times C`.
+
+    :returns:       A ``wx.Image``.
+    """
+
+    import numpy as np
+    import wx
+
+    array         = _rows(array, transpose)
+    height, width = array.shape[:2]
+
+    # ImageFromBuffer tests the truth value of
+    # the alpha buffer, which is ambiguous for
+    # numpy arrays, so we pass the raw buffer
+    # (a memoryview under python 3, or a buffer
+    # under python 2) instead of the array.
+    if array.shape[2] == 4:
+        rgb   = np.ascontiguousarray(array[:, :, :3])
+        alpha = np.ascontiguousarray(array[:, :, 3]).data
+    else:
+        rgb   = array
+        alpha = None
+
+    return wx.ImageFromBuffer(width, height, rgb, alpha)
+
+
+def fromBitmap(bmp, transpose=False):
+    """Copies the contents of the given ``wx.Bitmap`` into a ``numpy``
+    array. Bitmaps which do not have an alpha channel are given an alpha
+    of ``255``.
+
+    :arg bmp:       A ``wx.Bitmap``.
+
+    :arg transpose: If ``True``, an array of shape :math:`width \\times
+                    height \\times 4` is returned (this is a view on an
+                    array with shape :math:`height \\times width \\times
+                    4`). Otherwise (the default), an array of shape
+                    :math:`height \\times width \\times 4` is returned.
+
+    :returns:       A ``numpy.uint8`` array containing RGBA data.
+    """
+
+    import numpy as np
+    import wx
+
+    width  = bmp.GetWidth()
+    height = bmp.GetHeight()
+    array  = np.empty((height, width, 4), dtype=np.uint8)
+
+    if bmp.HasAlpha():
+        bmp.CopyToBuffer(array, wx.BitmapBufferFormat_RGBA)
+    else:
+        rgb = np.empty((height, width, 3), dtype=np.uint8)
+        bmp.CopyToBuffer(rgb, wx.BitmapBufferFormat_RGB)
+        array[:, :, :3] = rgb
+        array[:, :,  3] = 255
+
+    if transpose: return array.transpose((1, 0, 2))
+    else:         return array
+
+
+def _rows(array, transpose):
+    """Used by :func:`toBitmap` and :func:`toImage`. Validates the given
+    array, and returns it (or a copy of it) with shape :math:`height \\times
+    width \\times C`, and stored contiguously in row-major order.
+    """
+
+    import numpy as np
+
+    if array.dtype != np.uint8:
+        raise ValueError('Bitmap must be a uint8 array ({})'.format(
+            array.dtype))
+
+    if array.ndim != 3 or array.shape[2] not in (3, 4):
+        raise ValueError('Bitmap must have shape (h, w, 3) or '
+                         '(h, w, 4) ({})'.format(array.shape))
+
+    if transpose:
+        array = array.transpose((1, 0, 2))
+
+    # Only copy if the array is
+    # not already stored row-wise
+    return np.ascontiguousarray(array)
+
+
+def _isPhoenix():
+    """Returns ``True`` if wxPython/Phoenix is being used, ``False``
+    otherwise. The result is cached, so that the wx version does not
+    need to be checked on every call.
+    """
+
+    global _phoenix
+
+    if _phoenix is None:
+        import fsleyes_widgets as fw
+        _phoenix = fw.wxversion() == fw.WX_PHOENIX
+
+    return _phoenix
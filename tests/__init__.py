@@ -263,3 +263,23 @@ def simfocus(from_, to):
 
     to.SetFocus()
     realYield()
+
+
+def register_cmap(name, cmap):
+    import matplotlib    as mpl
+    import matplotlib.cm as cm
+    registry = getattr(mpl, 'colormaps', None)
+    if hasattr(registry, 'register'):
+        registry.register(cmap, name=name, force=True)
+    else:
+        cm.register_cmap(name=name, cmap=cmap)
+
+
+def unregister_cmap(name):
+    import matplotlib    as mpl
+    import matplotlib.cm as cm
+    registry = getattr(mpl, 'colormaps', None)
+    if hasattr(registry, 'unregister'):
+        registry.unregister(name)
+    elif hasattr(cm, 'unregister_cmap'):
+        cm.unregister_cmap(name)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#
+# test_bitmapcache.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import numpy as np
+
+import pytest
+
+import fsleyes_widgets.utils.bitmapcache as bmpcache
+
+
+def test_get_put():
+
+    cache = bmpcache.BitmapCache()
+    bmp   = np.zeros((10, 10, 4), dtype=np.uint8)
+
+    assert cache.get('a')             is None
+    assert cache.get('a', 'default') == 'default'
+    assert cache.put('a', bmp)        is bmp
+    assert cache.get('a')             is bmp
+    assert 'a' in cache
+    assert len(cache)    == 1
+    assert cache.nbytes  == bmp.nbytes
+    assert cache.hits    == 1
+    assert cache.misses  == 2
+
+    stats = cache.stats()
+    assert stats['hits']     == 1
+    assert stats['misses']   == 2
+    assert stats['entries']  == 1
+    assert stats['nbytes']   == bmp.nbytes
+    assert stats['maxBytes'] == cache.maxBytes
+
+    # replacing an entry
+    bmp2 = np.zeros((5, 5, 4), dtype=np.uint8)
+    cache.put('a', bmp2)
+    assert cache.get('a') is bmp2
+    assert cache.nbytes   == bmp2.nbytes
+
+
+def test_readonly():
+
+    cache = bmpcache.BitmapCache()
+    bmp   = cache.put('a', np.zeros((10, 10, 4), dtype=np.uint8))
+
+    with pytest.raises(ValueError):
+        bmp[:] = 1
+
+    with pytest.raises(ValueError):
+        cache.get('a')[:] = 1
+
+
+def test_lru_eviction():
+
+    bmps  = [np.zeros((10, 10, 4), dtype=np.uint8) for i in range(4)]
+    cache = bmpcache.BitmapCache(maxBytes=3 * bmps[0].nbytes)
+
+    cache.put(0, bmps[0])
+    cache.put(1, bmps[1])
+    cache.put(2, bmps[2])
+
+    # access 0, so 1 is
+    # the least recent
+    cache.get(0)
+    cache.put(3, bmps[3])
+
+    assert len(cache) == 3
+    assert 0 in cache
+    assert 1 not in cache
+    assert 2 in cache
+    assert 3 in cache
+    assert cache.nbytes == 3 * bmps[0].nbytes
+
+    # reducing the budget evicts entries
+    cache.maxBytes = bmps[0].nbytes
+    assert len(cache) == 1
+    assert 3 in cache
+
+    # arrays bigger than the
+    # budget are not cached
+    big = np.zeros((20, 20, 4), dtype=np.uint8)
+    assert cache.put('big', big) is big
+    assert 'big' not in cache
+    assert 3 in cache
+
+
+def test_clear():
+
+    cache = bmpcache.BitmapCache()
+    cache.put('a', np.zeros((10, 10, 4), dtype=np.uint8))
+    cache.get('a')
+    cache.get('b')
+    cache.clear()
+
+    assert len(cache)   == 0
+    assert cache.nbytes == 0
+    assert cache.hits   == 0
+    assert cache.misses == 0
+
+
+def test_cacheKey():
+
+    key1 = bmpcache.cacheKey('a', [1, 2], np.array([0.5, 1.0]), None)
+    key2 = bmpcache.cacheKey('a', (1, 2), (0.5, 1.0),           None)
+
+    assert key1 == key2
+    assert hash(key1) == hash(key2)
+    assert bmpcache.cacheKey([[1], [2]]) == (((1,), (2,)),)
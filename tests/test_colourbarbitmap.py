@@ -9,13 +9,14 @@
 import os.path   as op
 import itertools as it
 
+import numpy            as np
 import matplotlib.image as mplimg
 
 import pytest
 
 import fsleyes_widgets.utils.colourbarbitmap as cbarbmp
 
-from . import compare_images
+from . import compare_images, register_cmap, unregister_cmap
 
 
 datadir = op.join(op.dirname(__file__), 'testdata', 'colourbarbitmap')
@@ -258,6 +259,7 @@ def test_badargs():
         dict(cmap='badcmap'),
         dict(orientation='badorient'),
         dict(labelside='badside'),
+        dict(backend='badbackend'),
         dict(ticks=[0, 0.5, 1],
              ticklabels=['l', 'l', 'l'],
              tickalign=['badalign', 'badalign', 'badalign']),
@@ -267,3 +269,399 @@ def test_badargs():
     for t in testcases:
         with pytest.raises(Exception):
             cbarbmp.colourBarBitmap(t.get('cmap', 'Reds'), 50, 50, **t)
+
+
+def _numpy_parity(mplbmp, npbmp):
+    """Returns the fraction of pixels which differ between the two bitmaps,
+    as described in the colourbarbitmap.NUMPY_BACKEND_TOLERANCE docs.
+    """
+
+    def premultiply(bmp):
+        bmp = np.array(bmp, dtype=np.int32)
+        bmp[..., :3] = bmp[..., :3] * bmp[..., 3:] // 255
+        return bmp
+
+    diff = np.abs(premultiply(mplbmp) - premultiply(npbmp)).max(axis=2)
+
+    return np.mean(diff > 16)
+
+
+def test_numpy_backend():
+
+    sizes        = [(300, 100), (400, 30), (400, 12), (60, 20)]
+    orientations = ['horizontal', 'vertical']
+    labelsides   = ['top', 'bottom']
+    fontsizes    = [6, 16]
+    alphas       = [0.25, 1.0]
+    bgColours    = [None, (0, 0, 0, 1)]
+    textcases    = [
+        dict(),
+        dict(label='Label'),
+        dict(ticks=[0.0, 0.25, 0.75, 1.0],
+             ticklabels=['0.0', '0.25', '0.75', '1.0']),
+        dict(ticks=[0.2, 0.5, 0.8],
+             ticklabels=['0.2', '0.5', '0.8'],
+             tickalign=['left', 'center', 'right'],
+             label='Label')]
+
+    testcases = it.product(sizes,
+                           orientations,
+                           labelsides,
+                           fontsizes,
+                           alphas,
+                           bgColours,
+                           textcases)
+
+    for (w, h), orient, side, size, alpha, bg, textargs in testcases:
+
+        if orient[0] == 'v': width, height = h, w
+        else:                width, height = w, h
+
+        kwargs = dict(orientation=orient,
+                      labelside=side,
+                      fontsize=size,
+                      alpha=alpha,
+                      bgColour=bg,
+                      textColour=(0, 0, 0.2, 1))
+        kwargs.update(textargs)
+
+        # Colour bars which are too small for
+        # their labels are rejected by both
+        # backends in the same way
+        try:
+            mplbmp = cbarbmp.colourBarBitmap('Reds', width, height, **kwargs)
+        except ValueError:
+            with pytest.raises(ValueError):
+                cbarbmp.colourBarBitmap('Reds', width, height,
+                                        backend='numpy', **kwargs)
+            continue
+
+        npbmp  = cbarbmp.colourBarBitmap('Reds', width, height,
+                                         backend='numpy', **kwargs)
+
+        assert mplbmp.shape == npbmp.shape
+        assert mplbmp.dtype == npbmp.dtype
+        assert _numpy_parity(mplbmp, npbmp) <= \
+            cbarbmp.NUMPY_BACKEND_TOLERANCE
+
+
+def test_numpy_backend_negCmap_invert():
+
+    testcases = it.product(['Reds'],
+                           [None, 'Blues'],
+                           [False, True],
+                           ['vertical', 'horizontal'],
+                           [6, 256])
+
+    for cmap, negCmap, invert, orient, res in testcases:
+
+        if orient == 'vertical': height, width = 100, 25
+        else:                    width, height = 100, 25
+
+        kwargs = dict(cmapResolution=res,
+                      negCmap=negCmap,
+                      invert=invert,
+                      orientation=orient)
+
+        mplbmp = cbarbmp.colourBarBitmap(cmap, width, height, **kwargs)
+        npbmp  = cbarbmp.colourBarBitmap(cmap, width, height,
+                                         backend='numpy', **kwargs)
+
+        assert _numpy_parity(mplbmp, npbmp) <= \
+            cbarbmp.NUMPY_BACKEND_TOLERANCE
+
+
+def test_numpy_backend_too_small():
+
+    testcases = [((400, 8),  dict()),
+                 ((8,   50), dict()),
+                 ((400, 25), dict(label='Label', fontsize=14)),
+                 ((400, 40), dict(label='Label',
+                                  ticks=[0, 1],
+                                  ticklabels=['0', '1'],
+                                  fontsize=14))]
+
+    for (width, height), kwargs in testcases:
+        for backend in ['matplotlib', 'numpy']:
+            with pytest.raises(ValueError):
+                cbarbmp.colourBarBitmap('Reds', width, height,
+                                        orientation='horizontal',
+                                        backend=backend,
+                                        **kwargs)
+
+        with pytest.raises(ValueError):
+            cbarbmp.ColourBarRenderer('Reds', width, height,
+                                      orientation='horizontal',
+                                      **kwargs).render()
+
+
+def test_cache():
+
+    cache = cbarbmp.colourBarCache()
+    cache.clear()
+
+    kwargs = dict(ticks=[0, 0.5, 1],
+                  ticklabels=['0', '0.5', '1'],
+                  label='Label',
+                  orientation='horizontal')
+
+    bmp1 = cbarbmp.colourBarBitmap('Reds', 100, 50, cache=True, **kwargs)
+    assert cache.misses == 1
+    assert cache.hits   == 0
+
+    # equivalent arguments (lists vs
+    # tuples) should map to the same entry
+    kwargs['ticks'] = (0, 0.5, 1)
+    bmp2 = cbarbmp.colourBarBitmap('Reds', 100, 50, cache=True, **kwargs)
+    assert cache.misses == 1
+    assert cache.hits   == 1
+    assert bmp2 is bmp1
+
+    # cached bitmaps are read-only
+    with pytest.raises(ValueError):
+        bmp1[:] = 0
+
+    # different arguments -> different bitmap
+    bmp3 = cbarbmp.colourBarBitmap('Blues', 100, 50, cache=True, **kwargs)
+    assert cache.misses == 2
+    assert bmp3 is not bmp1
+
+    # uncached calls are not affected
+    bmp4 = cbarbmp.colourBarBitmap('Reds', 100, 50, **kwargs)
+    assert bmp4 is not bmp1
+    assert np.all(bmp4 == bmp1)
+    assert cache.misses == 2
+    assert cache.hits   == 1
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_getColourLUT():
+
+    import matplotlib.cm as cm
+
+    for cmap, res, invert, alpha in it.product(['Reds', 'Blues'],
+                                               [6, 256],
+                                               [False, True],
+                                               [0.5, 1.0]):
+
+        lut = cbarbmp.getColourLUT(cmap, res, invert, alpha)
+
+        exp = np.linspace(0, 1, res)
+        if invert: exp = exp[::-1]
+        exp = cm.get_cmap(cmap)(exp)
+        exp[:, 3] = alpha
+
+        assert lut.shape == (res, 4)
+        assert np.all(np.isclose(lut, exp))
+
+        # LUTs are shared and read-only
+        assert cbarbmp.getColourLUT(cmap, res, invert, alpha) is lut
+        with pytest.raises(ValueError):
+            lut[:] = 0
+
+        # genColours returns the LUT in
+        # a form suitable for imshow
+        cols = cbarbmp.genColours(cmap, res, invert, alpha)
+        assert cols.shape == (2, res, 4)
+        assert np.all(cols[0] == lut)
+        assert np.all(cols[1] == lut)
+
+
+def test_getColourLUT_Colormap():
+
+    import matplotlib.colors as mplcolors
+
+    cmap = mplcolors.LinearSegmentedColormap.from_list(
+        'test_cmap', [(0, 0, 0), (1, 0, 0)])
+
+    lut = cbarbmp.getColourLUT(cmap, 8)
+    assert np.all(np.isclose(lut, cmap(np.linspace(0, 1, 8))))
+    assert cbarbmp.getColourLUT(cmap, 8) is lut
+
+    cols = cbarbmp.genColours(cmap, 8, False, 1.0)
+    assert np.all(cols[0] == lut)
+
+    # a different colour map with the
+    # same name gets a different LUT
+    other = mplcolors.LinearSegmentedColormap.from_list(
+        'test_cmap', [(0, 0, 0), (0, 0, 1)])
+    assert np.all(np.isclose(cbarbmp.getColourLUT(other, 8)[-1],
+                             [0, 0, 1, 1]))
+
+    for backend in ['matplotlib', 'numpy']:
+        bmp1 = cbarbmp.colourBarBitmap(cmap, 100, 25,
+                                       orientation='horizontal',
+                                       negCmap=other,
+                                       backend=backend)
+        bmp2 = cbarbmp.colourBarBitmap(cmap, 100, 25,
+                                       orientation='horizontal',
+                                       negCmap=other,
+                                       backend=backend,
+                                       cache=True)
+        assert np.all(bmp1 == bmp2)
+
+
+def test_getColourLUT_reregister():
+
+    import matplotlib.colors as mplcolors
+
+    name = 'fsleyes_widgets_test_cmap'
+    red  = mplcolors.LinearSegmentedColormap.from_list(
+        name, [(0, 0, 0), (1, 0, 0)])
+    blue = mplcolors.LinearSegmentedColormap.from_list(
+        name, [(0, 0, 0), (0, 0, 1)])
+
+    try:
+        register_cmap(name, red)
+        lut1 = cbarbmp.getColourLUT(name, 8)
+        bmp1 = cbarbmp.colourBarBitmap(name, 100, 25,
+                                       orientation='horizontal',
+                                       backend='numpy',
+                                       cache=True)
+
+        register_cmap(name, blue)
+        lut2 = cbarbmp.getColourLUT(name, 8)
+        bmp2 = cbarbmp.colourBarBitmap(name, 100, 25,
+                                       orientation='horizontal',
+                                       backend='numpy',
+                                       cache=True)
+
+        assert np.all(np.isclose(lut1[-1], [1, 0, 0, 1]))
+        assert np.all(np.isclose(lut2[-1], [0, 0, 1, 1]))
+        assert bmp1[50, 12, 0] > bmp1[50, 12, 2]
+        assert bmp2[50, 12, 2] > bmp2[50, 12, 0]
+
+    finally:
+        unregister_cmap(name)
+
+
+def test_colourBarBitmaps():
+
+    specs = [dict(cmap='Reds',  width=100, height=25,
+                  orientation='horizontal'),
+             dict(cmap='Blues', width=50,  height=200,
+                  orientation='vertical', label='Label'),
+             dict(cmap='Greys', width=300, height=100,
+                  orientation='horizontal', ticks=[0, 0.5, 1],
+                  ticklabels=['0', '0.5', '1'], backend='numpy'),
+             dict(cmap='Reds',  width=50,  height=50, negCmap='Blues')]
+
+    expected = [cbarbmp.colourBarBitmap(**spec) for spec in specs]
+    serial   = cbarbmp.colourBarBitmaps(specs, workers=1)
+    parallel = cbarbmp.colourBarBitmaps(specs, workers=2)
+
+    assert len(serial)   == len(specs)
+    assert len(parallel) == len(specs)
+
+    for exp, sbmp, pbmp in zip(expected, serial, parallel):
+        assert sbmp.shape == exp.shape
+        assert pbmp.shape == exp.shape
+        assert pbmp.dtype == exp.dtype
+        assert np.all(sbmp == exp)
+        assert np.all(pbmp == exp)
+
+    assert cbarbmp.colourBarBitmaps([], workers=2) == []
+
+    # errors in workers are propagated
+    specs.append(dict(cmap='Reds', width=50, height=50,
+                      orientation='badorient'))
+    with pytest.raises(ValueError):
+        cbarbmp.colourBarBitmaps(specs, workers=2)
+
+
+def test_ColourBarRenderer():
+
+    for orient, (w, h) in [('horizontal', (300, 60)),
+                           ('vertical',   (60, 300))]:
+
+        kwargs   = dict(orientation=orient,
+                        ticks=[0, 0.5, 1],
+                        ticklabels=['0', '50', '100'],
+                        tickalign=['left', 'center', 'right'],
+                        label='Label')
+        renderer = cbarbmp.ColourBarRenderer('hot', w, h, **kwargs)
+
+        def check(cmap, bmp):
+            exp = cbarbmp.colourBarBitmap(cmap, w, h, backend='numpy',
+                                          **kwargs)
+            assert bmp.shape == (w, h, 4)
+            assert np.all(bmp == exp)
+
+        check('hot', renderer.render())
+
+        # text-only updates
+        for labels in [['1',    '2', '3'],
+                       ['-100', '0', '1000'],
+                       ['a',    'b', 'c']]:
+            kwargs['ticklabels'] = labels
+            check('hot', renderer.update(ticklabels=labels))
+
+        kwargs['label'] = 'Another label'
+        check('hot', renderer.update(label='Another label'))
+
+        # layout changes
+        kwargs['ticks']      = [-0.5, 1.5]
+        kwargs['ticklabels'] = ['-0.5', '1.5']
+        kwargs['tickalign']  = None
+        check('hot', renderer.update(ticks=[-0.5, 1.5],
+                                     ticklabels=['-0.5', '1.5'],
+                                     tickalign=None))
+
+        kwargs['label'] = None
+        check('hot', renderer.update(label=None))
+
+        # gradient changes
+        kwargs['invert'] = True
+        check('cool', renderer.update(cmap='cool', invert=True))
+
+        # returned bitmaps are independent
+        # of the renderer's internal state
+        bmp1 = renderer.render()
+        bmp2 = renderer.update(ticklabels=['x', 'y'])
+        assert not np.all(bmp1 == bmp2)
+
+    with pytest.raises(ValueError):
+        cbarbmp.ColourBarRenderer('hot', 100, 50, badprop=1)
+
+
+def test_colourBarFrames():
+
+    kwargs = dict(orientation='horizontal', label='Label')
+    ranges = [(i, i * 10) for i in range(10)]
+    seq    = [([0, 1], ['{}'.format(lo), '{}'.format(hi)])
+              for lo, hi in ranges]
+
+    # frames share the same buffer
+    frames = []
+    for frame in cbarbmp.colourBarFrames('hot', 200, 60, seq, **kwargs):
+        exp = cbarbmp.colourBarBitmap('hot', 200, 60,
+                                      ticks=[0, 1],
+                                      ticklabels=seq[len(frames)][1],
+                                      backend='numpy',
+                                      **kwargs)
+        assert np.all(frame == exp)
+        frames.append(frame)
+
+    assert len(frames) == len(seq)
+    assert all([f is frames[0] for f in frames])
+
+    # copies
+    seq    = [dict(ticks=[0, 1], ticklabels=['0', '1'], label='A'),
+              dict(label='B')]
+    frames = list(cbarbmp.colourBarFrames('hot', 60, 200, seq, copy=True))
+
+    assert len(frames) == 2
+    assert frames[0] is not frames[1]
+    assert np.all(frames[0] == cbarbmp.colourBarBitmap(
+        'hot', 60, 200, ticks=[0, 1], ticklabels=['0', '1'], label='A',
+        backend='numpy'))
+    assert np.all(frames[1] == cbarbmp.colourBarBitmap(
+        'hot', 60, 200, ticks=[0, 1], ticklabels=['0', '1'], label='B',
+        backend='numpy'))
+
+    # bad output shape
+    renderer = cbarbmp.ColourBarRenderer('hot', 60, 200)
+    with pytest.raises(ValueError):
+        renderer.render(np.zeros((60, 60, 4), dtype=np.uint8))
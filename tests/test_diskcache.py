@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+#
+# test_diskcache.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import            os
+import os.path as op
+import            sys
+import            time
+import            shutil
+import            tempfile
+import            textwrap
+import            subprocess
+import            contextlib
+
+import numpy as np
+
+import fsleyes_widgets.utils.diskcache       as dskcache
+import fsleyes_widgets.utils.colourbarbitmap as cbarbmp
+
+from . import register_cmap, unregister_cmap
+
+
+@contextlib.contextmanager
+def tempdir():
+    testdir = tempfile.mkdtemp()
+    try:
+        yield testdir
+    finally:
+        shutil.rmtree(testdir)
+
+
+def test_get_put():
+
+    with tempdir() as td:
+
+        cachedir = op.join(td, 'cache')
+        cache    = dskcache.DiskCache(cachedir)
+        arr      = np.random.randint(0, 255, (10, 20, 4)).astype(np.uint8)
+
+        assert op.isdir(cachedir)
+        assert cache.directory                 == cachedir
+        assert cache.get(('a', 1))             is None
+        assert cache.get(('a', 1), 'default') == 'default'
+        assert cache.put(('a', 1), arr)        is arr
+        assert not arr.flags.writeable
+
+        got = cache.get(('a', 1))
+
+        assert isinstance(got, np.memmap)
+        assert not got.flags.writeable
+        assert got.dtype == arr.dtype
+        assert np.all(got == arr)
+        assert cache.nbytes() >= arr.nbytes
+
+        # entries are shared between instances
+        assert np.all(dskcache.DiskCache(cachedir).get(('a', 1)) == arr)
+
+        # no temporary files are left behind
+        assert len(os.listdir(cachedir)) == 1
+
+        cache.clear()
+        assert cache.get(('a', 1)) is None
+        assert cache.nbytes()      == 0
+
+
+def test_version():
+
+    with tempdir() as td:
+
+        cache1 = dskcache.DiskCache(td, version='1.0')
+        cache2 = dskcache.DiskCache(td, version='2.0')
+        arr    = np.zeros((5, 5))
+
+        cache1.put('a', arr)
+
+        assert cache1.get('a') is not None
+        assert cache2.get('a') is None
+        assert cache1.path('a') != cache2.path('a')
+
+
+def test_trim():
+
+    with tempdir() as td:
+
+        arr   = np.zeros(1000, dtype=np.uint8)
+        cache = dskcache.DiskCache(td)
+        size  = cache.put('size', arr.copy()) is not None and cache.nbytes()
+
+        cache.clear()
+
+        cache = dskcache.DiskCache(td, maxBytes=size * 3)
+
+        for i in range(3):
+            cache.put(i, arr.copy())
+            os.utime(cache.path(i), (time.time() - 100 + i,) * 2)
+
+        # mark entry 0 as recently used
+        assert cache.get(0) is not None
+
+        cache.put(3, arr.copy())
+
+        assert cache.nbytes() == size * 3
+        assert cache.get(0) is not None
+        assert cache.get(1) is None
+        assert cache.get(2) is not None
+        assert cache.get(3) is not None
+
+        # arrays bigger than the budget are not kept
+        cache.put(4, np.zeros(size * 4, dtype=np.uint8))
+        assert cache.get(4) is None
+
+
+def test_trim_tmp_files():
+
+    with tempdir() as td:
+
+        cache = dskcache.DiskCache(td)
+        stale = op.join(td, 'stale.tmp')
+        fresh = op.join(td, 'fresh.tmp')
+
+        for path in [stale, fresh]:
+            with open(path, 'wb') as f:
+                f.write(b'partially written')
+
+        os.utime(stale, (time.time() - dskcache.TMP_GRACE_PERIOD - 1,) * 2)
+
+        # temporary files do not count
+        # towards the cache size, and are
+        # only removed once they are stale
+        assert cache.nbytes() == 0
+
+        cache.trim()
+
+        assert not op.exists(stale)
+        assert     op.exists(fresh)
+
+
+def test_corrupt_file():
+
+    with tempdir() as td:
+
+        cache = dskcache.DiskCache(td)
+
+        with open(cache.path('a'), 'wt') as f:
+            f.write('not a numpy file')
+
+        assert cache.get('a') is None
+        assert not op.exists(cache.path('a'))
+
+
+def test_colourBarBitmap_diskCache():
+
+    kwargs = dict(ticks=[0, 1],
+                  ticklabels=['0', '1'],
+                  label='Label',
+                  orientation='horizontal')
+
+    with tempdir() as td:
+
+        expected = cbarbmp.colourBarBitmap('hot', 200, 80, **kwargs)
+
+        try:
+            cbarbmp.enableDiskCache(td)
+
+            assert cbarbmp.diskCache().directory == td
+
+            bmp1 = cbarbmp.colourBarBitmap('hot', 200, 80, **kwargs)
+            bmp2 = cbarbmp.colourBarBitmap('hot', 200, 80, **kwargs)
+
+            assert np.all(bmp1 == expected)
+            assert np.all(bmp2 == expected)
+            assert isinstance(bmp2, np.memmap)
+            assert not bmp1.flags.writeable
+
+            # look up tables are cached too
+            cbarbmp._lutCache.clear()
+            lut1 = cbarbmp.getColourLUT('hot')
+            cbarbmp._lutCache.clear()
+            lut2 = cbarbmp.getColourLUT('hot')
+            assert isinstance(lut2, np.memmap)
+            assert np.all(lut1 == lut2)
+
+            # only strings/numbers can be used as keys
+            assert cbarbmp._diskCacheKey('hot', 1, None) is not None
+            assert cbarbmp._diskCacheKey(object(), 1)    is None
+
+        finally:
+            cbarbmp.disableDiskCache()
+
+        assert cbarbmp.diskCache() is None
+
+
+def test_colourBarBitmap_diskCache_reregister():
+
+    import matplotlib.colors as mplcolors
+
+    # Colour maps which are registered at
+    # run time must not be stored in the
+    # disk cache, as their definition may
+    # change between processes.
+    name = 'fsleyes_widgets_test_diskcache_cmap'
+    red  = mplcolors.LinearSegmentedColormap.from_list(
+        name, [(0, 0, 0), (1, 0, 0)])
+    blue = mplcolors.LinearSegmentedColormap.from_list(
+        name, [(0, 0, 0), (0, 0, 1)])
+
+    with tempdir() as td:
+        try:
+            cbarbmp.enableDiskCache(td)
+
+            register_cmap(name, red)
+            bmp1 = cbarbmp.colourBarBitmap(name, 100, 25,
+                                           orientation='horizontal')
+            lut1 = cbarbmp.getColourLUT(name)
+
+            assert cbarbmp.diskCache().nbytes() == 0
+
+            # simulate a new process
+            register_cmap(name, blue)
+            cbarbmp._lutCache.clear()
+
+            bmp2 = cbarbmp.colourBarBitmap(name, 100, 25,
+                                           orientation='horizontal')
+            lut2 = cbarbmp.getColourLUT(name)
+
+            assert bmp1[50, 12, 0] > bmp1[50, 12, 2]
+            assert bmp2[50, 12, 2] > bmp2[50, 12, 0]
+            assert np.all(np.isclose(lut1[-1], [1, 0, 0, 1]))
+            assert np.all(np.isclose(lut2[-1], [0, 0, 1, 1]))
+
+            # built-in colour maps are still cached
+            cbarbmp.colourBarBitmap('hot', 100, 25, orientation='horizontal')
+            assert cbarbmp.diskCache().nbytes() > 0
+
+        finally:
+            cbarbmp.disableDiskCache()
+            unregister_cmap(name)
+
+
+def test_colourBarBitmap_diskCache_no_matplotlib():
+
+    # A colour bar which is in the disk
+    # cache should be loaded without
+    # importing matplotlib
+    script = textwrap.dedent("""
+    import sys
+    import fsleyes_widgets.utils.colourbarbitmap as cbarbmp
+    cbarbmp.enableDiskCache(sys.argv[1])
+    cbarbmp.colourBarBitmap('hot', 100, 40, label='Label')
+    print('matplotlib' in sys.modules)
+    """).strip()
+
+    with tempdir() as td:
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        cmd = [sys.executable, '-c', script, td]
+
+        cold = subprocess.check_output(cmd, env=env).decode().strip()
+        warm = subprocess.check_output(cmd, env=env).decode().strip()
+
+        assert cold.split()[-1] == 'True'
+        assert warm.split()[-1] == 'False'
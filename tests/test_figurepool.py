@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+#
+# test_figurepool.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import gc
+import weakref
+import threading
+
+import numpy as np
+
+import pytest
+
+import fsleyes_widgets.utils.figurepool      as figpool
+import fsleyes_widgets.utils.colourbarbitmap as cbarbmp
+import fsleyes_widgets.utils.textbitmap      as textbmp
+
+
+def test_pooledFigure():
+
+    figpool.clearPool()
+
+    with figpool.pooledFigure(100, 50) as (fig1, canvas1):
+        assert canvas1.get_width_height() == (100, 50)
+        fig1.add_subplot(111)
+        fig1.patch.set_alpha(0)
+    assert figpool.poolSize() == 1
+
+    # figure should be re-used, and reset
+    with figpool.pooledFigure(100, 50) as (fig2, canvas2):
+        assert fig2    is fig1
+        assert canvas2 is canvas1
+        assert len(fig2.axes) == 0
+        assert fig2.patch.get_alpha() is None
+
+        # figure is in use, so a new one is created
+        with figpool.pooledFigure(100, 50) as (fig3, canvas3):
+            assert fig3 is not fig1
+    assert figpool.poolSize() == 2
+
+    # different size -> different figure
+    with figpool.pooledFigure(50, 100) as (fig4, canvas4):
+        assert fig4 is not fig1
+        assert fig4 is not fig3
+        assert canvas4.get_width_height() == (50, 100)
+    assert figpool.poolSize() == 3
+
+    figpool.clearPool()
+    assert figpool.poolSize() == 0
+
+
+def test_error_discards_figure():
+
+    figpool.clearPool()
+
+    with pytest.raises(ValueError):
+        with figpool.pooledFigure(100, 50):
+            raise ValueError()
+
+    assert figpool.poolSize() == 0
+
+
+def test_setMaxPoolSize():
+
+    figpool.clearPool()
+
+    try:
+        figpool.setMaxPoolSize(2)
+
+        for size in [10, 20, 30, 40]:
+            with figpool.pooledFigure(size, size):
+                pass
+
+        assert figpool.poolSize() == 2
+
+        # least recently used are discarded
+        with figpool.pooledFigure(40, 40) as (fig, canvas):
+            assert canvas.get_width_height() == (40, 40)
+            assert figpool.poolSize() == 1
+
+        figpool.setMaxPoolSize(1)
+        assert figpool.poolSize() == 1
+
+    finally:
+        figpool.setMaxPoolSize(8)
+        figpool.clearPool()
+
+
+def test_per_thread_pools():
+
+    figpool.clearPool()
+
+    with figpool.pooledFigure(100, 50) as (mainfig, canvas):
+        pass
+
+    result = []
+
+    def thread():
+        with figpool.pooledFigure(100, 50) as (fig, canvas):
+            result.append(fig)
+        result.append(figpool.poolSize())
+
+    t = threading.Thread(target=thread)
+    t.start()
+    t.join()
+
+    assert result[0] is not mainfig
+    assert result[1] == 1
+    assert figpool.poolSize() == 1
+
+    figpool.clearPool()
+
+
+def test_thread_pools_released():
+
+    figpool.clearPool()
+
+    figs = []
+
+    def thread():
+        with figpool.pooledFigure(100, 50) as (fig, canvas):
+            figs.append(weakref.ref(fig))
+
+    for i in range(10):
+        t = threading.Thread(target=thread)
+        t.start()
+        t.join()
+
+    gc.collect()
+
+    # The pools of exited threads should be
+    # released along with their figures
+    assert all([f() is None for f in figs])
+
+    # A new thread should not inherit
+    # the figures of an exited thread
+    result = []
+
+    def newthread():
+        result.append(figpool.poolSize())
+
+    t = threading.Thread(target=newthread)
+    t.start()
+    t.join()
+
+    assert result == [0]
+
+
+def test_reuse_output_unchanged():
+
+    figpool.clearPool()
+
+    kwargs = dict(ticks=[0, 0.5, 1],
+                  ticklabels=['0', '0.5', '1'],
+                  label='Label',
+                  orientation='horizontal',
+                  bgColour=(0, 0, 0, 1))
+
+    cbar1 = cbarbmp.colourBarBitmap('Reds', 100, 50, **kwargs)
+    text1 = textbmp.textBitmap('R', 50, 50, 10, (1, 1, 1, 1), None)
+
+    # render something different with
+    # the same figures, then re-render
+    cbarbmp.colourBarBitmap('Blues', 100, 50, label='Other')
+    textbmp.textBitmap('L', 50, 50, 16, (1, 0, 0, 1), (0, 0, 0, 1))
+
+    cbar2 = cbarbmp.colourBarBitmap('Reds', 100, 50, **kwargs)
+    text2 = textbmp.textBitmap('R', 50, 50, 10, (1, 1, 1, 1), None)
+
+    assert np.all(cbar1 == cbar2)
+    assert np.all(text1 == text2)
+
+    figpool.clearPool()
+
+
+def test_canvasToArray():
+
+    with figpool.pooledFigure(40, 20) as (fig, canvas):
+
+        fig.patch.set_facecolor((1, 0, 0, 1))
+        canvas.draw()
+
+        arr  = figpool.canvasToArray(canvas)
+        argb = np.frombuffer(canvas.tostring_argb(), dtype=np.uint8)
+        argb = argb.reshape(20, 40, 4)
+
+        assert arr.shape == (20, 40, 4)
+        assert arr.dtype == np.uint8
+        assert np.all(arr[..., :3] == argb[..., 1:])
+        assert np.all(arr[..., 3]  == argb[..., 0])
+        assert np.all(arr == [255, 0, 0, 255])
+
+
+def test_output_contiguous():
+
+    for orient, (w, h) in [('horizontal', (100, 50)),
+                           ('vertical',   (50, 100))]:
+        for backend in ['matplotlib', 'numpy']:
+            bmp = cbarbmp.colourBarBitmap('Reds', w, h,
+                                          orientation=orient,
+                                          backend=backend)
+            assert bmp.shape == (w, h, 4)
+            assert bmp.flags['C_CONTIGUOUS']
+            assert bmp.flags['OWNDATA']
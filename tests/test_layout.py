@@ -5,11 +5,33 @@
 # Author: Paul McCarthy <pauldmccarthy@gmail.com>
 #
 
-import numpy as np
+import os.path as op
+import io
+import struct
+import warnings
+import zlib
+
+import numpy   as np
+import pytest
 
 import fsleyes_widgets.utils.layout as fsllayout
 
 
+# seeded so that tests are reproducible
+_random = np.random.RandomState(1234)
+
+
+def _randomBitmap(w, h):
+    """Returns a random RGBA ``numpy.uint8`` bitmap of shape ``(h, w, 4)``.
+    """
+    return _random.randint(0, 256, (h, w, 4)).astype(np.uint8)
+
+
+def _randomItem(w, h):
+    """Returns a :class:`.Bitmap` layout item containing a random bitmap. """
+    return fsllayout.Bitmap(_randomBitmap(w, h))
+
+
 def test_padBitmap():
 
     bmp       = np.zeros((10, 10, 4))
@@ -26,6 +48,456 @@ def test_padBitmap():
     assert np.all(resultv == expectedv)
 
 
+def _stackLayout(layout, bgColour):
+    """Reference implementation of layoutToBitmap, which pads and stacks
+    the children of each box.
+    """
+
+    if isinstance(layout, fsllayout.Space):
+        bmp    = np.zeros((layout.height, layout.width, 4), dtype=np.uint8)
+        bmp[:] = bgColour
+        return bmp
+    elif isinstance(layout, fsllayout.Bitmap):
+        return layout.bitmap
+
+    vert = isinstance(layout, fsllayout.VBox)
+    bmps = [_stackLayout(i, bgColour) for i in layout.items]
+    bmps = [fsllayout.padBitmap(b, layout.width, layout.height, vert, bgColour)
+            for b in bmps]
+
+    if vert: return np.vstack(bmps)
+    else:    return np.hstack(bmps)
+
+
+def test_layoutToBitmap():
+
+    layouts = [
+        _randomItem(5, 7),
+        fsllayout.Space(4, 3),
+        fsllayout.HBox([_randomItem(5, 7),
+                        fsllayout.Space(2, 2),
+                        _randomItem(3, 10)]),
+        fsllayout.VBox([_randomItem(5, 7),
+                        fsllayout.Space(2, 2),
+                        _randomItem(4, 10)]),
+        fsllayout.VBox([
+            fsllayout.HBox([_randomItem(3, 3),
+                            fsllayout.VBox([_randomItem(2, 5),
+                                            _randomItem(7, 2)])]),
+            fsllayout.Space(1, 3),
+            fsllayout.HBox([_randomItem(11, 4), _randomItem(1, 1)])])]
+
+    for layout in layouts:
+        for bg in [None, (10, 20, 30, 255)]:
+
+            result   = fsllayout.layoutToBitmap(layout, bg)
+            expected = _stackLayout(layout, bg or (0, 0, 0, 0))
+
+            assert result.dtype == np.uint8
+            assert result.shape == (layout.height, layout.width, 4)
+            assert np.all(result == expected)
+
+    # an empty box produces an empty bitmap
+    result = fsllayout.layoutToBitmap(fsllayout.HBox(), (1, 2, 3, 4))
+    assert result.shape == (0, 0, 4)
+
+
+def test_layoutToBitmap_memmap(tmpdir):
+
+    # leaf bitmaps may themselves be memory-mapped
+    leaf = op.join(str(tmpdir), 'leaf.npy')
+    np.save(leaf, _randomItem(13, 17).bitmap)
+    leaf = fsllayout.Bitmap(np.load(leaf, mmap_mode='r'))
+
+    layout = fsllayout.VBox([
+        fsllayout.HBox([_randomItem(3, 3),
+                        fsllayout.VBox([_randomItem(2, 5), leaf])]),
+        fsllayout.Space(1, 3),
+        fsllayout.HBox([_randomItem(11, 4), _randomItem(1, 1)])])
+    bg       = (10, 20, 30, 255)
+    expected = fsllayout.layoutToBitmap(layout, bg)
+
+    # tile sizes smaller than a row, of one
+    # row, several rows, and the whole bitmap
+    for tileBytes in [1, layout.width * 4, layout.width * 4 * 5 + 3,
+                      expected.nbytes * 2]:
+
+        fname  = op.join(str(tmpdir), 'out{}.npy'.format(tileBytes))
+        result = fsllayout.layoutToBitmap(layout, bg, filename=fname,
+                                          tileBytes=tileBytes)
+
+        assert isinstance(result, np.memmap)
+        assert np.all(result == expected)
+
+        del result
+        assert np.all(np.load(fname) == expected)
+
+
+def test_layoutToBitmap_workers(tmpdir):
+
+    layout = fsllayout.HBox([
+        fsllayout.VBox([_randomItem(40, 30),
+                        fsllayout.Space(10, 5),
+                        _randomItem(13, 90)]),
+        _randomItem(3, 7),
+        fsllayout.VBox([_randomItem(20, 20) for i in range(6)])])
+    bg       = (10, 20, 30, 255)
+    expected = fsllayout.layoutToBitmap(layout, bg)
+
+    for workers in [None, 2, 3, 8, 500]:
+        result = fsllayout.layoutToBitmap(layout, bg, workers=workers)
+        assert np.all(result == expected)
+
+    fname  = op.join(str(tmpdir), 'out.npy')
+    result = fsllayout.layoutToBitmap(layout, bg, filename=fname,
+                                      tileBytes=1000, workers=4)
+    assert np.all(result == expected)
+    del result
+    assert np.all(np.load(fname) == expected)
+
+
+def _alphaOver(src, dest, premultiplied=False):
+    """Floating point reference implementation of alphaOver. """
+    src  = src  / 255.0
+    dest = dest / 255.0
+    srca = src[ ..., 3:]
+    dsta = dest[..., 3:]
+
+    if premultiplied:
+        return 255 * (src + dest * (1 - srca))
+
+    outa = srca + dsta * (1 - srca)
+    outc = src[..., :3] * srca + dest[..., :3] * dsta * (1 - srca)
+    outc = outc / np.maximum(outa, 1e-10)
+    return 255 * np.concatenate((outc, outa), axis=-1)
+
+
+def test_alphaOver():
+
+    src  = _randomBitmap(60, 50)
+    dest = _randomBitmap(60, 50)
+
+    # fully transparent/opaque pixels
+    src[ :5,    :, 3] = 0
+    src[ 5:10,  :, 3] = 255
+    dest[10:15, :, 3] = 0
+    src[ 10:12, :, 3] = 0
+
+    opaque           = np.array(dest)
+    opaque[..., 3]   = 255
+    premult          = np.array(src)
+    premult[..., :3] = src[..., :3] * (src[..., 3:] / 255.0)
+
+    for s, d, pm in [(src,     dest,    False),
+                     (src,     opaque,  False),
+                     (premult, premult[::-1], True)]:
+
+        expected = _alphaOver(s, d, pm)
+        result   = np.array(d)
+
+        assert fsllayout.alphaOver(s, result, pm) is result
+        assert np.all(np.abs(result - expected) <= 0.5 + 1e-6)
+
+    # fully transparent output stays zero
+    src  = np.zeros((4, 4, 4), dtype=np.uint8)
+    dest = np.zeros((4, 4, 4), dtype=np.uint8)
+    assert np.all(fsllayout.alphaOver(src, dest) == 0)
+
+
+def test_Overlay():
+
+    canvas         = _randomBitmap(20, 15)
+    label1         = _randomBitmap(6, 5)
+    label2         = _randomBitmap(30, 3)
+    canvas[..., 3] = 255
+    bg             = (10, 20, 30, 255)
+
+    overlay = fsllayout.Overlay([fsllayout.Bitmap(canvas),
+                                 fsllayout.Bitmap(label1),
+                                 fsllayout.Bitmap(label2)])
+
+    assert (overlay.width, overlay.height) == (30, 15)
+
+    expected          = np.zeros((15, 30, 4), dtype=np.uint8)
+    expected[:]       = bg
+    expected[:, 5:25] = canvas
+    fsllayout.alphaOver(label1, expected[5:10, 12:18])
+    fsllayout.alphaOver(label2, expected[6:9])
+
+    layout = fsllayout.HBox([overlay, fsllayout.Bitmap(_randomBitmap(4, 4))])
+    result = fsllayout.layoutToBitmap(layout, bg)
+
+    assert np.all(result[:, :30] == expected)
+
+    leaves, geom = fsllayout.computeGeometry(overlay)
+    assert geom.tolist() == [[5, 0, 20, 15], [12, 5, 6, 5], [0, 6, 30, 3]]
+
+    # all code paths should give the same result
+    for workers in [2, 7]:
+        assert np.all(result == fsllayout.layoutToBitmap(
+            layout, bg, workers=workers))
+
+    f = io.BytesIO()
+    fsllayout.layoutToPNG(layout, f, bg, tileBytes=100)
+    assert np.all(_readPNG(f.getvalue()) == result)
+
+    # labels must be re-drawn over slots
+    comp = fsllayout.LayoutCompositor(layout, slots=[canvas], bgColour=bg)
+    for i in range(3):
+        frame         = _randomBitmap(20, 15)
+        frame[..., 3] = 255
+        expected      = fsllayout.layoutToBitmap(fsllayout.HBox([
+            fsllayout.Overlay([fsllayout.Bitmap(frame),
+                               fsllayout.Bitmap(label1),
+                               fsllayout.Bitmap(label2)]),
+            layout.items[1]]), bg)
+        assert np.all(comp.composite([frame]) == expected)
+
+    # premultiplied alpha
+    pm          = np.array(label1)
+    pm[..., :3] = pm[..., :3] * (pm[..., 3:] / 255.0)
+    overlay     = fsllayout.Overlay([fsllayout.Bitmap(canvas),
+                                     fsllayout.Bitmap(pm)],
+                                    premultiplied=True)
+    expected    = np.array(canvas)
+    fsllayout.alphaOver(pm, expected[5:10, 7:13], premultiplied=True)
+    assert np.all(fsllayout.layoutToBitmap(overlay) == expected)
+
+
+def _readPNG(data):
+    """Minimal PNG reader, supporting the subset of PNG written by
+    layoutToPNG (RGBA, with the "none" or "up" filters).
+    """
+
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+
+    chunks = []
+    offset = 8
+
+    while offset < len(data):
+        length, = struct.unpack('>I', data[offset:offset + 4])
+        ctype   = data[offset + 4:offset + 8]
+        cdata   = data[offset + 8:offset + 8 + length]
+        crc,    = struct.unpack('>I', data[offset + 8 + length:
+                                           offset + 12 + length])
+        assert crc == zlib.crc32(ctype + cdata) & 0xffffffff
+        chunks.append((ctype, cdata))
+        offset += 12 + length
+
+    assert chunks[ 0][0] == b'IHDR'
+    assert chunks[-1][0] == b'IEND'
+
+    width, height, depth, ctype = struct.unpack('>IIBB', chunks[0][1][:10])
+    assert (depth, ctype) == (8, 6)
+
+    idat = b''.join([c[1] for c in chunks if c[0] == b'IDAT'])
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8)
+    rows = rows.reshape(height, width * 4 + 1)
+    bmp  = np.zeros((height, width * 4), dtype=np.uint8)
+    prev = np.zeros(width * 4, dtype=np.uint8)
+
+    for i, row in enumerate(rows):
+        assert row[0] in (0, 2)
+        if row[0] == 0: bmp[i] = row[1:]
+        else:           bmp[i] = row[1:] + prev
+        prev = bmp[i]
+
+    return bmp.reshape(height, width, 4)
+
+
+def test_layoutToPNG(tmpdir):
+
+    layout = fsllayout.VBox([
+        fsllayout.HBox([_randomItem(3, 3),
+                        fsllayout.VBox([_randomItem(2, 5),
+                                        _randomItem(13, 17)])]),
+        fsllayout.Space(1, 3),
+        fsllayout.HBox([_randomItem(11, 4), _randomItem(1, 1)])])
+    bg       = (10, 20, 30, 255)
+    expected = fsllayout.layoutToBitmap(layout, bg)
+
+    for tileBytes in [1, layout.width * 4 * 5 + 3, expected.nbytes * 2]:
+        for level in [0, 6, 9]:
+            f = io.BytesIO()
+            fsllayout.layoutToPNG(layout, f, bg, level, tileBytes)
+            assert np.all(_readPNG(f.getvalue()) == expected)
+
+    fname = op.join(str(tmpdir), 'layout.png')
+    fsllayout.layoutToPNG(layout, fname, bg)
+    with open(fname, 'rb') as f:
+        assert np.all(_readPNG(f.read()) == expected)
+
+
+def test_computeGeometry():
+
+    b1  = fsllayout.Bitmap(np.zeros((7, 5, 4), dtype=np.uint8))
+    b2  = fsllayout.Bitmap(np.zeros((2, 3, 4), dtype=np.uint8))
+    b3  = fsllayout.Bitmap(np.zeros((4, 11, 4), dtype=np.uint8))
+    s1  = fsllayout.Space(2, 3)
+    box = fsllayout.VBox([fsllayout.HBox([b1, s1, b2]), b3])
+
+    leaves, geom = fsllayout.computeGeometry(box)
+
+    assert leaves == [b1, s1, b2, b3]
+    assert geom.shape == (4, 4)
+    assert geom.tolist() == [[0, 0, 5, 7],
+                             [5, 2, 2, 3],
+                             [7, 2, 3, 2],
+                             [0, 7, 11, 4]]
+
+    # the geometry should locate each
+    # bitmap within the composite
+    b1.bitmap[:] = 1
+    b2.bitmap[:] = 2
+    b3.bitmap[:] = 3
+    bmp = fsllayout.layoutToBitmap(box)
+    for leaf, (x, y, w, h) in zip(leaves, geom):
+        if isinstance(leaf, fsllayout.Bitmap):
+            assert np.all(bmp[y:y + h, x:x + w] == leaf.bitmap)
+
+    leaves, geom = fsllayout.computeGeometry(b1)
+    assert leaves == [b1]
+    assert geom.tolist() == [[0, 0, 5, 7]]
+
+    leaves, geom = fsllayout.computeGeometry(fsllayout.HBox())
+    assert leaves == []
+    assert geom.shape == (0, 4)
+
+
+def test_LayoutCompositor():
+
+    canvases = [_randomBitmap(20, 20) for i in range(3)]
+    labels   = [{'top'    : _randomBitmap(20, 5),
+                 'bottom' : _randomBitmap(20, 5),
+                 'left'   : _randomBitmap(5, 20),
+                 'right'  : _randomBitmap(5, 20)}
+                for i in range(3)]
+    layout   = fsllayout.buildOrthoLayout(canvases, labels, 'grid', True, 5)
+    bg       = (10, 20, 30, 255)
+
+    comp = fsllayout.LayoutCompositor(layout, slots=canvases, bgColour=bg)
+
+    assert (comp.width, comp.height) == (layout.width, layout.height)
+    assert all([s.bitmap is c for s, c in zip(comp.slots, canvases)])
+
+    # output buffer is re-used
+    out1 = comp.composite(canvases)
+    assert np.all(out1 == fsllayout.layoutToBitmap(layout, bg))
+
+    for i in range(3):
+        frame    = [_randomBitmap(20, 20) for i in range(3)]
+        expected = fsllayout.buildOrthoLayout(frame, labels, 'grid', True, 5)
+        out2     = comp.composite(frame)
+        assert out2 is out1
+        assert np.all(out2 == fsllayout.layoutToBitmap(expected, bg))
+
+    # caller-supplied buffer
+    out = np.zeros((layout.height, layout.width, 4), dtype=np.uint8)
+    assert comp.composite(canvases, out) is out
+    assert np.all(out == fsllayout.layoutToBitmap(layout, bg))
+
+    # all bitmaps are slots by default
+    comp  = fsllayout.LayoutCompositor(layout)
+    slots = [_randomBitmap(s.width, s.height) for s in comp.slots]
+    assert len(comp.slots) == 15
+    exp = fsllayout.layoutToBitmap(fsllayout.buildOrthoLayout(
+        slots[2::5],
+        [{'top'   : slots[i],     'left'   : slots[i + 1],
+          'right' : slots[i + 3], 'bottom' : slots[i + 4]}
+         for i in range(0, 15, 5)],
+        'grid', True, 5))
+    assert np.all(comp.composite(slots) == exp)
+
+    with pytest.raises(ValueError):
+        fsllayout.LayoutCompositor(layout, slots=[_randomBitmap(20, 20)])
+    with pytest.raises(ValueError):
+        comp.composite(slots[:-1])
+    with pytest.raises(ValueError):
+        comp.composite([_randomBitmap(3, 3)] * 15)
+    with pytest.raises(ValueError):
+        comp.composite(slots, out=np.zeros((3, 3, 4), dtype=np.uint8))
+
+
+def test_LayoutCompositor_update():
+
+    canvases = [fsllayout.Bitmap(_randomBitmap(20, 20)) for i in range(3)]
+    label    = fsllayout.Bitmap(_randomBitmap(8, 4))
+    overlay  = fsllayout.Overlay([canvases[0], label])
+    layout   = fsllayout.HBox([overlay,
+                               fsllayout.Space(5, 10),
+                               canvases[1],
+                               fsllayout.VBox([canvases[2],
+                                               fsllayout.Space(10, 5)])])
+    bg       = (10, 20, 30, 255)
+    comp     = fsllayout.LayoutCompositor(layout, bgColour=bg)
+
+    def check(expRects):
+        before        = out.copy()
+        result, rects = comp.update()
+        assert result is out
+        assert sorted(rects) == sorted(expRects)
+        assert not layout.dirty
+        assert np.all(out == fsllayout.layoutToBitmap(layout, bg))
+
+        # Nothing outside of the
+        # rects should have changed
+        mask = np.ones(out.shape[:2], dtype=bool)
+        for x, y, w, h in rects:
+            mask[y:y + h, x:x + w] = False
+        assert np.all(out[mask] == before[mask])
+
+    assert layout.dirty
+    out, rects = comp.update()
+    assert rects == [(0, 0, layout.width, layout.height)]
+    assert not layout.dirty
+    assert np.all(out == fsllayout.layoutToBitmap(layout, bg))
+
+    # nothing has changed
+    check([])
+
+    # bitmap replaced
+    canvases[1].bitmap = _randomBitmap(20, 20)
+    check([(25, 2, 20, 20)])
+
+    # bitmap modified in place
+    canvases[0].bitmap[:] = _randomBitmap(20, 20)
+    canvases[0].markDirty()
+    check([(0, 2, 20, 20)])
+
+    # blended item - the canvas beneath
+    # it is re-drawn within its rect
+    label.bitmap[:] = _randomBitmap(8, 4)
+    label.markDirty()
+    check([(6, 10, 8, 4)])
+
+    # overlapping rects are merged
+    canvases[0].bitmap = _randomBitmap(20, 20)
+    label.markDirty()
+    canvases[2].bitmap = _randomBitmap(20, 20)
+    check([(0, 2, 20, 20), (45, 0, 20, 20)])
+
+    # container marks all its items
+    layout.items[3].markDirty()
+    assert layout.dirty
+    assert layout.items[3].dirty
+    assert not overlay.dirty
+    check([(45, 0, 20, 20), (50, 20, 10, 5)])
+
+    # a buffer which has not been
+    # used before is drawn in full
+    out2          = np.zeros(out.shape, dtype=np.uint8)
+    result, rects = comp.update(out2)
+    assert result is out2
+    assert rects == [(0, 0, layout.width, layout.height)]
+    assert np.all(out2 == fsllayout.layoutToBitmap(layout, bg))
+
+    canvases[1].bitmap = _randomBitmap(10, 10)
+    with pytest.raises(ValueError):
+        comp.update(out2)
+    with pytest.raises(ValueError):
+        comp.update(np.zeros((3, 3, 4), dtype=np.uint8))
+
+
 def test_buildCanvasBox_withLabels():
 
     labelbmps = {
@@ -118,6 +590,79 @@ def test_buildOrthoLayout_grid():
     assert np.all(result == expected)
 
 
+def test_buildMontageLayout():
+
+    def bmp(w, h, val):
+        return np.full((h, w, 4), val, dtype=np.uint8)
+
+    bitmaps = [bmp(10, 8, i + 1) for i in range(7)]
+    bitmaps[3] = bmp(6, 4, 4)
+    labels  = [bmp(5, 2, 100 + i) if i % 2 == 0 else None for i in range(7)]
+
+    for spacing in [0, 3]:
+
+        layout = fsllayout.buildMontageLayout(bitmaps, 3, spacing, labels)
+        result = fsllayout.layoutToBitmap(layout)
+
+        # 3 columns of width 10, 3 rows of height 8 + 2
+        assert layout.width  == 30 + 2 * spacing
+        assert layout.height == 30 + 2 * spacing
+
+        for i, b in enumerate(bitmaps):
+            row, col = divmod(i, 3)
+            x        = col * (10 + spacing) + (10 - b.shape[1]) // 2
+            y        = row * (10 + spacing)
+
+            # every row contains a labelled cell, so
+            # is 10 pixels high - unlabelled cells
+            # are centered vertically
+            if labels[i] is None:
+                y += (10 - b.shape[0]) // 2
+
+            assert np.all(result[y:y + b.shape[0], x:x + b.shape[1]] == b)
+
+            if labels[i] is not None:
+                assert np.all(result[y + 8:y + 10, x + 2:x + 7] == labels[i])
+
+    layout = fsllayout.buildMontageLayout(bitmaps, 1)
+    assert (layout.width, layout.height) == (10, 6 * 8 + 4)
+    layout = fsllayout.buildMontageLayout(bitmaps, 10)
+    assert (layout.width, layout.height) == (100, 8)
+    layout = fsllayout.buildMontageLayout([], 3)
+    assert (layout.width, layout.height) == (0, 0)
+
+    with pytest.raises(ValueError):
+        fsllayout.buildMontageLayout(bitmaps, 0)
+    with pytest.raises(ValueError):
+        fsllayout.buildMontageLayout(bitmaps, 3, labels=labels[:3])
+
+
+def test_calcMontageSizes():
+
+    sizes = fsllayout.calcMontageSizes(7, 3, (10, 20), 300, 300)
+    assert sizes.shape == (7, 2)
+    assert np.all(sizes == [50, 100])
+
+    sizes = fsllayout.calcMontageSizes(7, 3, (20, 10), 300, 300)
+    assert np.all(sizes == [100, 50])
+
+    # spacing is removed from the available space
+    sizes = fsllayout.calcMontageSizes(4, 2, (10, 10), 210, 110, spacing=10)
+    assert np.all(sizes == [50, 50])
+
+    # per-canvas bounds
+    bounds = _random.randint(0, 20, (50, 2))
+    sizes  = fsllayout.calcMontageSizes(50, 7, bounds, 700, 800)
+    for (bw, bh), size in zip(bounds, sizes):
+        assert np.all(np.isclose(
+            size, fsllayout._adjustPixelSize(bw, bh, 100, 100)))
+
+    assert fsllayout.calcMontageSizes(0, 3, (1, 1), 10, 10).shape == (0, 2)
+
+    with pytest.raises(ValueError):
+        fsllayout.calcMontageSizes(3, 0, (1, 1), 10, 10)
+
+
 def test_calcSizes():
 
     # calcSizes  is just a wrapper around the
@@ -151,6 +696,96 @@ def test_calcSizes():
         assert np.all(np.isclose(gexp, gres))
 
 
+def test_calcSizes_cache():
+
+    axes   = [(0, 1), (0, 2), (1, 2)]
+    bounds = np.array([1.0, 2.0, 3.0])
+
+    fsllayout._sizeCache.clear()
+
+    exp = fsllayout.calcHorizontalSizes(axes, bounds, 300, 100)
+    res = fsllayout.calcSizes('horizontal', axes, bounds, 300, 100)
+
+    assert np.all(np.isclose(exp, res))
+    assert len(fsllayout._sizeCache) == 1
+
+    # Equivalent arguments should hit the
+    # cache, and the caller should be able
+    # to modify the result without affecting
+    # the cache
+    res.append(None)
+    res = fsllayout.calcSizes('Horizontal', [list(a) for a in axes],
+                              list(bounds), 300, 100)
+    assert np.all(np.isclose(exp, res))
+    assert len(fsllayout._sizeCache) == 1
+
+    # Different arguments should not
+    fsllayout.calcSizes('vertical',   axes, bounds, 300, 100)
+    fsllayout.calcSizes('horizontal', axes, bounds, 300, 101)
+    fsllayout.calcSizes('horizontal', axes, bounds * 2, 300, 100)
+    assert len(fsllayout._sizeCache) == 4
+
+    # The cache is bounded
+    for i in range(fsllayout._sizeCacheSize + 10):
+        fsllayout.calcSizes('horizontal', axes, bounds, i, 100)
+    assert len(fsllayout._sizeCache) == fsllayout._sizeCacheSize
+
+
+def test_calcSizesBatch():
+
+    gaxes   = [(0, 2), (1, 2), (0, 1)]
+    axes    = [(0, 1), (0, 2), (1, 2)]
+    widths  = np.arange(50, 1000, 37)
+    heights = np.arange(950, 0, -37)[:len(widths)]
+
+    for bounds in [[1.0, 1.0, 1.0], [1.0, 2.0, 3.0], [5.0, 0.5, 2.0]]:
+        for layout, laxes in [('horizontal', axes),
+                              ('vertical',   axes),
+                              ('grid',       gaxes),
+                              ('grid',       axes[:2]),
+                              ('vertical',   axes[:1])]:
+
+            res = fsllayout.calcSizesBatch(
+                layout, laxes, bounds, widths, heights)
+            exp = [fsllayout.calcSizes(layout, laxes, bounds, w, h)
+                   for w, h in zip(widths, heights)]
+
+            assert res.shape == (len(widths), len(laxes), 2)
+            assert np.allclose(exp, res)
+
+    # scalar heights are broadcast
+    res = fsllayout.calcSizesBatch('horizontal', axes, [1, 2, 3],
+                                   widths, 100)
+    exp = fsllayout.calcSizesBatch('horizontal', axes, [1, 2, 3],
+                                   widths, [100] * len(widths))
+    assert np.all(res == exp)
+
+    assert fsllayout.calcSizesBatch('grid', [], [1, 1, 1], widths,
+                                    heights).shape == (len(widths), 0, 2)
+
+    with pytest.raises(ValueError):
+        fsllayout.calcSizesBatch('diagonal', axes, [1, 1, 1], [1], [1])
+
+    # calcSizes raises a ZeroDivisionError when
+    # a display space dimension is zero - the
+    # batch version should return zero sizes
+    for layout, laxes in [('horizontal', axes), ('grid', gaxes)]:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            res = fsllayout.calcSizesBatch(
+                layout, laxes, [0, 0, 0], widths, heights)
+        assert np.all(res == 0)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        res = fsllayout.calcSizesBatch(
+            'grid', gaxes, [0, 0, 1], widths, heights)
+    assert np.all(res[..., 0] == 0)
+    assert np.all(np.isfinite(res))
+    with pytest.raises(ZeroDivisionError):
+        fsllayout.calcSizes('grid', gaxes, [0, 0, 1], 100, 100)
+
+
 def test_calcGridSizes():
 
     axes = [(0, 2), (1, 2), (0, 1)]
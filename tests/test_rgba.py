@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+#
+# test_rgba.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import numpy as np
+
+import fsleyes_widgets.utils.rgba as rgba
+
+
+def test_toUint8():
+    assert np.all(rgba.toUint8((0, 0.5, 1, 1)) == [0, 128, 255, 255])
+    assert rgba.toUint8([[0, 0, 0, 0]]).dtype == np.uint8
+
+
+def test_over():
+
+    red   = np.array([1, 0, 0, 1.0])
+    blue  = np.array([0, 0, 1, 1.0])
+    clear = np.array([0, 0, 0, 0.0])
+
+    assert np.allclose(rgba.over(red,   blue),  red)
+    assert np.allclose(rgba.over(clear, blue),  blue)
+    assert np.allclose(rgba.over(blue,  clear), blue)
+
+    half = rgba.over(np.array([1, 0, 0, 0.5]), blue)
+    assert np.allclose(half, [0.5, 0, 0.5, 1])
+
+
+def test_blendMask():
+
+    bitmap = np.zeros((10, 10, 4), dtype=np.uint8)
+    mask   = np.full((4, 4), 255, dtype=np.uint8)
+
+    rgba.blendMask(bitmap, mask, 2, 3, (1, 0, 0, 1))
+
+    assert np.all(bitmap[3:7, 2:6] == [255, 0, 0, 255])
+    assert np.all(bitmap[:3]       == 0)
+    assert np.all(bitmap[:, :2]    == 0)
+
+    # the mask is clipped to the bitmap
+    rgba.blendMask(bitmap, mask, 8, -2, (0, 0, 1, 1))
+    assert np.all(bitmap[:2, 8:] == [0, 0, 255, 255])
+
+    # entirely outside the bitmap
+    before = bitmap.copy()
+    rgba.blendMask(bitmap, mask, 20, 20, (0, 1, 0, 1))
+    assert np.all(bitmap == before)
@@ -9,8 +9,11 @@
 import os.path   as op
 import itertools as it
 
+import numpy            as np
 import matplotlib.image as mplimg
 
+import pytest
+
 from . import compare_images
 
 import fsleyes_widgets.utils.textbitmap as textbmp
@@ -41,3 +44,281 @@ def test_textbitmap():
 
         benchmark = mplimg.imread(fname) * 255
         assert compare_images(bmp, benchmark, 1)[0]
+
+
+def test_rasteriseText():
+
+    for size in [6, 10, 16]:
+        mask, xoff, width, height, descent = \
+            textbmp.rasteriseText('Label', size)
+
+        assert mask.dtype == np.uint8
+        assert mask.ndim  == 2
+        assert mask.max() > 0
+        assert width      >  0
+        assert height     >  0
+        assert descent    >= 0
+
+    # wider text, bigger mask
+    small = textbmp.rasteriseText('Label', 10)[0]
+    big   = textbmp.rasteriseText('Label', 20)[0]
+    assert big.shape[0] > small.shape[0]
+    assert big.shape[1] > small.shape[1]
+
+    # descenders
+    assert textbmp.rasteriseText('a', 10)[4] == 0
+    assert textbmp.rasteriseText('g', 10)[4] >  0
+
+
+def _numpy_parity(bmp1, bmp2):
+    bmp1 = np.array(bmp1, dtype=np.float64)
+    bmp2 = np.array(bmp2, dtype=np.float64)
+    bmp1[..., :3] *= bmp1[..., 3:] / 255.0
+    bmp2[..., :3] *= bmp2[..., 3:] / 255.0
+    return np.mean(np.any(np.abs(bmp1 - bmp2) > 16, axis=-1))
+
+
+def test_textbitmap_numpy_backend():
+
+    texts     = ['R', 'Label', 'gy']
+    fontsizes = [6, 10, 16]
+    bgColours = [None, (0, 0, 0, 0), (0, 0, 0, 1), (1, 0, 0, 1)]
+    fgColours = [(0, 0, 0, 1), (1, 0, 0, 1), (1, 1, 1, 1)]
+    alphas    = [0.5, 1.0]
+    sizes     = [(75, 50), (31, 40)]
+
+    testcases = it.product(texts, fontsizes, bgColours, fgColours, alphas,
+                           sizes)
+
+    for text, size, bg, fg, alpha, (w, h) in testcases:
+
+        mplbmp = textbmp.textBitmap(text, w, h, size, fg, bg, alpha)
+        npbmp  = textbmp.textBitmap(text, w, h, size, fg, bg, alpha,
+                                    backend='numpy')
+
+        assert npbmp.shape == mplbmp.shape == (h, w, 4)
+        assert _numpy_parity(mplbmp, npbmp) <= \
+            textbmp.NUMPY_BACKEND_TOLERANCE
+
+    with pytest.raises(ValueError):
+        textbmp.textBitmap('R', 20, 20, 10, 'w', 'k', backend='badbackend')
+
+
+def test_GlyphAtlas():
+
+    textbmp.clearGlyphAtlases()
+
+    atlas = textbmp.glyphAtlas(10)
+
+    assert textbmp.glyphAtlas(10)         is     atlas
+    assert textbmp.glyphAtlas(12)         is not atlas
+    assert textbmp.glyphAtlas(10, dpi=72) is not atlas
+    assert op.exists(atlas.fontFile)
+
+    entry1 = textbmp.rasteriseText('Label', 10)
+    entry2 = textbmp.rasteriseText('Label', 10)
+
+    assert 'Label' in atlas
+    assert entry1 is entry2
+    assert not entry1[0].flags.writeable
+
+    # LRU eviction
+    atlas = textbmp.GlyphAtlas(10, maxEntries=2)
+    atlas.get('a')
+    atlas.get('b')
+    atlas.get('a')
+    atlas.get('c')
+
+    assert len(atlas) == 2
+    assert 'a' in atlas
+    assert 'b' not in atlas
+    assert 'c' in atlas
+
+    textbmp.clearGlyphAtlases()
+    assert textbmp.glyphAtlas(10) is not atlas
+
+
+def test_cache():
+
+    cache = textbmp.textBitmapCache()
+    cache.clear()
+
+    bmp1 = textbmp.textBitmap('R', 50, 50, 10, (1, 1, 1), None, cache=True)
+    assert cache.misses == 1
+    assert cache.hits   == 0
+
+    # equivalent arguments (lists vs
+    # tuples) map to the same entry
+    bmp2 = textbmp.textBitmap('R', 50, 50, 10, [1, 1, 1], None, cache=True)
+    assert cache.misses == 1
+    assert cache.hits   == 1
+    assert bmp2 is bmp1
+
+    # cached bitmaps are read-only
+    with pytest.raises(ValueError):
+        bmp1[:] = 0
+
+    # every argument is part of the key
+    variants = [('L', 50, 50, 10, (1, 1, 1), None, 1.0, 'matplotlib'),
+                ('R', 51, 50, 10, (1, 1, 1), None, 1.0, 'matplotlib'),
+                ('R', 50, 51, 10, (1, 1, 1), None, 1.0, 'matplotlib'),
+                ('R', 50, 50, 11, (1, 1, 1), None, 1.0, 'matplotlib'),
+                ('R', 50, 50, 10, (1, 0, 1), None, 1.0, 'matplotlib'),
+                ('R', 50, 50, 10, (1, 1, 1), 'k',  1.0, 'matplotlib'),
+                ('R', 50, 50, 10, (1, 1, 1), None, 0.5, 'matplotlib'),
+                ('R', 50, 50, 10, (1, 1, 1), None, 1.0, 'numpy')]
+
+    for i, args in enumerate(variants):
+        bmp = textbmp.textBitmap(*args, cache=True)
+        assert bmp is not bmp1
+        assert cache.misses == i + 2
+
+    # uncached calls are not affected
+    bmp3 = textbmp.textBitmap('R', 50, 50, 10, (1, 1, 1), None)
+    assert bmp3 is not bmp1
+    assert np.all(bmp3 == bmp1)
+    assert cache.stats()['hits']    == 1
+    assert cache.stats()['entries'] == len(variants) + 1
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_textbitmap_rotation():
+
+    texts     = ['R', 'Label', 'gy', 'Two\nlines', 'Three\n\nlines']
+    rotations = [0, 90, 180, 270, -90, 450]
+    spacings  = [1.2, 2.0]
+    sizes     = [(75, 60), (31, 40)]
+
+    testcases = it.product(texts, rotations, spacings, sizes)
+
+    for text, rot, spacing, (w, h) in testcases:
+
+        mplbmp = textbmp.textBitmap(text, w, h, 10, 'w', 'k',
+                                    rotation=rot, linespacing=spacing)
+        npbmp  = textbmp.textBitmap(text, w, h, 10, 'w', 'k',
+                                    rotation=rot, linespacing=spacing,
+                                    backend='numpy')
+
+        assert npbmp.shape == mplbmp.shape == (h, w, 4)
+        assert _numpy_parity(mplbmp, npbmp) <= \
+            textbmp.NUMPY_BACKEND_TOLERANCE
+
+    # text rotated by 180 degrees is drawn
+    # upside-down, so should be present in
+    # the bottom half of the bitmap
+    bmp = textbmp.textBitmap('Label\n', 40, 40, 10, 'w', 'k', rotation=180)
+    assert bmp[20:, :, 0].sum() > bmp[:20, :, 0].sum()
+
+    bmps = textbmp.textBitmaps(['a\nbc', 'Label'], (40, 60), 10, 'w', 'k',
+                               rotation=90, linespacing=1.5)
+    assert np.all(bmps[0] == textbmp.textBitmap('a\nbc', 40, 60, 10, 'w',
+                                                'k', rotation=90,
+                                                linespacing=1.5))
+
+    with pytest.raises(ValueError):
+        textbmp.textBitmap('R', 20, 20, 10, 'w', 'k', rotation=45)
+    with pytest.raises(ValueError):
+        textbmp.textBitmaps(['R'], (20, 20), 10, 'w', 'k', rotation=30)
+
+
+def test_textBitmaps():
+
+    texts = ['L', 'R', 'A', 'S', 'Label', 'gy', 'Long text which is clipped',
+             '']
+    sizes = [(50, 50), (31, 20), (64, 33), (75, 50), (40, 40), (17, 21),
+             (60, 30), (10, 10)]
+
+    for bg, fg, alpha in [(None,         (1, 1, 1, 1), 1.0),
+                          ((0, 0, 0, 1), (1, 0, 0, 1), 0.5)]:
+
+        bmps = textbmp.textBitmaps(texts, sizes, 12, fg, bg, alpha)
+
+        assert len(bmps) == len(texts)
+
+        for text, (w, h), bmp in zip(texts, sizes, bmps):
+            exp = textbmp.textBitmap(text, w, h, 12, fg, bg, alpha)
+            assert bmp.shape == (h, w, 4)
+            assert np.all(bmp == exp)
+
+    # single size, many strings (wrapped
+    # onto multiple rows), and copies
+    bmps = textbmp.textBitmaps(['abc'] * 100, (75, 50), 10, 'w', None,
+                               copy=True)
+    exp  = textbmp.textBitmap('abc', 75, 50, 10, 'w', None)
+    assert all([np.all(b == exp) for b in bmps])
+    assert all([b.flags['OWNDATA'] for b in bmps])
+
+    # rotated text, some of which does
+    # not fit within its bitmap
+    texts = ['R', 'QHello world', 'gjy', '1.0e-3', 'ab']
+    sizes = [(30, 20), (43, 41), (60, 64), (80, 80), (20, 15)]
+    for rot, size in it.product([90, 180, 270], [8, 14, 20]):
+        bmps = textbmp.textBitmaps(texts, sizes, size, 'w', None,
+                                   rotation=rot)
+        for text, (w, h), bmp in zip(texts, sizes, bmps):
+            exp = textbmp.textBitmap(text, w, h, size, 'w', None,
+                                     rotation=rot)
+            assert np.all(bmp == exp)
+
+    bmps = textbmp.textBitmaps(['R', 'L'], (20, 20), 10, 'w', 'k',
+                               backend='numpy')
+    assert np.all(bmps[1] == textbmp.textBitmap('L', 20, 20, 10, 'w', 'k',
+                                                backend='numpy'))
+
+    assert textbmp.textBitmaps([], [], 10, 'w', None) == []
+
+    with pytest.raises(ValueError):
+        textbmp.textBitmaps(['a', 'b'], [(10, 10)], 10, 'w', None)
+    with pytest.raises(ValueError):
+        textbmp.textBitmaps(['a'], [(10, 10)], 10, 'w', None, backend='bad')
+
+
+def test_packCells():
+
+    sizes = [(10, 10), (11, 5), (3000, 7), (2000, 9), (5, 5)]
+    cells, width, height = textbmp._packCells(sizes)
+
+    assert [c[2:] for c in cells] == sizes
+    assert all([x % 2 == 0 and y % 2 == 0 for x, y, _, _ in cells])
+    assert width  <= 4096
+    assert height >= max([y + h for _, y, _, h in cells])
+
+    # no overlaps
+    for (x1, y1, w1, h1), (x2, y2, w2, h2) in it.combinations(cells, 2):
+        assert x1 + w1 <= x2 or x2 + w2 <= x1 or \
+               y1 + h1 <= y2 or y2 + h2 <= y1
+
+
+def test_measureText():
+
+    import matplotlib.font_manager         as fm
+    import matplotlib.backends.backend_agg as mplagg
+
+    textbmp.clearGlyphAtlases()
+
+    renderer = mplagg.RendererAgg(10, 10, 96)
+
+    for text in ['R', 'Label', 'gy', 'Some longer text']:
+        for size in [6, 10, 16]:
+
+            props   = fm.FontProperties(size=size)
+            exp     = renderer.get_text_width_height_descent(
+                text, props, ismath=False)
+            metrics = textbmp.measureText(text, size)
+
+            assert np.allclose(metrics, exp)
+
+            # same as the metrics of rasterised text
+            assert np.allclose(metrics, textbmp.rasteriseText(text, size)[2:])
+
+    # measurements are cached
+    atlas = textbmp.glyphAtlas(10)
+    assert textbmp.measureText('unrasterised', 10) is \
+        atlas.measure('unrasterised')
+    assert 'unrasterised' not in atlas
+
+    w1 = textbmp.measureText('abc', 10)[0]
+    w2 = textbmp.measureText('abcabc', 10)[0]
+    assert w2 > w1
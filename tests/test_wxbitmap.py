@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#
+# test_wxbitmap.py -
+#
+# Author: Paul McCarthy <pauldmccarthy@gmail.com>
+#
+
+
+import numpy as np
+
+import pytest
+
+from . import run_with_wx
+
+import fsleyes_widgets.utils.wxbitmap as wxbmp
+
+
+def _randomBitmap(width, height, channels=4):
+    data = np.random.randint(0, 255, (height, width, channels))
+    data = data.astype(np.uint8)
+
+    # avoid premultiplied alpha
+    # rounding errors
+    if channels == 4:
+        data[:, :, 3] = 255
+
+    return data
+
+
+def test_empty():
+
+    arr = wxbmp.empty(20, 10)
+    assert arr.shape == (10, 20, 4)
+    assert arr.dtype == np.uint8
+    assert arr.flags['C_CONTIGUOUS']
+
+    arr = wxbmp.empty(20, 10, 3, transpose=True)
+    assert arr.shape == (20, 10, 3)
+    assert arr.transpose((1, 0, 2)).flags['C_CONTIGUOUS']
+
+
+def test_rows():
+
+    rows = np.zeros((10, 20, 4), dtype=np.uint8)
+    cols = wxbmp.empty(20, 10, transpose=True)
+    copy = np.zeros((20, 10, 4), dtype=np.uint8)
+
+    # no copy is made if the
+    # array is already row-major
+    assert wxbmp._rows(rows, False) is rows
+    assert np.shares_memory(wxbmp._rows(cols, True), cols)
+
+    result = wxbmp._rows(copy, True)
+    assert result.shape == (10, 20, 4)
+    assert result.flags['C_CONTIGUOUS']
+    assert not np.shares_memory(result, copy)
+
+    with pytest.raises(ValueError):
+        wxbmp._rows(np.zeros((10, 20, 4), dtype=np.float32), False)
+    with pytest.raises(ValueError):
+        wxbmp._rows(np.zeros((10, 20, 2), dtype=np.uint8), False)
+    with pytest.raises(ValueError):
+        wxbmp._rows(np.zeros((10, 20), dtype=np.uint8), False)
+
+
+def test_toBitmap_fromBitmap():
+    run_with_wx(_test_toBitmap_fromBitmap)
+def _test_toBitmap_fromBitmap():
+
+    rgba = _randomBitmap(30, 20, 4)
+    rgb  = _randomBitmap(30, 20, 3)
+
+    bmp = wxbmp.toBitmap(rgba)
+    assert bmp.GetWidth()  == 30
+    assert bmp.GetHeight() == 20
+    assert np.all(wxbmp.fromBitmap(bmp) == rgba)
+
+    rgbaT = rgba.transpose((1, 0, 2))
+    bmp   = wxbmp.toBitmap(rgbaT, transpose=True)
+    assert bmp.GetWidth()  == 30
+    assert bmp.GetHeight() == 20
+    assert np.all(wxbmp.fromBitmap(bmp, transpose=True) == rgbaT)
+
+    bmp    = wxbmp.toBitmap(rgb)
+    result = wxbmp.fromBitmap(bmp)
+    assert np.all(result[:, :, :3] == rgb)
+    assert np.all(result[:, :,  3] == 255)
+
+
+def test_toImage():
+    run_with_wx(_test_toImage)
+def _test_toImage():
+
+    rgba = _randomBitmap(30, 20, 4)
+    rgba[:, :, 3] = np.random.randint(0, 255, (20, 30))
+
+    img = wxbmp.toImage(rgba)
+
+    assert img.GetWidth()  == 30
+    assert img.GetHeight() == 20
+
+    for x, y in [(0, 0), (29, 0), (0, 19), (29, 19), (15, 10)]:
+        assert img.GetRed(  x, y) == rgba[y, x, 0]
+        assert img.GetGreen(x, y) == rgba[y, x, 1]
+        assert img.GetBlue( x, y) == rgba[y, x, 2]
+        assert img.GetAlpha(x, y) == rgba[y, x, 3]
+
+    img = wxbmp.toImage(rgba.transpose((1, 0, 2)), transpose=True)
+    assert img.GetWidth()        == 30
+    assert img.GetHeight()       == 20
+    assert img.GetAlpha(29, 19)  == rgba[19, 29, 3]
+
+    img = wxbmp.toImage(rgba[:, :, :3])
+    assert not img.HasAlpha()
+    assert img.GetRed(15, 10) == rgba[10, 15, 0]